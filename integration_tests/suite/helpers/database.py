@@ -30,11 +30,14 @@ from wazo_call_logd.database.models import (
     CallLog,
     CallLogParticipant,
     Export,
+    LastCall,
     Recording,
     Retention,
     Tenant,
     VoicemailTranscription,
 )
+from wazo_call_logd.database.queries import rollup
+from wazo_call_logd.database.queries.call_log import upsert_last_calls
 
 from .constants import MASTER_TENANT, USER_1_UUID
 
@@ -77,6 +80,29 @@ def call_logs(number, participant_user=None):
     return _decorate
 
 
+@contextmanager
+def bulk_call_logs_fixture(database: DbHelper, number: int) -> Iterator[None]:
+    with database.queries() as queries:
+        queries.insert_bulk_call_logs(number)
+    try:
+        yield
+    finally:
+        with database.queries() as queries:
+            queries.delete_bulk_call_logs()
+
+
+def bulk_call_logs(number):
+    def _decorate(func):
+        @wraps(func)
+        def wrapped_function(self, *args, **kwargs):
+            with bulk_call_logs_fixture(self.database, number):
+                return func(self, *args, **kwargs)
+
+        return wrapped_function
+
+    return _decorate
+
+
 ParticipantRole = Literal['source', 'destination']
 
 
@@ -555,6 +581,27 @@ class DbHelper:
             yield DatabaseQueries(connection)
 
 
+@contextmanager
+def statements_counter(Session: scoped_session) -> Iterator[list[str]]:
+    engine = Session.session_factory.kw['bind']
+    statements: list[str] = []
+
+    def _on_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    sa.event.listen(engine, 'before_cursor_execute', _on_execute)
+    try:
+        yield statements
+    finally:
+        sa.event.remove(engine, 'before_cursor_execute', _on_execute)
+
+
+def explain(session: BaseSession, query: sa.orm.Query) -> str:
+    compiled = query.statement.compile(dialect=session.get_bind().dialect)
+    rows = session.connection().exec_driver_sql(f'EXPLAIN {compiled}', compiled.params)
+    return '\n'.join(row[0] for row in rows)
+
+
 @contextmanager
 def transaction(session: BaseSession, close=True):
     try:
@@ -594,11 +641,54 @@ class DatabaseQueries:
             call_log = CallLog(**kwargs)
             session.add(call_log)
             session.flush()
+            self._rebuild_rollups(session, call_log.id)
             return call_log.id
 
+    def _call_log_date(self, session, call_log_id):
+        return session.query(CallLog.date).filter(CallLog.id == call_log_id).scalar()
+
+    def _rebuild_rollups(self, session, call_log_id, days=None):
+        if days is None:
+            days = rollup.call_log_days(session, CallLog.id == call_log_id)
+        for tenant_uuid, day in days:
+            rollup.rebuild_rollups(session, [tenant_uuid], day, day + td(days=1))
+
     def delete_call_log(self, call_log_id):
         with transaction(self.Session()) as session:
+            days = rollup.call_log_days(session, CallLog.id == call_log_id)
+            session.query(LastCall).filter(LastCall.call_log_id == call_log_id).delete()
             session.query(CallLog).filter(CallLog.id == call_log_id).delete()
+            self._rebuild_rollups(session, call_log_id, days)
+
+    def insert_bulk_call_logs(self, number):
+        # NOTE: generated server side, inserting call logs one by one is too slow
+        # to get a table big enough for the planner to prefer indexes
+        query = text(
+            '''
+            INSERT INTO call_logd_call_log (
+                date, tenant_uuid, source_name, source_exten,
+                destination_name, destination_exten, user_field
+            )
+            SELECT
+                NOW() - (n || ' minutes')::interval,
+                :tenant_uuid,
+                'Bulk Source ' || n,
+                (10000 + n)::text,
+                'Bulk Destination ' || n,
+                (20000 + n)::text,
+                'bulk'
+            FROM generate_series(1, :number) AS n
+            '''
+        )
+        with transaction(self.Session()) as session:
+            session.execute(query, {'tenant_uuid': MASTER_TENANT, 'number': number})
+        self.connection.execution_options(autocommit=True).execute(
+            text('ANALYZE call_logd_call_log')
+        )
+
+    def delete_bulk_call_logs(self):
+        with transaction(self.Session()) as session:
+            session.query(CallLog).filter(CallLog.user_field == 'bulk').delete()
 
     def insert_export(self, **kwargs):
         with transaction(self.Session()) as session:
@@ -614,6 +704,9 @@ class DatabaseQueries:
 
     def insert_recording(self, **kwargs):
         with transaction(self.Session()) as session:
+            kwargs.setdefault(
+                'call_log_date', self._call_log_date(session, kwargs['call_log_id'])
+            )
             recording = Recording(**kwargs)
             session.add(recording)
             session.flush()
@@ -681,8 +774,18 @@ class DatabaseQueries:
     def insert_call_log_participant(self, **kwargs):
         with transaction(self.Session()) as session:
             kwargs.setdefault('role', 'source')
+            kwargs.setdefault(
+                'call_log_date', self._call_log_date(session, kwargs['call_log_id'])
+            )
             call_log_participant = CallLogParticipant(**kwargs)
             session.add(call_log_participant)
+            session.flush()
+            call_log = session.get(CallLog, call_log_participant.call_log_id)
+            session.expire(call_log, ['participants'])
+            call_log.denormalize_participants()
+            session.execute(upsert_last_calls([call_log]))
+            session.flush()
+            self._rebuild_rollups(session, call_log.id)
 
     def find_all_call_log(self) -> list[CallLog]:
         with transaction(self.Session()) as session:
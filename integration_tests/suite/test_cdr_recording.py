@@ -5,6 +5,7 @@ import requests
 from hamcrest import (
     assert_that,
     calling,
+    contains_exactly,
     equal_to,
     has_entries,
     has_item,
@@ -500,10 +501,17 @@ class TestRecording(IntegrationTest):
                 has_properties(
                     status_code=500,
                     error_id='recording-media-permission-denied',
-                    details=has_entries(cdr_id=1),
+                    details=has_entries(
+                        cdr_id=1,
+                        failures=contains_exactly(
+                            has_entries(cdr_id=1, recording_path='/tmp/denied.wav')
+                        ),
+                    ),
                 )
             ),
         )
+        recording = self.call_logd.cdr.get_by_id(2)['recordings'][0]
+        assert_that(recording['deleted'], equal_to(True))
 
     @call_log(**{'id': 1}, recordings=[{'path': '/tmp/deleted1.wav'}])
     @call_log(**{'id': 2}, recordings=[{'path': '/tmp/deleted2.wav'}])
@@ -1,21 +1,34 @@
-# Copyright 2017-2024 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2017-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from datetime import datetime as dt
 from datetime import timedelta as td
+from datetime import timezone
+from uuid import UUID, uuid4
 
 from hamcrest import (
     assert_that,
+    calling,
     contains_exactly,
     contains_inanyorder,
+    contains_string,
     empty,
     has_entries,
     has_length,
     has_properties,
     has_property,
+    not_,
+    raises,
 )
+from sqlalchemy.exc import OperationalError
 
-from wazo_call_logd.database.models import CallLog, CallLogParticipant, Recording
+from wazo_call_logd.database.models import (
+    CallLog,
+    CallLogDaily,
+    CallLogParticipant,
+    Recording,
+)
+from wazo_call_logd.database.queries import rollup
 from wazo_call_logd.database.queries.call_log import ListParams
 
 from .helpers.base import DBIntegrationTest, cdr
@@ -26,11 +39,19 @@ from .helpers.constants import (
     MASTER_TENANT,
     MINUTES,
     NOW,
+    OTHER_TENANT,
     USER_1_UUID,
     USER_2_UUID,
     USER_3_UUID,
 )
-from .helpers.database import call_log, recording, transaction
+from .helpers.database import (
+    bulk_call_logs,
+    call_log,
+    explain,
+    recording,
+    statements_counter,
+    transaction,
+)
 
 
 class TestCallLog(DBIntegrationTest):
@@ -50,6 +71,28 @@ class TestCallLog(DBIntegrationTest):
             ),
         )
 
+    @call_log(**cdr(id_=1, caller=ALICE, callee=BOB, start_time=NOW))
+    @call_log(**cdr(id_=2, caller=ALICE, callee=BOB, start_time=NOW + 1 * MINUTES))
+    @call_log(**cdr(id_=3, caller=BOB, callee=ALICE, start_time=NOW + 2 * MINUTES))
+    @call_log(**cdr(id_=4, caller=ALICE, callee=CHARLES, start_time=NOW - 5 * MINUTES))
+    def test_that_the_most_recent_call_log_is_returned_for_each_contact_of_me(self):
+        params = {'distinct': 'peer_exten', 'me_user_uuid': CHARLES['id']}
+
+        result = self.dao.call_log.find_all_in_period(params)
+        assert_that(result, contains_exactly(has_properties(id=4)))
+
+    @call_log(**cdr(id_=1, caller=ALICE, callee=BOB, start_time=NOW))
+    @call_log(**cdr(id_=2, caller=ALICE, callee=BOB, start_time=NOW + 1 * MINUTES))
+    @call_log(**cdr(id_=3, caller=BOB, callee=ALICE, start_time=NOW + 2 * MINUTES))
+    def test_that_the_previous_call_log_is_returned_when_the_last_one_is_deleted(
+        self,
+    ):
+        self.dao.call_log.delete_from_list([3])
+        params = {'distinct': 'peer_exten'}
+
+        result = self.dao.call_log.find_all_in_period(params)
+        assert_that(result, contains_exactly(has_properties(id=2)))
+
     @call_log(**{'id': 1})
     @recording(call_log_id=1, start_time=NOW + 2 * MINUTES)
     @recording(call_log_id=1, start_time=NOW + 1 * MINUTES)
@@ -91,6 +134,26 @@ class TestCallLog(DBIntegrationTest):
             ),
         )
 
+    @call_log(**cdr(id_=1, start_time=NOW))
+    @call_log(**cdr(id_=2, start_time=NOW + 1 * MINUTES))
+    @call_log(**cdr(id_=3, start_time=NOW + 2 * MINUTES))
+    @recording(call_log_id=3)
+    def test_iter_pages_in_period(self, rec1):
+        params = {'order': 'date', 'direction': 'asc'}
+
+        pages = []
+        for page in self.dao.call_log.iter_pages_in_period(params, page_size=2):
+            # NOTE: the scoped session is opened and closed between pages
+            self.dao.call_log.find_all_in_period({})
+            pages.append(
+                [
+                    (call_log.id, [recording.uuid for recording in call_log.recordings])
+                    for call_log in page
+                ]
+            )
+
+        assert_that(pages, contains_exactly([(1, []), (2, [])], [(3, [rec1['uuid']])]))
+
     @call_log(
         id=1,
         participants=[
@@ -162,6 +225,91 @@ class TestCallLog(DBIntegrationTest):
             ),
         )
 
+    @call_log(
+        id=1,
+        participants=[{'user_uuid': USER_1_UUID, 'role': 'source'}]
+        + [{'user_uuid': uuid4(), 'role': 'destination'} for _ in range(30)],
+        recordings=[{} for _ in range(10)],
+    )
+    @call_log(
+        id=2,
+        participants=[{'user_uuid': USER_1_UUID, 'role': 'source'}],
+        recordings=[{}],
+    )
+    def test_find_all_in_period_query_count_does_not_depend_on_participants(self):
+        params: ListParams = {'cdr_ids': [1, 2]}
+
+        with statements_counter(self._Session) as statements:
+            result = self.dao.call_log.find_all_in_period(params)
+
+        assert_that(
+            result,
+            contains_inanyorder(
+                has_properties(
+                    id=1,
+                    participants=has_length(31),
+                    recordings=has_length(10),
+                    source_user_uuid=USER_1_UUID,
+                ),
+                has_properties(
+                    id=2,
+                    participants=has_length(1),
+                    recordings=has_length(1),
+                    source_user_uuid=USER_1_UUID,
+                ),
+            ),
+        )
+        # call logs, then one query per eager loaded relationship
+        assert_that(statements, has_length(6))
+
+    @bulk_call_logs(10000)
+    def test_find_all_in_period_default_listing_walks_tenant_date_index(self):
+        params: ListParams = {
+            'tenant_uuids': [str(MASTER_TENANT)],
+            'order': 'date',
+            'direction': 'desc',
+            'limit': 100,
+        }
+
+        with transaction(self.session) as session:
+            query = self.dao.call_log._find_all_query(session, params)
+            plan = explain(session, query)
+
+        assert_that(plan, contains_string('call_log__idx__tenant_uuid_date_id'))
+        assert_that(plan, not_(contains_string('Sort')))
+
+    @bulk_call_logs(10000)
+    def test_find_all_in_period_from_id_walks_tenant_id_index(self):
+        params: ListParams = {
+            'tenant_uuids': [str(MASTER_TENANT)],
+            'start_id': 1,
+            'order': 'id',
+            'direction': 'asc',
+            'limit': 100,
+        }
+
+        with transaction(self.session) as session:
+            query = self.dao.call_log._find_all_query(session, params)
+            plan = explain(session, query)
+
+        assert_that(plan, contains_string('call_log__idx__tenant_uuid_id'))
+        assert_that(plan, not_(contains_string('Sort')))
+
+    @bulk_call_logs(10000)
+    def test_find_all_in_period_search_uses_trigram_indexes(self):
+        params: ListParams = {'search': 'Destination 4242'}
+
+        with transaction(self.session) as session:
+            query = self.dao.call_log._list_query(session, params)
+            plan = explain(session, query)
+            result = query.all()
+            assert_that(
+                result, contains_exactly(has_properties(destination_exten='24242'))
+            )
+
+        for column in self.dao.call_log.searched_columns:
+            assert_that(plan, contains_string(f'call_log__idx__{column.name}_trgm'))
+
     @call_log(**cdr(id_=1, caller=ALICE, callee=BOB, start_time=NOW))
     @call_log(**cdr(id_=2, caller=ALICE, callee=BOB, start_time=NOW + 1 * MINUTES))
     @call_log(**cdr(id_=3, caller=BOB, callee=ALICE, start_time=NOW + 2 * MINUTES))
@@ -245,6 +393,134 @@ class TestCallLog(DBIntegrationTest):
             self.session.query(CallLog).delete()
             self.session.query(CallLogParticipant).delete()
             self.session.query(Recording).delete()
+            self.session.query(CallLogDaily).delete()
+
+    def test_create_from_list_increments_rollups(self):
+        def new_call_log(duration):
+            call_log = CallLog(
+                date=dt(2026, 3, 1, 12, tzinfo=timezone.utc),
+                date_answer=dt(2026, 3, 1, 12, tzinfo=timezone.utc),
+                date_end=dt(2026, 3, 1, 12, 0, duration, tzinfo=timezone.utc),
+                tenant_uuid=str(MASTER_TENANT),
+                direction='internal',
+                participants=[
+                    CallLogParticipant(role='source', user_uuid=str(USER_1_UUID))
+                ],
+            )
+            call_log.denormalize_participants()
+            return call_log
+
+        self.dao.call_log.create_from_list([new_call_log(10), new_call_log(20)])
+        self.dao.call_log.create_from_list([new_call_log(30)])
+
+        result = self.session.query(CallLogDaily).all()
+        assert_that(
+            result,
+            contains_inanyorder(
+                has_properties(
+                    user_uuid=UUID(CallLogDaily.ALL_USERS),
+                    call_status='answered',
+                    count=3,
+                    duration=60,
+                    duration_max=30,
+                ),
+                has_properties(
+                    user_uuid=USER_1_UUID,
+                    call_status='answered',
+                    count=3,
+                    duration=60,
+                    duration_max=30,
+                ),
+            ),
+        )
+
+        with transaction(self.session):
+            self.session.query(CallLog).delete()
+            self.session.query(CallLogParticipant).delete()
+            self.session.query(CallLogDaily).delete()
+
+    def test_rollups_are_locked_per_tenant(self):
+        def lock(connection, tenant_uuid):
+            connection.exec_driver_sql("SET LOCAL lock_timeout = '100ms'")
+            rollup.lock_rollups(connection, [tenant_uuid])
+
+        with self.database.connect() as purge, self.database.connect() as writer:
+            with purge.begin():
+                lock(purge, MASTER_TENANT)
+
+                with writer.begin():
+                    lock(writer, OTHER_TENANT)
+                with writer.begin():
+                    assert_that(
+                        calling(lock).with_args(writer, MASTER_TENANT),
+                        raises(OperationalError),
+                    )
+
+    @call_log(**cdr(id_=1, caller=ALICE, callee=BOB, start_time=dt(2026, 3, 1, 12)))
+    @call_log(**cdr(id_=2, caller=ALICE, callee=BOB, start_time=dt(2026, 3, 1, 13)))
+    @call_log(
+        **{
+            **cdr(id_=3, caller=BOB, callee=CHARLES, start_time=dt(2026, 3, 2, 12)),
+            'date_answer': None,
+        }
+    )
+    def test_aggregate_by_call_status_and_day(self):
+        params = {'group_by': ['call_status'], 'interval': 'day', 'timezone': 'UTC'}
+
+        result = self.dao.call_log.aggregate(params)
+
+        assert_that(
+            result,
+            contains_exactly(
+                has_entries(call_status='answered', count=2, duration=60),
+                has_entries(call_status='unknown', count=1, duration=0),
+            ),
+        )
+        assert_that([item['from'].day for item in result], contains_exactly(1, 2))
+
+    @call_log(**cdr(id_=1, caller=ALICE, callee=BOB))
+    @call_log(**cdr(id_=2, caller=ALICE, callee=BOB))
+    @call_log(**cdr(id_=3, caller=BOB, callee=CHARLES))
+    def test_aggregate_by_user_uuid(self):
+        result = self.dao.call_log.aggregate({'group_by': ['user_uuid']})
+
+        assert_that(
+            result,
+            contains_inanyorder(
+                has_entries(user_uuid=UUID(ALICE['id']), count=2),
+                has_entries(user_uuid=UUID(BOB['id']), count=3),
+                has_entries(user_uuid=UUID(CHARLES['id']), count=1),
+            ),
+        )
+
+        params = {'group_by': ['user_uuid'], 'terminal_user_uuids': [CHARLES['id']]}
+        result = self.dao.call_log.aggregate(params)
+
+        assert_that(
+            result,
+            contains_exactly(has_entries(user_uuid=UUID(CHARLES['id']), count=1)),
+        )
+
+    @call_log(**cdr(id_=1, caller=ALICE, callee=BOB, start_time=dt(2026, 3, 1, 12)))
+    @call_log(**cdr(id_=2, caller=ALICE, callee=BOB, start_time=dt(2026, 3, 1, 13)))
+    @call_log(**cdr(id_=3, caller=BOB, callee=CHARLES, start_time=dt(2026, 3, 2, 12)))
+    @call_log(**{**cdr(id_=4, start_time=dt(2026, 3, 2, 14)), 'participants': []})
+    def test_aggregate_from_rollups(self):
+        for params in (
+            {'interval': 'day'},
+            {'interval': 'month', 'group_by': ['call_status', 'call_direction']},
+            {'group_by': ['user_uuid'], 'start': dt(2026, 3, 2, tzinfo=timezone.utc)},
+            {'group_by': ['call_status'], 'call_direction': 'internal'},
+        ):
+            assert rollup.covers(params)
+            with transaction(self.session):
+                expected = self.dao.call_log._aggregate_query(self.session, params)
+                expected = [dict(row._mapping) for row in expected]
+
+            result = self.dao.call_log.aggregate(params)
+
+            assert_that(result, has_length(len(expected)))
+            assert_that(result, contains_exactly(*map(has_entries, expected)))
 
     @call_log(**cdr(id_=1))
     @call_log(**cdr(id_=2))
@@ -256,6 +532,11 @@ class TestCallLog(DBIntegrationTest):
         result = self.session.query(CallLog).all()
         assert_that(result, contains_exactly(has_property('id', id_2)))
 
+        result = self.session.query(CallLogDaily).filter(
+            CallLogDaily.user_uuid == CallLogDaily.ALL_USERS
+        )
+        assert_that(result.all(), contains_exactly(has_properties(count=1)))
+
     @call_log(**cdr(id_=1))
     @call_log(**cdr(id_=2))
     @call_log(**cdr(id_=3))
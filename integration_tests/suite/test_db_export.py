@@ -1,4 +1,4 @@
-# Copyright 2021-2023 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2021-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 import uuid
@@ -6,11 +6,22 @@ from datetime import datetime as dt
 from datetime import timedelta as td
 from datetime import timezone as tz
 
-from hamcrest import assert_that, calling, has_properties, not_none
+from hamcrest import (
+    assert_that,
+    calling,
+    contains_exactly,
+    equal_to,
+    has_properties,
+    none,
+    not_none,
+)
 from wazo_test_helpers.hamcrest.raises import raises
 
-from wazo_call_logd.database.models import Export
-from wazo_call_logd.exceptions import ExportNotFoundException
+from wazo_call_logd.database.models import Export, ExportRecording, ExportShard
+from wazo_call_logd.exceptions import (
+    ExportLimitReachedException,
+    ExportNotFoundException,
+)
 
 from .helpers.base import DBIntegrationTest
 from .helpers.constants import MASTER_TENANT, OTHER_TENANT
@@ -55,6 +66,131 @@ class TestDBExport(DBIntegrationTest):
         self.session.query(Export).delete()
         self.session.commit()
 
+    def test_create_limited_reuses_the_same_fingerprint(self):
+        def new_export(fingerprint, tenant_uuid=MASTER_TENANT):
+            return Export(
+                tenant_uuid=tenant_uuid,
+                user_uuid=uuid.uuid4(),
+                requested_at=dt.now(tz.utc),
+                status='pending',
+                fingerprint=fingerprint,
+            )
+
+        since = dt.now(tz.utc) - td(minutes=10)
+        first, created = self.dao.export.create_limited(new_export('a'), None, since)
+        assert_that(created, equal_to(True))
+
+        result, created = self.dao.export.create_limited(new_export('a'), None, since)
+        assert_that((result.uuid, created), equal_to((first.uuid, False)))
+
+        for other in (new_export('b'), new_export('a', OTHER_TENANT)):
+            result, created = self.dao.export.create_limited(other, None, since)
+            assert_that(created, equal_to(True))
+
+        later = dt.now(tz.utc) + td(seconds=1)
+        result, created = self.dao.export.create_limited(new_export('a'), None, later)
+        assert_that(created, equal_to(True))
+
+        self.session.query(Export).delete()
+        self.session.commit()
+
+    @export(status='processing')
+    @export(status='finished')
+    @export(status='pending', tenant_uuid=OTHER_TENANT)
+    def test_create_limited_max_queued(self, *_):
+        body = {
+            'tenant_uuid': MASTER_TENANT,
+            'user_uuid': uuid.uuid4(),
+            'requested_at': dt.now(),
+            'status': 'pending',
+        }
+        export, created = self.dao.export.create_limited(Export(**body), 2)
+        assert_that(created, equal_to(True))
+
+        assert_that(
+            calling(self.dao.export.create_limited).with_args(Export(**body), 2),
+            raises(ExportLimitReachedException),
+        )
+
+        self.session.query(Export).filter(Export.uuid == export.uuid).delete()
+        self.session.commit()
+
+    def test_start_shard_max_processing(self):
+        export = Export(
+            tenant_uuid=MASTER_TENANT,
+            user_uuid=uuid.uuid4(),
+            requested_at=dt.now(),
+            status='pending',
+            shards=[
+                ExportShard(index=0, status='pending', recording_count=2),
+                ExportShard(index=1, status='pending', recording_count=1),
+            ],
+        )
+        export = self.dao.export.create(export)
+        started_at = dt.now(tz.utc)
+
+        result = self.dao.export.start_shard(export.uuid, 0, started_at, 1)
+        assert_that(
+            result,
+            has_properties(status='processing', started_at=started_at),
+        )
+
+        result = self.dao.export.start_shard(export.uuid, 1, started_at, 1)
+        assert_that(result, none())
+
+        self.dao.export.update_shard(export.uuid, 0, status='finished')
+        result = self.dao.export.start_shard(export.uuid, 1, started_at, 1)
+        assert_that(result.shards[1], has_properties(status='processing'))
+
+        self.session.query(Export).delete()
+        self.session.commit()
+
+    def test_stale_shards_are_set_in_error(self):
+        now = dt.now(tz.utc)
+        stale = Export(
+            tenant_uuid=MASTER_TENANT,
+            user_uuid=uuid.uuid4(),
+            requested_at=now - td(hours=3),
+            status='processing',
+            shards=[
+                ExportShard(index=0, status='processing', started_at=now - td(hours=3)),
+                ExportShard(index=1, status='processing', started_at=now),
+            ],
+        )
+        stale = self.dao.export.create(stale)
+        body = {
+            'tenant_uuid': MASTER_TENANT,
+            'user_uuid': uuid.uuid4(),
+            'requested_at': now,
+            'status': 'pending',
+            'shards': [ExportShard(index=0, status='pending')],
+        }
+        stale_since = now - td(hours=2)
+
+        export, _ = self.dao.export.create_limited(
+            Export(**body), 1, stale_since=stale_since
+        )
+
+        result = self.dao.export.get(stale.uuid)
+        assert_that(result, has_properties(status='error'))
+        assert_that(
+            result.shards,
+            contains_exactly(
+                has_properties(status='error', finished_at=not_none()),
+                has_properties(status='processing'),
+            ),
+        )
+
+        result = self.dao.export.start_shard(export.uuid, 0, now, 1, stale_since)
+        assert_that(result, none())
+
+        self.dao.export.update_shard(stale.uuid, 1, started_at=now - td(hours=3))
+        result = self.dao.export.start_shard(export.uuid, 0, now, 1, stale_since)
+        assert_that(result, has_properties(status='processing'))
+
+        self.session.query(Export).delete()
+        self.session.commit()
+
     @export(status='processing', path=None)
     def test_update(self, export):
         export = self.dao.export.get(export['uuid'])
@@ -64,3 +200,104 @@ class TestDBExport(DBIntegrationTest):
 
         result = self.dao.export.get(export.uuid)
         assert_that(result, has_properties(status='error', path='/tmp/test.zip'))
+
+    def test_update_shard(self):
+        export = Export(
+            tenant_uuid=MASTER_TENANT,
+            user_uuid=uuid.uuid4(),
+            requested_at=dt.now(),
+            status='pending',
+            shards=[
+                ExportShard(index=0, status='pending', recording_count=2),
+                ExportShard(index=1, status='pending', recording_count=1),
+            ],
+        )
+        export = self.dao.export.create(export)
+
+        result = self.dao.export.update_shard(
+            export.uuid, 1, status='finished', path='/tmp/1.zip', size=10
+        )
+        assert_that(result, has_properties(status='processing', size=10))
+
+        result = self.dao.export.update_shard(
+            export.uuid, 0, status='finished', path='/tmp/0.zip', size=20
+        )
+        assert_that(result, has_properties(status='finished', size=30, path=None))
+        result = self.dao.export.get(export.uuid)
+        assert_that(
+            result.shards,
+            contains_exactly(
+                has_properties(index=0, status='finished', path='/tmp/0.zip'),
+                has_properties(index=1, status='finished', path='/tmp/1.zip'),
+            ),
+        )
+
+        self.session.query(Export).delete()
+        self.session.commit()
+
+    def test_update_shard_not_found(self):
+        assert_that(
+            calling(self.dao.export.update_shard).with_args(uuid.uuid4(), 0),
+            raises(ExportNotFoundException),
+        )
+
+    def test_iter_recording_pages(self):
+        export = Export(
+            tenant_uuid=MASTER_TENANT,
+            user_uuid=uuid.uuid4(),
+            requested_at=dt.now(),
+            status='pending',
+            recordings=[
+                ExportRecording(
+                    index=index,
+                    recording_uuid=uuid.uuid4(),
+                    call_log_id=10,
+                    filename=f'{index}.wav',
+                    path=f'/tmp/{index}.wav',
+                )
+                for index in range(6)
+            ],
+        )
+        export = self.dao.export.create(export)
+
+        result = list(self.dao.export.iter_recording_pages(export.uuid, range(1, 6), 2))
+
+        assert_that(
+            [[recording.index for recording in page] for page in result],
+            contains_exactly([1, 2], [3, 4], [5]),
+        )
+        assert_that(
+            result[0][0],
+            has_properties(index=1, archive_name='10/1.wav', path='/tmp/1.wav'),
+        )
+
+        self.session.query(Export).delete()
+        self.session.commit()
+
+    def test_count_recordings(self):
+        export = Export(
+            tenant_uuid=MASTER_TENANT,
+            user_uuid=uuid.uuid4(),
+            requested_at=dt.now(),
+            status='finished',
+            delivery='stream',
+            recordings=[
+                ExportRecording(
+                    index=index,
+                    recording_uuid=uuid.uuid4(),
+                    call_log_id=10,
+                    filename=f'{index}.wav',
+                    path=f'/tmp/{index}.wav',
+                )
+                for index in range(3)
+            ],
+        )
+        export = self.dao.export.create(export)
+
+        result = self.dao.export.count_recordings(export.uuid)
+
+        assert_that(result, equal_to(3))
+        assert_that(self.dao.export.count_recordings(uuid.uuid4()), equal_to(0))
+
+        self.session.query(Export).delete()
+        self.session.commit()
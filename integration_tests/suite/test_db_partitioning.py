@@ -0,0 +1,120 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from contextlib import contextmanager
+from datetime import datetime as dt
+from datetime import timezone as tz
+
+from hamcrest import assert_that, contains_inanyorder, empty, equal_to
+
+from wazo_call_logd.database import partitioning
+
+from .helpers.base import DBIntegrationTest
+from .helpers.database import DatabaseQueries
+
+NOW = dt(2026, 3, 15, tzinfo=tz.utc)
+TABLES = [table for table, _, _ in partitioning.PARTITIONED_TABLES]
+
+
+class TestPartitioning(DBIntegrationTest):
+    @contextmanager
+    def rolled_back(self):
+        # NOTE: the conversion cannot be reverted, it is rolled back instead
+        with self.database.connect() as connection:
+            transaction = connection.begin()
+            try:
+                yield connection
+            finally:
+                transaction.rollback()
+
+    def _insert_call_log(self, connection, date):
+        queries = DatabaseQueries(connection)
+        call_log_id = queries.insert_call_log(date=date)
+        queries.insert_recording(
+            call_log_id=call_log_id,
+            start_time=date,
+            end_time=date,
+            path='/tmp/recording.wav',
+        )
+        return call_log_id
+
+    def _partitions(self, connection, table):
+        return [name for name, _ in partitioning._partitions(connection, table)]
+
+    def _count(self, connection, table):
+        query = f'SELECT count(*) FROM {table}'
+        return connection.exec_driver_sql(query).scalar()
+
+    def test_convert(self):
+        with self.rolled_back() as connection:
+            self._insert_call_log(connection, dt(2026, 2, 1, tzinfo=tz.utc))
+
+            partitioning.convert(connection, months_ahead=1, now=NOW)
+
+            assert_that(partitioning.is_partitioned(connection), equal_to(True))
+            for table in TABLES:
+                assert_that(
+                    self._partitions(connection, table),
+                    contains_inanyorder(
+                        f'{table}_legacy', f'{table}_default', f'{table}_p202604'
+                    ),
+                )
+            assert_that(self._count(connection, 'call_logd_call_log'), equal_to(1))
+            assert_that(self._count(connection, 'call_logd_recording'), equal_to(1))
+
+            self._insert_call_log(connection, dt(2026, 4, 2, tzinfo=tz.utc))
+            for table in ('call_logd_call_log_p202604', 'call_logd_recording_p202604'):
+                assert_that(self._count(connection, table), equal_to(1))
+
+            partitioning.convert(connection, months_ahead=1, now=NOW)
+            assert_that(
+                self._partitions(connection, 'call_logd_call_log'),
+                contains_inanyorder(
+                    'call_logd_call_log_legacy',
+                    'call_logd_call_log_default',
+                    'call_logd_call_log_p202604',
+                ),
+            )
+
+    def test_create_partitions(self):
+        with self.rolled_back() as connection:
+            assert_that(partitioning.create_partitions(connection), empty())
+
+            partitioning.convert(connection, months_ahead=0, now=NOW)
+
+            result = partitioning.create_partitions(connection, 2, NOW)
+
+            assert_that(
+                result,
+                contains_inanyorder(
+                    *(
+                        f'{table}_p{month}'
+                        for table in TABLES
+                        for month in ('202604', '202605')
+                    )
+                ),
+            )
+            assert_that(partitioning.create_partitions(connection, 2, NOW), empty())
+
+    def test_drop_partitions_before(self):
+        with self.rolled_back() as connection:
+            assert_that(partitioning.drop_partitions_before(connection, NOW), empty())
+
+            self._insert_call_log(connection, dt(2026, 2, 1, tzinfo=tz.utc))
+            partitioning.convert(connection, months_ahead=1, now=NOW)
+            self._insert_call_log(connection, dt(2026, 4, 2, tzinfo=tz.utc))
+            upper_bound = partitioning.expired_upper_bound(
+                connection, dt(2026, 4, 15, tzinfo=tz.utc)
+            )
+            assert_that(upper_bound, equal_to(dt(2026, 4, 1, tzinfo=tz.utc)))
+
+            result = partitioning.drop_partitions_before(connection, upper_bound)
+
+            assert_that(result, equal_to(['call_logd_call_log_legacy']))
+            for table in TABLES:
+                assert_that(
+                    self._partitions(connection, table),
+                    contains_inanyorder(f'{table}_default', f'{table}_p202604'),
+                )
+            assert_that(self._count(connection, 'call_logd_call_log'), equal_to(1))
+            assert_that(self._count(connection, 'call_logd_recording'), equal_to(1))
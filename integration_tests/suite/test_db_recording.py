@@ -1,15 +1,22 @@
-# Copyright 2020-2023 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2020-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 import uuid
 from datetime import timedelta as td
 from datetime import timezone as tz
 
-from hamcrest import assert_that, contains_inanyorder, has_properties, none
+from hamcrest import (
+    assert_that,
+    contains_exactly,
+    contains_inanyorder,
+    has_properties,
+    none,
+)
 
 from wazo_call_logd.database.models import Recording
 
 from .helpers.base import DBIntegrationTest
+from .helpers.constants import MASTER_TENANT, OTHER_TENANT
 from .helpers.database import call_log, recording
 
 
@@ -71,6 +78,27 @@ class TestRecording(DBIntegrationTest):
             ),
         )
 
+    @call_log(**{'id': 1}, tenant_uuid=MASTER_TENANT)
+    @call_log(**{'id': 2}, tenant_uuid=OTHER_TENANT)
+    @recording(call_log_id=1, path='rec1')
+    @recording(call_log_id=1, path=None)
+    @recording(call_log_id=2, path='rec3')
+    def test_delete_media_by_call_log_ids_and_tenant_uuids(self, rec1, rec2, rec3):
+        result = self.dao.recording.delete_media_by(
+            call_log_ids=[1, 2], tenant_uuids=[MASTER_TENANT]
+        )
+
+        assert_that(result, contains_exactly((1, rec1['uuid'], 'rec1')))
+        result = self.session.query(Recording).all()
+        assert_that(
+            result,
+            contains_inanyorder(
+                has_properties(uuid=rec1['uuid'], path=None),
+                has_properties(uuid=rec2['uuid'], path=None),
+                has_properties(uuid=rec3['uuid'], path='rec3'),
+            ),
+        )
+
     @call_log(**{'id': 1})
     @call_log(**{'id': 2})
     @recording(call_log_id=1)
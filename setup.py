@@ -1,5 +1,5 @@
 #!/usr/bin/env python3
-# Copyright 2017-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2017-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from setuptools import find_packages, setup
@@ -21,6 +21,8 @@ setup(
         'console_scripts': [
             'wazo-call-logd=wazo_call_logd.main:main',
             'wazo-call-logd-init-db=wazo_call_logd.init_db:main',
+            'wazo-call-logd-partition-db=wazo_call_logd.partition_db:main',
+            'wazo-call-logd-rollup-db=wazo_call_logd.rollup_db:main',
             'wazo-call-logd-sync-db=wazo_call_logd.sync_db:main',
             'wazo-call-logd-upgrade-db=wazo_call_logd.main:upgrade_db',
             'wazo-call-logs=wazo_call_logd.main_sweep:main',
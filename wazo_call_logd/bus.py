@@ -1,4 +1,4 @@
-# Copyright 2022-2024 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2022-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from wazo_bus.consumer import BusConsumer as BaseConsumer
@@ -9,7 +9,7 @@ from wazo_bus.resources.call_logs.events import (
 )
 from xivo.status import Status
 
-from wazo_call_logd.plugins.cdr.schemas import CDRSchema
+from wazo_call_logd.plugins.cdr.serializers import CDRSerializer
 
 
 class BusConsumer(BaseConsumer):
@@ -32,11 +32,11 @@ class BusPublisher(BasePublisher):
 
     def publish_call_log(self, *call_logs):
         for call_log in call_logs:
-            payload = CDRSchema().dump(call_log)
+            payload = CDRSerializer().dump(call_log)
             event = CallLogCreatedEvent(payload, call_log.tenant_uuid)
             super().publish(event)
 
-            user_payload = CDRSchema(exclude=['tags']).dump(call_log)
+            user_payload = CDRSerializer(exclude=('tags',)).dump(call_log)
             for participant in call_log.participants:
                 user_event = CallLogUserCreatedEvent(
                     user_payload, call_log.tenant_uuid, participant.user_uuid
@@ -1,4 +1,4 @@
-# Copyright 2021-2024 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2021-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from __future__ import annotations
@@ -7,6 +7,7 @@ import logging
 import multiprocessing
 
 from celery import Celery
+from kombu import Exchange, Queue
 from xivo.status import Status
 
 app = Celery()
@@ -14,21 +15,55 @@ app = Celery()
 logger = logging.getLogger(__name__)
 
 WORKER_NAME = 'call-logd'
+DEFAULT_WORK_CLASS = 'default'
+WORKER_OPTIONS = (
+    ('--prefetch-multiplier', 'prefetch_multiplier'),
+    ('--max-tasks-per-child', 'max_tasks_per_child'),
+    ('--max-memory-per-child', 'max_memory_per_child'),
+)
+
+_queue_names: dict[str, str] = {}
+
+
+def work_queues(config) -> dict[str, dict]:
+    """
+    Queues by class of work. The default class is configured at the top of the
+    celery section, the other classes in its `queues`.
+    """
+    celery_config = config['celery']
+    return {DEFAULT_WORK_CLASS: celery_config, **celery_config['queues']}
+
+
+def route_task(name, args, kwargs, options, task=None, **kw):
+    # NOTE: tasks declare their class of work, tasks without one go to the
+    # default queue
+    work_class = getattr(task, 'work_class', None)
+    if queue_name := _queue_names.get(work_class):
+        return {'queue': queue_name}
+    return None
 
 
 def configure(config):
+    queues = work_queues(config)
+    _queue_names.clear()
+    _queue_names.update(
+        {work_class: queue['queue_name'] for work_class, queue in queues.items()}
+    )
+    exchange = Exchange(config['celery']['exchange_name'], type='direct')
+
     app.conf.accept_content = ['json']
     app.conf.broker_url = config['celery']['broker']
     app.conf.task_default_exchange = config['celery']['exchange_name']
     app.conf.task_default_queue = config['celery']['queue_name']
+    app.conf.task_queues = [
+        Queue(name, exchange, routing_key=name) for name in _queue_names.values()
+    ]
+    app.conf.task_routes = (route_task,)
     app.conf.task_ignore_result = True
     app.conf.task_serializer = 'json'
     app.conf.worker_hijack_root_logger = False
     app.conf.worker_loglevel = logging.getLevelName(config['log_level']).upper()
 
-    app.conf.worker_max_tasks_per_child = 1_000
-    app.conf.worker_max_memory_per_child = 100_000
-
 
 def start_celery(argv: tuple[str, ...]) -> int | None:
     """
@@ -49,26 +84,42 @@ def start_celery(argv: tuple[str, ...]) -> int | None:
         celery.params[0].default = None
 
 
+def _worker_name(work_class):
+    if work_class == DEFAULT_WORK_CLASS:
+        return WORKER_NAME
+    return f'{WORKER_NAME}-{work_class}'
+
+
 def spawn_workers(config):
+    """Starts one worker per class of work, consuming only its queue"""
     logger.debug('Starting Celery workers...')
-    argv = [
-        'worker',
-        # NOTE(sileht): setproctitle must be installed to have the celery
-        # process well named like:
-        #   celeryd: call-logd@<hostname>:MainProcess
-        #   celeryd: call-logd@<hostname>:Worker-*
-        '--loglevel',
-        logging.getLevelName(config['log_level']).upper(),
-        '--hostname',
-        f'{WORKER_NAME}@%h',
-        '--autoscale',
-        f"{config['celery']['worker_max']},{config['celery']['worker_min']}",
-        '--pidfile',
-        config['celery']['worker_pid_file'],
-    ]
-    process = multiprocessing.Process(target=start_celery, args=(argv,))
-    process.start()
-    return process
+    processes = []
+    for work_class, queue in work_queues(config).items():
+        argv = [
+            'worker',
+            # NOTE(sileht): setproctitle must be installed to have the celery
+            # process well named like:
+            #   celeryd: call-logd@<hostname>:MainProcess
+            #   celeryd: call-logd@<hostname>:Worker-*
+            '--loglevel',
+            logging.getLevelName(config['log_level']).upper(),
+            '--hostname',
+            f'{_worker_name(work_class)}@%h',
+            '--queues',
+            queue['queue_name'],
+            '--autoscale',
+            f"{queue['worker_max']},{queue['worker_min']}",
+            '--pidfile',
+            queue['worker_pid_file'],
+        ]
+        for option, key in WORKER_OPTIONS:
+            argv.extend([option, str(queue[key])])
+        process = multiprocessing.Process(
+            target=start_celery, args=(argv,), name=f'celery-{work_class}'
+        )
+        process.start()
+        processes.append(process)
+    return processes
 
 
 def provide_status(status):
@@ -92,8 +143,31 @@ def provide_status(status):
 
     logger.debug('Celery workers status: %s', workers_status)
 
-    ok = any(
-        worker_name.startswith(WORKER_NAME) and worker_status.get('ok') == 'pong'
+    answered = {
+        worker_name.split('@')[0]
         for worker_name, worker_status in workers_status.items()
-    )
+        if worker_status.get('ok') == 'pong'
+    }
+    queues_status = {}
+    for work_class, queue_name in _queue_names.items():
+        queue_status = {
+            'status': Status.ok if _worker_name(work_class) in answered else Status.fail
+        }
+        queue_status.update(_queue_depth(queue_name))
+        queues_status[work_class] = queue_status
+
+    ok = all(queue['status'] == Status.ok for queue in queues_status.values())
     status['task_queue']['status'] = Status.ok if ok else Status.fail
+    status['task_queue']['queues'] = queues_status
+
+
+def _queue_depth(queue_name):
+    try:
+        with app.connection_for_read() as connection:
+            _, messages, consumers = connection.default_channel.queue_declare(
+                queue=queue_name, passive=True
+            )
+    except Exception as e:
+        logger.debug('Error while inspecting queue %s: %s', queue_name, e)
+        return {}
+    return {'messages': messages, 'consumers': consumers}
@@ -1,4 +1,4 @@
-# Copyright 2017-2023 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2017-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 import logging
@@ -21,8 +21,9 @@ from wazo_call_logd.writer import CallLogsWriter
 
 from .auth import init_master_tenant
 from .bus import BusConsumer, BusPublisher
-from .database.helpers import new_db_session
+from .database.helpers import new_db_session, provide_pool_status
 from .database.queries import DAO
+from .database.replica import ReadReplica
 from .http_server import HTTPServer, api, app
 
 logger = logging.getLogger(__name__)
@@ -32,9 +33,15 @@ class Controller:
     def __init__(self, config):
         self.config = config
         self._stopping_thread = None
-        DBSession = new_db_session(config['db_uri'])
-        CELDBSession = new_db_session(config['cel_db_uri'])
-        self.dao = DAO(DBSession, CELDBSession)
+        DBSession = new_db_session(config['db_uri'], config['db_pool'])
+        CELDBSession = new_db_session(config['cel_db_uri'], config['cel_db_pool'])
+        self._db_sessions = {'db': DBSession, 'cel_db': CELDBSession}
+        replica = None
+        if config['db_read_uri']:
+            ReadSession = new_db_session(config['db_read_uri'], config['db_read_pool'])
+            self._db_sessions['db_read'] = ReadSession
+            replica = ReadReplica(ReadSession, config['db_read_max_lag'])
+        self.dao = DAO(DBSession, CELDBSession, replica)
         writer = CallLogsWriter(self.dao)
 
         # NOTE(afournier): it is important to load the tasks before configuring the Celery app
@@ -45,10 +52,11 @@ class Controller:
                 'config': self.config,
                 'dao': self.dao,
                 'app': celery.app,
+                'writer': writer,
             },
         )
         celery.configure(config)
-        self._celery_process = celery.spawn_workers(config)
+        self._celery_processes = celery.spawn_workers(config)
 
         auth_client = AuthClient(**config['auth'])
         confd_client = ConfdClient(**config['confd'])
@@ -100,6 +108,9 @@ class Controller:
         self.status_aggregator.add_provider(self.bus_consumer.provide_status)
         self.status_aggregator.add_provider(self.token_status.provide_status)
         self.status_aggregator.add_provider(celery.provide_status)
+        self.status_aggregator.add_provider(
+            partial(provide_pool_status, self._db_sessions)
+        )
         self._update_db_from_config_file()
 
         try:
@@ -108,8 +119,10 @@ class Controller:
                     self.http_server.run()
         finally:
             logger.info('Stopping wazo-call-logd...')
-            self._celery_process.terminate()
-            self._celery_process.join()
+            for process in self._celery_processes:
+                process.terminate()
+            for process in self._celery_processes:
+                process.join()
             if self._stopping_thread:
                 self._stopping_thread.join()
 
@@ -0,0 +1,29 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""add export shard processed count
+
+Revision ID: 2d8a6f91c0e4
+Revises: b3e5d0c47a21
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '2d8a6f91c0e4'
+down_revision = 'b3e5d0c47a21'
+
+EXPORT_SHARD_TABLE = 'call_logd_export_shard'
+
+
+def upgrade():
+    op.add_column(
+        EXPORT_SHARD_TABLE,
+        sa.Column('processed_count', sa.Integer, nullable=False, server_default='0'),
+    )
+
+
+def downgrade():
+    op.drop_column(EXPORT_SHARD_TABLE, 'processed_count')
@@ -0,0 +1,36 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""add export compression and statistics
+
+Revision ID: 4f1c2a7e8d3b
+Revises: 9bb9acd677dc
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '4f1c2a7e8d3b'
+down_revision = '9bb9acd677dc'
+
+EXPORT_TABLE = 'call_logd_export'
+
+
+def upgrade():
+    op.add_column(EXPORT_TABLE, sa.Column('compression', sa.String(32)))
+    op.add_column(EXPORT_TABLE, sa.Column('compression_level', sa.Integer))
+    op.add_column(EXPORT_TABLE, sa.Column('started_at', sa.DateTime(timezone=True)))
+    op.add_column(EXPORT_TABLE, sa.Column('finished_at', sa.DateTime(timezone=True)))
+    op.add_column(EXPORT_TABLE, sa.Column('media_size', sa.BigInteger))
+    op.add_column(EXPORT_TABLE, sa.Column('size', sa.BigInteger))
+
+
+def downgrade():
+    op.drop_column(EXPORT_TABLE, 'size')
+    op.drop_column(EXPORT_TABLE, 'media_size')
+    op.drop_column(EXPORT_TABLE, 'finished_at')
+    op.drop_column(EXPORT_TABLE, 'started_at')
+    op.drop_column(EXPORT_TABLE, 'compression_level')
+    op.drop_column(EXPORT_TABLE, 'compression')
@@ -0,0 +1,29 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""add export fingerprint
+
+Revision ID: 5e1d9a4f7b36
+Revises: c6f07d3e9b12
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '5e1d9a4f7b36'
+down_revision = 'c6f07d3e9b12'
+
+EXPORT_TABLE = 'call_logd_export'
+FINGERPRINT_INDEX = 'call_logd_export__idx__tenant_uuid_fingerprint'
+
+
+def upgrade():
+    op.add_column(EXPORT_TABLE, sa.Column('fingerprint', sa.String(64)))
+    op.create_index(FINGERPRINT_INDEX, EXPORT_TABLE, ['tenant_uuid', 'fingerprint'])
+
+
+def downgrade():
+    op.drop_index(FINGERPRINT_INDEX, EXPORT_TABLE)
+    op.drop_column(EXPORT_TABLE, 'fingerprint')
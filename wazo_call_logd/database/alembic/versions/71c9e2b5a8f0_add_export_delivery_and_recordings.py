@@ -0,0 +1,55 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""add export delivery and recordings
+
+Revision ID: 71c9e2b5a8f0
+Revises: 2d8a6f91c0e4
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy_utils import UUIDType
+
+# revision identifiers, used by Alembic.
+revision = '71c9e2b5a8f0'
+down_revision = '2d8a6f91c0e4'
+
+EXPORT_TABLE = 'call_logd_export'
+EXPORT_RECORDING_TABLE = 'call_logd_export_recording'
+DELIVERY_CHECK = 'call_logd_export_delivery_check'
+
+
+def upgrade():
+    op.add_column(
+        EXPORT_TABLE,
+        sa.Column('delivery', sa.String(32), nullable=False, server_default='archive'),
+    )
+    op.create_check_constraint(
+        DELIVERY_CHECK, EXPORT_TABLE, "delivery IN ('archive', 'stream')"
+    )
+    op.create_table(
+        EXPORT_RECORDING_TABLE,
+        sa.Column(
+            'export_uuid',
+            UUIDType(),
+            sa.ForeignKey(
+                'call_logd_export.uuid',
+                name='call_logd_export_recording_export_uuid_fkey',
+                ondelete='CASCADE',
+            ),
+            primary_key=True,
+        ),
+        sa.Column('index', sa.Integer, primary_key=True),
+        sa.Column('recording_uuid', UUIDType(), nullable=False),
+        sa.Column('call_log_id', sa.Integer, nullable=False),
+        sa.Column('filename', sa.Text, nullable=False),
+        sa.Column('path', sa.Text, nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table(EXPORT_RECORDING_TABLE)
+    op.drop_constraint(DELIVERY_CHECK, EXPORT_TABLE)
+    op.drop_column(EXPORT_TABLE, 'delivery')
@@ -0,0 +1,51 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""set legacy exports in error
+
+Revision ID: 8a3f6c2d91e5
+Revises: 5e1d9a4f7b36
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '8a3f6c2d91e5'
+down_revision = '5e1d9a4f7b36'
+
+EXPORT_TABLE = 'call_logd_export'
+EXPORT_SHARD_TABLE = 'call_logd_export_shard'
+EXPORT_RECORDING_TABLE = 'call_logd_export_recording'
+# NOTE: recording exports queued before the manifest have no recordings, their
+# tasks carry the recordings and are ignored by the workers
+LEGACY_EXPORTS = f'''
+    SELECT uuid FROM {EXPORT_TABLE}
+    WHERE status IN ('pending', 'processing')
+    AND type = 'recording'
+    AND delivery = 'archive'
+    AND NOT EXISTS (
+        SELECT 1 FROM {EXPORT_RECORDING_TABLE}
+        WHERE {EXPORT_RECORDING_TABLE}.export_uuid = {EXPORT_TABLE}.uuid
+    )
+'''
+
+
+def upgrade():
+    op.execute(
+        f'''
+        UPDATE {EXPORT_SHARD_TABLE} SET status = 'error', finished_at = now()
+        WHERE status IN ('pending', 'processing')
+        AND export_uuid IN ({LEGACY_EXPORTS})
+        '''
+    )
+    op.execute(
+        f'''
+        UPDATE {EXPORT_TABLE} SET status = 'error', finished_at = now()
+        WHERE uuid IN ({LEGACY_EXPORTS})
+        '''
+    )
+
+
+def downgrade():
+    pass
@@ -0,0 +1,58 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""add last call table
+
+Revision ID: 8e701d2ebf9b
+Revises: fc6097b87ff6
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy_utils import UUIDType
+
+# revision identifiers, used by Alembic.
+revision = '8e701d2ebf9b'
+down_revision = 'fc6097b87ff6'
+
+LAST_CALL_TABLE = 'call_logd_last_call'
+
+
+def upgrade():
+    op.create_table(
+        LAST_CALL_TABLE,
+        sa.Column('user_uuid', UUIDType(), primary_key=True),
+        sa.Column('peer_exten', sa.String(255), primary_key=True),
+        sa.Column('call_log_id', sa.Integer(), nullable=False),
+        sa.Column('call_log_date', sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index(
+        'call_logd_last_call__idx__call_log_id', LAST_CALL_TABLE, ['call_log_id']
+    )
+    op.create_index(
+        'call_logd_last_call__idx__call_log_date', LAST_CALL_TABLE, ['call_log_date']
+    )
+    op.execute(
+        f'''
+        INSERT INTO {LAST_CALL_TABLE} (user_uuid, peer_exten, call_log_id, call_log_date)
+        SELECT DISTINCT ON (participant.user_uuid, peer_exten)
+            participant.user_uuid,
+            COALESCE(
+                CASE WHEN participant.role = 'source'
+                THEN call_log.requested_exten
+                ELSE call_log.source_exten END,
+                ''
+            ) AS peer_exten,
+            call_log.id,
+            call_log.date
+        FROM call_logd_call_log_participant AS participant
+        JOIN call_logd_call_log AS call_log
+        ON call_log.id = participant.call_log_id
+        ORDER BY participant.user_uuid, peer_exten, call_log.id DESC
+        '''
+    )
+
+
+def downgrade():
+    op.drop_table(LAST_CALL_TABLE)
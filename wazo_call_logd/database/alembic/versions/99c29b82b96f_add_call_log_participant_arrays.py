@@ -0,0 +1,63 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""add participant user_uuids and tags arrays on call logs
+
+Revision ID: 99c29b82b96f
+Revises: d25356207d09
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
+
+# revision identifiers, used by Alembic.
+revision = '99c29b82b96f'
+down_revision = 'd25356207d09'
+
+CALL_LOG_TABLE = 'call_logd_call_log'
+USER_UUIDS_INDEX = 'call_logd_call_log__idx__user_uuids'
+TAGS_INDEX = 'call_logd_call_log__idx__tags'
+
+
+def upgrade():
+    op.add_column(
+        CALL_LOG_TABLE,
+        sa.Column('user_uuids', ARRAY(UUID), nullable=False, server_default='{}'),
+    )
+    op.add_column(
+        CALL_LOG_TABLE,
+        sa.Column('tags', ARRAY(sa.String(128)), nullable=False, server_default='{}'),
+    )
+    # NOTE: same content and ordering as CallLog.denormalize_participants
+    op.execute(
+        '''
+        UPDATE call_logd_call_log SET
+            user_uuids = ARRAY(
+                SELECT DISTINCT participant.user_uuid
+                FROM call_logd_call_log_participant AS participant
+                WHERE participant.call_log_id = call_logd_call_log.id
+                ORDER BY participant.user_uuid
+            ),
+            tags = ARRAY(
+                SELECT DISTINCT tag COLLATE "C"
+                FROM call_logd_call_log_participant AS participant,
+                    unnest(participant.tags) AS tag
+                WHERE participant.call_log_id = call_logd_call_log.id
+                ORDER BY tag COLLATE "C"
+            )
+        WHERE id IN (SELECT call_log_id FROM call_logd_call_log_participant)
+        '''
+    )
+    op.create_index(
+        USER_UUIDS_INDEX, CALL_LOG_TABLE, ['user_uuids'], postgresql_using='gin'
+    )
+    op.create_index(TAGS_INDEX, CALL_LOG_TABLE, ['tags'], postgresql_using='gin')
+
+
+def downgrade():
+    op.drop_index(TAGS_INDEX, table_name=CALL_LOG_TABLE)
+    op.drop_index(USER_UUIDS_INDEX, table_name=CALL_LOG_TABLE)
+    op.drop_column(CALL_LOG_TABLE, 'tags')
+    op.drop_column(CALL_LOG_TABLE, 'user_uuids')
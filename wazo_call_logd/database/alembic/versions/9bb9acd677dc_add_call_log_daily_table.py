@@ -0,0 +1,76 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""add call log daily table
+
+Revision ID: 9bb9acd677dc
+Revises: 8e701d2ebf9b
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy_utils import UUIDType
+
+# revision identifiers, used by Alembic.
+revision = '9bb9acd677dc'
+down_revision = '8e701d2ebf9b'
+
+CALL_LOG_DAILY_TABLE = 'call_logd_call_log_daily'
+ALL_USERS = '00000000-0000-0000-0000-000000000000'
+
+
+def upgrade():
+    op.create_table(
+        CALL_LOG_DAILY_TABLE,
+        sa.Column(
+            'tenant_uuid',
+            UUIDType(),
+            sa.ForeignKey(
+                'call_logd_tenant.uuid',
+                name='call_logd_call_log_daily_tenant_uuid_fkey',
+                ondelete='CASCADE',
+            ),
+            primary_key=True,
+        ),
+        sa.Column('day', sa.Date(), primary_key=True),
+        sa.Column('user_uuid', UUIDType(), primary_key=True),
+        sa.Column('direction', sa.String(255), primary_key=True),
+        sa.Column('call_status', sa.String(32), primary_key=True),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('duration', sa.BigInteger(), nullable=False),
+        sa.Column('duration_max', sa.Integer()),
+    )
+    op.execute(
+        f'''
+        WITH call_log AS (
+            SELECT
+                tenant_uuid,
+                (date AT TIME ZONE 'UTC')::date AS day,
+                user_uuids,
+                COALESCE(direction, '') AS direction,
+                call_status,
+                GREATEST(FLOOR(EXTRACT(EPOCH FROM duration)), 0) AS duration
+            FROM call_logd_call_log
+        )
+        INSERT INTO {CALL_LOG_DAILY_TABLE} (
+            tenant_uuid, day, user_uuid, direction, call_status,
+            count, duration, duration_max
+        )
+        SELECT
+            tenant_uuid, day, '{ALL_USERS}'::uuid, direction, call_status,
+            COUNT(*), COALESCE(SUM(duration), 0), MAX(duration)
+        FROM call_log
+        GROUP BY tenant_uuid, day, direction, call_status
+        UNION ALL
+        SELECT
+            tenant_uuid, day, user_uuid, direction, call_status,
+            COUNT(*), COALESCE(SUM(duration), 0), MAX(duration)
+        FROM call_log, UNNEST(user_uuids) AS user_uuid
+        GROUP BY tenant_uuid, day, user_uuid, direction, call_status
+        '''
+    )
+
+
+def downgrade():
+    op.drop_table(CALL_LOG_DAILY_TABLE)
@@ -0,0 +1,60 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""add export shard table
+
+Revision ID: b3e5d0c47a21
+Revises: 4f1c2a7e8d3b
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy_utils import UUIDType
+
+# revision identifiers, used by Alembic.
+revision = 'b3e5d0c47a21'
+down_revision = '4f1c2a7e8d3b'
+
+EXPORT_SHARD_TABLE = 'call_logd_export_shard'
+STATUSES = ('pending', 'processing', 'finished', 'deleted', 'error')
+
+
+def upgrade():
+    op.create_table(
+        EXPORT_SHARD_TABLE,
+        sa.Column(
+            'export_uuid',
+            UUIDType(),
+            sa.ForeignKey(
+                'call_logd_export.uuid',
+                name='call_logd_export_shard_export_uuid_fkey',
+                ondelete='CASCADE',
+            ),
+            primary_key=True,
+        ),
+        sa.Column('index', sa.Integer, primary_key=True),
+        sa.Column('status', sa.String(32), nullable=False),
+        sa.Column('recording_count', sa.Integer),
+        sa.Column('path', sa.Text),
+        sa.Column('started_at', sa.DateTime(timezone=True)),
+        sa.Column('finished_at', sa.DateTime(timezone=True)),
+        sa.Column('media_size', sa.BigInteger),
+        sa.Column('size', sa.BigInteger),
+        sa.CheckConstraint(
+            sa.column('status').in_(STATUSES),
+            name='call_logd_export_shard_status_check',
+        ),
+    )
+    # NOTE: exports queued before the upgrade are processed as a single shard
+    op.execute(
+        f'''
+        INSERT INTO {EXPORT_SHARD_TABLE} (export_uuid, index, status)
+        SELECT uuid, 0, 'pending' FROM call_logd_export
+        WHERE status IN ('pending', 'processing')
+        '''
+    )
+
+
+def downgrade():
+    op.drop_table(EXPORT_SHARD_TABLE)
@@ -0,0 +1,37 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""add export type, format and parameters
+
+Revision ID: c6f07d3e9b12
+Revises: 71c9e2b5a8f0
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import JSONB
+
+# revision identifiers, used by Alembic.
+revision = 'c6f07d3e9b12'
+down_revision = '71c9e2b5a8f0'
+
+EXPORT_TABLE = 'call_logd_export'
+TYPE_CHECK = 'call_logd_export_type_check'
+
+
+def upgrade():
+    op.add_column(
+        EXPORT_TABLE,
+        sa.Column('type', sa.String(32), nullable=False, server_default='recording'),
+    )
+    op.create_check_constraint(TYPE_CHECK, EXPORT_TABLE, "type IN ('recording', 'cdr')")
+    op.add_column(EXPORT_TABLE, sa.Column('format', sa.String(32)))
+    op.add_column(EXPORT_TABLE, sa.Column('parameters', JSONB))
+
+
+def downgrade():
+    op.drop_column(EXPORT_TABLE, 'parameters')
+    op.drop_column(EXPORT_TABLE, 'format')
+    op.drop_constraint(TYPE_CHECK, EXPORT_TABLE)
+    op.drop_column(EXPORT_TABLE, 'type')
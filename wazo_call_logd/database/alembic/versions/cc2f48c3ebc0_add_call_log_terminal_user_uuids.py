@@ -0,0 +1,60 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""add source and destination user_uuid columns on call logs
+
+Revision ID: cc2f48c3ebc0
+Revises: 99c29b82b96f
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import UUID
+
+# revision identifiers, used by Alembic.
+revision = 'cc2f48c3ebc0'
+down_revision = '99c29b82b96f'
+
+CALL_LOG_TABLE = 'call_logd_call_log'
+ROLES = ('source', 'destination')
+
+
+def _index_name(role):
+    return f'call_logd_call_log__idx__{role}_user_uuid'
+
+
+def upgrade():
+    for role in ROLES:
+        op.add_column(CALL_LOG_TABLE, sa.Column(f'{role}_user_uuid', UUID))
+    # NOTE: same selection as CallLog.denormalize_participants
+    op.execute(
+        '''
+        UPDATE call_logd_call_log SET
+            source_user_uuid = (
+                SELECT participant.user_uuid
+                FROM call_logd_call_log_participant AS participant
+                WHERE participant.call_log_id = call_logd_call_log.id
+                AND participant.role = 'source'
+                ORDER BY participant.answered DESC, participant.user_uuid DESC
+                LIMIT 1
+            ),
+            destination_user_uuid = (
+                SELECT participant.user_uuid
+                FROM call_logd_call_log_participant AS participant
+                WHERE participant.call_log_id = call_logd_call_log.id
+                AND participant.role = 'destination'
+                ORDER BY participant.answered DESC, participant.user_uuid DESC
+                LIMIT 1
+            )
+        WHERE id IN (SELECT call_log_id FROM call_logd_call_log_participant)
+        '''
+    )
+    for role in ROLES:
+        op.create_index(_index_name(role), CALL_LOG_TABLE, [f'{role}_user_uuid'])
+
+
+def downgrade():
+    for role in ROLES:
+        op.drop_index(_index_name(role), table_name=CALL_LOG_TABLE)
+        op.drop_column(CALL_LOG_TABLE, f'{role}_user_uuid')
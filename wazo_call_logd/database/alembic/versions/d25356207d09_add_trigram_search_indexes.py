@@ -0,0 +1,45 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""add trigram indexes on call log searched columns
+
+Revision ID: d25356207d09
+Revises: 0776735d0419
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'd25356207d09'
+down_revision = '0776735d0419'
+
+CALL_LOG_TABLE = 'call_logd_call_log'
+SEARCHED_COLUMNS = (
+    'source_name',
+    'source_exten',
+    'destination_name',
+    'destination_exten',
+)
+
+
+def _index_name(column):
+    return f'call_logd_call_log__idx__{column}_trgm'
+
+
+def upgrade():
+    # NOTE: pg_trgm is a trusted extension, the database owner may create it
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for column in SEARCHED_COLUMNS:
+        op.create_index(
+            _index_name(column),
+            CALL_LOG_TABLE,
+            [column],
+            postgresql_using='gin',
+            postgresql_ops={column: 'gin_trgm_ops'},
+        )
+
+
+def downgrade():
+    for column in SEARCHED_COLUMNS:
+        op.drop_index(_index_name(column), table_name=CALL_LOG_TABLE)
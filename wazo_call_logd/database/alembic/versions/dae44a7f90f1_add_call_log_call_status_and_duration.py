@@ -0,0 +1,67 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""add computed call_status and duration columns on call logs
+
+Revision ID: dae44a7f90f1
+Revises: cc2f48c3ebc0
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'dae44a7f90f1'
+down_revision = 'cc2f48c3ebc0'
+
+CALL_LOG_TABLE = 'call_logd_call_log'
+CALL_STATUS_INDEX = 'call_logd_call_log__idx__tenant_uuid_call_status_date'
+DURATION_INDEX = 'call_logd_call_log__idx__tenant_uuid_duration_date'
+CALL_STATUS_EXPRESSION = (
+    "CASE"
+    " WHEN blocked THEN 'blocked'"
+    " WHEN reached_voicemail AND date_answer IS NULL THEN 'voicemail'"
+    " WHEN date_answer IS NOT NULL THEN 'answered'"
+    " ELSE 'unknown' END"
+)
+
+
+def upgrade():
+    op.add_column(
+        CALL_LOG_TABLE,
+        sa.Column(
+            'call_status',
+            sa.String(32),
+            sa.Computed(CALL_STATUS_EXPRESSION, persisted=True),
+        ),
+    )
+    op.add_column(
+        CALL_LOG_TABLE,
+        sa.Column(
+            'duration',
+            sa.Interval,
+            sa.Computed('date_end - date_answer', persisted=True),
+        ),
+    )
+    op.create_index(
+        CALL_STATUS_INDEX,
+        CALL_LOG_TABLE,
+        ['tenant_uuid', 'call_status', sa.text('date DESC NULLS LAST')],
+    )
+    op.create_index(
+        DURATION_INDEX,
+        CALL_LOG_TABLE,
+        [
+            'tenant_uuid',
+            sa.text('duration DESC NULLS LAST'),
+            sa.text('date DESC NULLS LAST'),
+        ],
+    )
+
+
+def downgrade():
+    op.drop_index(DURATION_INDEX, table_name=CALL_LOG_TABLE)
+    op.drop_index(CALL_STATUS_INDEX, table_name=CALL_LOG_TABLE)
+    op.drop_column(CALL_LOG_TABLE, 'duration')
+    op.drop_column(CALL_LOG_TABLE, 'call_status')
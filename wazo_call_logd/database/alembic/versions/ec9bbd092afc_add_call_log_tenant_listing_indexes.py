@@ -0,0 +1,38 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""add call log tenant listing indexes
+
+Revision ID: ec9bbd092afc
+Revises: dae44a7f90f1
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'ec9bbd092afc'
+down_revision = 'dae44a7f90f1'
+
+CALL_LOG_TABLE = 'call_logd_call_log'
+DATE_INDEX = 'call_logd_call_log__idx__tenant_uuid_date_id'
+ID_INDEX = 'call_logd_call_log__idx__tenant_uuid_id'
+
+
+def upgrade():
+    # NOTE: DESC NULLS LAST, the DAO sorts with NULLS LAST when descending and
+    # NULLS FIRST when ascending, both are served by scanning in either direction
+    op.create_index(
+        DATE_INDEX,
+        CALL_LOG_TABLE,
+        ['tenant_uuid', sa.text('date DESC NULLS LAST'), 'id'],
+    )
+    op.create_index(
+        ID_INDEX, CALL_LOG_TABLE, ['tenant_uuid', sa.text('id DESC NULLS LAST')]
+    )
+
+
+def downgrade():
+    op.drop_index(ID_INDEX, table_name=CALL_LOG_TABLE)
+    op.drop_index(DATE_INDEX, table_name=CALL_LOG_TABLE)
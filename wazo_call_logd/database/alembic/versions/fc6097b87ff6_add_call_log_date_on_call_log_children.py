@@ -0,0 +1,78 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""add call_log_date on call log child tables
+
+Revision ID: fc6097b87ff6
+Revises: ec9bbd092afc
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'fc6097b87ff6'
+down_revision = 'ec9bbd092afc'
+
+CALL_LOG_TABLE = 'call_logd_call_log'
+CALL_LOG_UNIQUE = 'call_logd_call_log_id_date_key'
+RECORDING_TABLE = 'call_logd_recording'
+CHILD_TABLES = (
+    (
+        'call_logd_call_log_participant',
+        'call_logd_call_log_participant_call_log_id_fkey',
+    ),
+    (
+        'call_logd_call_log_destination',
+        'call_logd_call_log_destination_call_log_id_fkey',
+    ),
+    (RECORDING_TABLE, 'call_logd_recording_call_log_id_fkey'),
+)
+
+
+def upgrade():
+    op.create_unique_constraint(CALL_LOG_UNIQUE, CALL_LOG_TABLE, ['id', 'date'])
+    for table, foreign_key in CHILD_TABLES:
+        # NOTE: rows without call log are unreachable, they would only end up in
+        # the default partition once partitioned. The call log of the
+        # recordings is already required
+        if table != RECORDING_TABLE:
+            op.execute(f'DELETE FROM {table} WHERE call_log_id IS NULL')
+            op.alter_column(table, 'call_log_id', nullable=False)
+        op.add_column(table, sa.Column('call_log_date', sa.DateTime(timezone=True)))
+        op.execute(
+            f'''
+            UPDATE {table} SET call_log_date = call_log.date
+            FROM {CALL_LOG_TABLE} AS call_log
+            WHERE call_log.id = {table}.call_log_id
+            '''
+        )
+        op.alter_column(table, 'call_log_date', nullable=False)
+        op.drop_constraint(foreign_key, table, type_='foreignkey')
+        op.create_foreign_key(
+            foreign_key,
+            table,
+            CALL_LOG_TABLE,
+            ['call_log_id', 'call_log_date'],
+            ['id', 'date'],
+            ondelete='CASCADE',
+            onupdate='CASCADE',
+        )
+
+
+def downgrade():
+    for table, foreign_key in CHILD_TABLES:
+        op.drop_constraint(foreign_key, table, type_='foreignkey')
+        op.create_foreign_key(
+            foreign_key,
+            table,
+            CALL_LOG_TABLE,
+            ['call_log_id'],
+            ['id'],
+            ondelete='CASCADE',
+        )
+        op.drop_column(table, 'call_log_date')
+        if table != RECORDING_TABLE:
+            op.alter_column(table, 'call_log_id', nullable=True)
+    op.drop_constraint(CALL_LOG_UNIQUE, CALL_LOG_TABLE, type_='unique')
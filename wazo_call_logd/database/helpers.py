@@ -1,22 +1,125 @@
-# Copyright 2017-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2017-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 import logging
+import threading
+import time
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, exc, text
 from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.pool import QueuePool
 from tenacity import after_log, before_log, retry, stop_after_attempt, wait_fixed
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_POOL_CONFIG = {
+    'size': 10,
+    'max_overflow': 20,
+    'timeout': 30,
+    'recycle': None,
+    'statement_timeout': None,
+}
 
-def new_db_session(db_uri):
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+class PoolStatistics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record_wait(self, seconds, timed_out=False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def as_dict(self, pool):
+        with self._lock:
+            return {
+                'size': pool.size(),
+                'checked_out': pool.checkedout(),
+                'overflow': max(pool.overflow(), 0),
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'wait_total': round(self.wait_total, 6),
+                'wait_max': round(self.wait_max, 6),
+            }
+
+
+class StatisticsQueuePool(QueuePool):
+    def __init__(self, *args, statistics=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.statistics = statistics or PoolStatistics()
+
+    def _do_get(self):
+        start = time.monotonic()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.statistics.record_wait(time.monotonic() - start, timed_out=True)
+            raise
+        self.statistics.record_wait(time.monotonic() - start)
+        return connection
+
+    def recreate(self):
+        # NOTE: keep the statistics when the engine is disposed
+        pool = super().recreate()
+        pool.statistics = self.statistics
+        return pool
+
+
+def new_db_session(db_uri, pool_config=None):
     _Session = scoped_session(sessionmaker())
-    engine = create_engine(db_uri, pool_pre_ping=True)
-    _Session.configure(bind=engine)
+    _Session.configure(bind=get_engine(db_uri, pool_config))
     return _Session
 
 
+def get_engine(db_uri, pool_config=None):
+    # NOTE: sessions on the same database share a single pool, configured by the
+    # first of them
+    with _engines_lock:
+        if db_uri not in _engines:
+            _engines[db_uri] = _create_engine(db_uri, pool_config or {})
+        return _engines[db_uri]
+
+
+def _create_engine(db_uri, pool_config):
+    pool_config = dict(DEFAULT_POOL_CONFIG, **pool_config)
+    connect_args = {}
+    if statement_timeout := pool_config['statement_timeout']:
+        milliseconds = int(statement_timeout * 1000)
+        connect_args['options'] = f'-c statement_timeout={milliseconds}'
+    recycle = pool_config['recycle']
+    return create_engine(
+        db_uri,
+        poolclass=StatisticsQueuePool,
+        pool_pre_ping=True,
+        pool_size=pool_config['size'],
+        max_overflow=pool_config['max_overflow'],
+        pool_timeout=pool_config['timeout'],
+        pool_recycle=-1 if recycle is None else recycle,
+        connect_args=connect_args,
+    )
+
+
+def pool_status(Session):
+    pool = Session.bind.pool
+    return pool.statistics.as_dict(pool)
+
+
+def provide_pool_status(sessions, status):
+    for name, Session in sessions.items():
+        status['database_pools'][name] = pool_status(Session)
+
+
 @retry(
     stop=stop_after_attempt(60 * 5),
     wait=wait_fixed(1),
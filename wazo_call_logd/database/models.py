@@ -3,17 +3,38 @@
 
 from __future__ import annotations
 
+import os
+from datetime import datetime
 from datetime import timedelta as td
 from datetime import timezone as tz
 
-from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 from sqlalchemy.ext.associationproxy import association_proxy
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.ext.mutable import MutableList
 from sqlalchemy.orm import declarative_base, relationship
-from sqlalchemy.schema import CheckConstraint, Column, ForeignKey, Index
+from sqlalchemy.schema import (
+    CheckConstraint,
+    Column,
+    Computed,
+    ForeignKey,
+    ForeignKeyConstraint,
+    Index,
+    UniqueConstraint,
+)
 from sqlalchemy.sql import and_, case, select, text
-from sqlalchemy.types import Boolean, DateTime, Enum, Float, Integer, String, Text
+from sqlalchemy.types import (
+    BigInteger,
+    Boolean,
+    Date,
+    DateTime,
+    Enum,
+    Float,
+    Integer,
+    Interval,
+    String,
+    Text,
+)
 from sqlalchemy_utils import UUIDType, generic_repr
 
 Base = declarative_base()
@@ -64,6 +85,30 @@ class CallLog(Base):
     direction = Column(String(255))
     user_field = Column(String(255))
     conversation_id = Column(String(255))
+    # NOTE: denormalized from participants to filter without subqueries, see
+    # denormalize_participants
+    user_uuids = Column(
+        MutableList.as_mutable(ARRAY(UUIDType)), nullable=False, server_default='{}'
+    )
+    tags = Column(
+        MutableList.as_mutable(ARRAY(String(128))), nullable=False, server_default='{}'
+    )
+    source_user_uuid = Column(UUIDType)
+    destination_user_uuid = Column(UUIDType)
+    # NOTE: SQL mirror of CDRSchema._compute_fields, keep them in sync.
+    # Precedence: blocked > voicemail > answered > unknown
+    call_status = Column(
+        String(32),
+        Computed(
+            "CASE"
+            " WHEN blocked THEN 'blocked'"
+            " WHEN reached_voicemail AND date_answer IS NULL THEN 'voicemail'"
+            " WHEN date_answer IS NOT NULL THEN 'answered'"
+            " ELSE 'unknown' END",
+            persisted=True,
+        ),
+    )
+    duration = Column(Interval, Computed('date_end - date_answer', persisted=True))
 
     recordings = relationship(
         'Recording',
@@ -77,18 +122,19 @@ class CallLog(Base):
         'CallLogParticipant',
         primaryjoin='''and_(
             CallLogParticipant.call_log_id == CallLog.id,
+            CallLogParticipant.call_log_date == CallLog.date,
             CallLogParticipant.role == 'source'
         )''',
         viewonly=True,
         uselist=False,
     )
-    source_user_uuid = association_proxy('source_participant', 'user_uuid')
     source_line_id = association_proxy('source_participant', 'line_id')
 
     destination_details = relationship(
         'Destination',
         primaryjoin='''and_(
             Destination.call_log_id == CallLog.id,
+            Destination.call_log_date == CallLog.date,
         )''',
         uselist=True,
         cascade='all,delete-orphan',
@@ -107,25 +153,111 @@ class CallLog(Base):
         'CallLogParticipant',
         primaryjoin='''and_(
             CallLogParticipant.call_log_id == CallLog.id,
+            CallLogParticipant.call_log_date == CallLog.date,
             CallLogParticipant.role == 'destination'
         )''',
         order_by='desc(CallLogParticipant.answered), desc(CallLogParticipant.user_uuid)',
         viewonly=True,
         uselist=False,
     )
-    destination_user_uuid = association_proxy('destination_participant', 'user_uuid')
     destination_line_id = association_proxy('destination_participant', 'line_id')
 
     cel_ids = []
 
+    # NOTE: fetch the computed columns on insert, created call logs are
+    # expunged before being published
+    __mapper_args__ = {'eager_defaults': True}
+
     __table_args__ = (
+        # NOTE: referenced by the foreign keys of the child tables, which carry
+        # the call log date to be partitioned like call logs, see partitioning
+        UniqueConstraint('id', 'date', name='call_logd_call_log_id_date_key'),
         Index('call_logd_call_log__idx__conversation_id', 'conversation_id'),
+        Index(
+            'call_logd_call_log__idx__tenant_uuid_date_id',
+            'tenant_uuid',
+            date.desc().nullslast(),
+            'id',
+        ),
+        Index(
+            'call_logd_call_log__idx__tenant_uuid_id',
+            'tenant_uuid',
+            id.desc().nullslast(),
+        ),
+        Index(
+            'call_logd_call_log__idx__user_uuids', 'user_uuids', postgresql_using='gin'
+        ),
+        Index('call_logd_call_log__idx__tags', 'tags', postgresql_using='gin'),
+        Index('call_logd_call_log__idx__source_user_uuid', 'source_user_uuid'),
+        Index(
+            'call_logd_call_log__idx__destination_user_uuid', 'destination_user_uuid'
+        ),
+        Index(
+            'call_logd_call_log__idx__tenant_uuid_call_status_date',
+            'tenant_uuid',
+            'call_status',
+            date.desc().nullslast(),
+        ),
+        Index(
+            'call_logd_call_log__idx__tenant_uuid_duration_date',
+            'tenant_uuid',
+            duration.desc().nullslast(),
+            date.desc().nullslast(),
+        ),
+        *(
+            Index(
+                f'call_logd_call_log__idx__{column}_trgm',
+                column,
+                postgresql_using='gin',
+                postgresql_ops={column: 'gin_trgm_ops'},
+            )
+            for column in (
+                'source_name',
+                'source_exten',
+                'destination_name',
+                'destination_exten',
+            )
+        ),
         CheckConstraint(
             direction.in_(['inbound', 'internal', 'outbound']),
             name='call_logd_call_log_direction_check',
         ),
     )
 
+    def denormalize_participants(self):
+        self.user_uuids = sorted({str(p.user_uuid) for p in self.participants})
+        self.tags = sorted({tag for p in self.participants for tag in p.tags or ()})
+        source = self._terminal_participant('source')
+        self.source_user_uuid = source.user_uuid if source else None
+        destination = self._terminal_participant('destination')
+        self.destination_user_uuid = destination.user_uuid if destination else None
+
+    def last_calls(self):
+        # NOTE: same peer as CallLogParticipant.peer_exten, without loading
+        # participant.call_log
+        last_calls = {}
+        for participant in self.participants:
+            if participant.role == 'source':
+                peer_exten = self.requested_exten
+            else:
+                peer_exten = self.source_exten
+            last_call = LastCall(
+                user_uuid=participant.user_uuid,
+                peer_exten=peer_exten or '',
+                call_log_id=self.id,
+                call_log_date=self.date,
+            )
+            last_calls[(str(last_call.user_uuid), last_call.peer_exten)] = last_call
+        return list(last_calls.values())
+
+    def _terminal_participant(self, role):
+        # NOTE: same ordering as the destination_participant relationship
+        return max(
+            (p for p in self.participants if p.role == role),
+            key=lambda p: (bool(p.answered), str(p.user_uuid)),
+            default=None,
+        )
+
     @hybrid_property
     def requested_user_uuid(self):
         for participant in self.participants:
@@ -147,6 +279,16 @@ class CallLog(Base):
         )
 
 
+def _call_log_foreign_key(name):
+    return ForeignKeyConstraint(
+        ('call_log_id', 'call_log_date'),
+        ('call_logd_call_log.id', 'call_logd_call_log.date'),
+        name=name,
+        ondelete='CASCADE',
+        onupdate='CASCADE',
+    )
+
+
 @generic_repr
 class Destination(Base):
     __tablename__ = 'call_logd_call_log_destination'
@@ -157,19 +299,14 @@ class Destination(Base):
         primary_key=True,
     )
 
-    call_log_id = Column(
-        Integer,
-        ForeignKey(
-            'call_logd_call_log.id',
-            name='call_logd_call_log_destination_call_log_id_fkey',
-            ondelete='CASCADE',
-        ),
-    )
+    call_log_id = Column(Integer, nullable=False)
+    call_log_date = Column(DateTime(timezone=True), nullable=False)
 
     destination_details_key = Column(String(32), nullable=False)
     destination_details_value = Column(String(255), nullable=False)
 
     __table_args__ = (
+        _call_log_foreign_key('call_logd_call_log_destination_call_log_id_fkey'),
         Index('call_logd_call_log_destination__idx__uuid', 'uuid'),
         Index('call_logd_call_log_destination__idx__call_log_id', 'call_log_id'),
         CheckConstraint(
@@ -196,6 +333,7 @@ class Destination(Base):
 class CallLogParticipant(Base):
     __tablename__ = 'call_logd_call_log_participant'
     __table_args__ = (
+        _call_log_foreign_key('call_logd_call_log_participant_call_log_id_fkey'),
         Index('call_logd_call_log_participant__idx__user_uuid', 'user_uuid'),
         Index('call_logd_call_log_participant__idx__call_log_id', 'call_log_id'),
     )
@@ -205,14 +343,8 @@ class CallLogParticipant(Base):
         server_default=text('uuid_generate_v4()'),
         primary_key=True,
     )
-    call_log_id = Column(
-        Integer,
-        ForeignKey(
-            'call_logd_call_log.id',
-            name='call_logd_call_log_participant_call_log_id_fkey',
-            ondelete='CASCADE',
-        ),
-    )
+    call_log_id = Column(Integer, nullable=False)
+    call_log_date = Column(DateTime(timezone=True), nullable=False)
     user_uuid = Column(UUIDType, nullable=False)
     line_id = Column(Integer)
     role = Column(
@@ -256,7 +388,10 @@ class CallLogParticipant(Base):
 @generic_repr
 class Recording(Base):
     __tablename__ = 'call_logd_recording'
-    __table_args__ = (Index('call_logd_recording__idx__call_log_id', 'call_log_id'),)
+    __table_args__ = (
+        _call_log_foreign_key('call_logd_recording_call_log_id_fkey'),
+        Index('call_logd_recording__idx__call_log_id', 'call_log_id'),
+    )
 
     uuid = Column(
         UUIDType(),
@@ -266,15 +401,8 @@ class Recording(Base):
     start_time = Column(DateTime(timezone=True), nullable=False)
     end_time = Column(DateTime(timezone=True), nullable=False)
     path = Column(Text)
-    call_log_id = Column(
-        Integer(),
-        ForeignKey(
-            'call_logd_call_log.id',
-            name='call_logd_recording_call_log_id_fkey',
-            ondelete='CASCADE',
-        ),
-        nullable=False,
-    )
+    call_log_id = Column(Integer(), nullable=False)
+    call_log_date = Column(DateTime(timezone=True), nullable=False)
     conversation_id = association_proxy('call_log', 'conversation_id')
 
     @property
@@ -302,6 +430,53 @@ class Recording(Base):
     call_log = relationship(CallLog, uselist=False, viewonly=True)
 
 
+@generic_repr
+class LastCall(Base):
+    __tablename__ = 'call_logd_last_call'
+    # NOTE: no foreign key, rows are removed with their call log by the DAO and
+    # the purger and must not prevent dropping call log partitions
+    __table_args__ = (
+        Index('call_logd_last_call__idx__call_log_id', 'call_log_id'),
+        Index('call_logd_last_call__idx__call_log_date', 'call_log_date'),
+    )
+
+    user_uuid = Column(UUIDType, primary_key=True)
+    # NOTE: empty when the peer has no extension, columns of a primary key
+    # cannot be NULL
+    peer_exten = Column(String(255), primary_key=True)
+    call_log_id = Column(Integer, nullable=False)
+    call_log_date = Column(DateTime(timezone=True), nullable=False)
+
+
+@generic_repr
+class CallLogDaily(Base):
+    __tablename__ = 'call_logd_call_log_daily'
+    # NOTE: rows of ALL_USERS count every call log of the day once, the other
+    # rows count the call logs of each of their users, see queries.rollup
+
+    ALL_USERS = '00000000-0000-0000-0000-000000000000'
+
+    tenant_uuid = Column(
+        UUIDType,
+        ForeignKey(
+            'call_logd_tenant.uuid',
+            name='call_logd_call_log_daily_tenant_uuid_fkey',
+            ondelete='CASCADE',
+        ),
+        primary_key=True,
+    )
+    # NOTE: UTC day of the call log date
+    day = Column(Date, primary_key=True)
+    user_uuid = Column(UUIDType, primary_key=True)
+    # NOTE: empty when the call log has no direction, columns of a primary key
+    # cannot be NULL
+    direction = Column(String(255), primary_key=True)
+    call_status = Column(String(32), primary_key=True)
+    count = Column(Integer, nullable=False)
+    duration = Column(BigInteger, nullable=False)
+    duration_max = Column(Integer)
+
+
 @generic_repr
 class Retention(Base):
     __tablename__ = 'call_logd_retention'
@@ -339,6 +514,11 @@ class Config(Base):
     retention_recording_days_from_file = Column(Boolean)
 
 
+EXPORT_STATUSES = ['pending', 'processing', 'finished', 'deleted', 'error']
+EXPORT_DELIVERIES = ['archive', 'stream']
+EXPORT_TYPES = ['recording', 'cdr']
+
+
 @generic_repr
 class Export(Base):
     __tablename__ = 'call_logd_export'
@@ -361,23 +541,187 @@ class Export(Base):
     requested_at = Column(DateTime(timezone=True), nullable=False)
     status = Column(String(32), nullable=False)
     path = Column(Text)
+    compression = Column(String(32))
+    compression_level = Column(Integer)
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+    media_size = Column(BigInteger)
+    size = Column(BigInteger)
+    delivery = Column(
+        String(32), nullable=False, default='archive', server_default='archive'
+    )
+    type = Column(
+        String(32), nullable=False, default='recording', server_default='recording'
+    )
+    format = Column(String(32))
+    parameters = Column(JSONB)
+    fingerprint = Column(String(64))
+
+    recordings = relationship(
+        'ExportRecording',
+        order_by='ExportRecording.index',
+        cascade='all,delete-orphan',
+        passive_deletes=True,
+    )
+    shards = relationship(
+        'ExportShard',
+        order_by='ExportShard.index',
+        cascade='all,delete-orphan',
+        lazy='selectin',
+        passive_deletes=True,
+    )
+
+    @property
+    def recording_count(self):
+        return sum(shard.recording_count or 0 for shard in self.shards)
+
+    @property
+    def processed_count(self):
+        return sum(shard.processed_count or 0 for shard in self.shards)
+
+    @property
+    def progress(self):
+        if self.status == 'finished':
+            return 100.0
+        if not self.recording_count:
+            return 0.0
+        return 100.0 * self.processed_count / self.recording_count
+
+    @property
+    def eta(self):
+        # NOTE: extrapolated from the recordings processed since the start
+        processed_count = self.processed_count
+        if self.status != 'processing' or not (self.started_at and processed_count):
+            return None
+        now = datetime.now(tz.utc)
+        remaining_count = self.recording_count - processed_count
+        return now + (now - self.started_at) * remaining_count / processed_count
+
+    @property
+    def throughput(self):
+        # NOTE: bytes of recordings archived per second
+        if self.media_size is None or not (self.started_at and self.finished_at):
+            return None
+        seconds = (self.finished_at - self.started_at).total_seconds()
+        return self.media_size / seconds if seconds > 0 else None
+
+    @property
+    def extension(self):
+        return self.format if self.type == 'cdr' else 'zip'
 
     @property
     def filename(self):
+        return f'{self._filename_prefix()}.{self.extension}'
+
+    def shard_filename(self, index):
+        return f'{self._filename_prefix()}-{index}.zip'
+
+    def shard_recordings(self, index):
+        """Range of the indexes of the recordings archived by the shard"""
+        start = sum(shard.recording_count or 0 for shard in self.shards[:index])
+        return range(start, start + (self.shards[index].recording_count or 0))
+
+    def _filename_prefix(self):
         offset = self.requested_at.utcoffset() or td(seconds=0)
         date_utc = (self.requested_at - offset).replace(tzinfo=tz.utc)
         formatted_date_utc = date_utc.strftime('%Y-%m-%dT%H_%M_%SUTC')
-        return '{formatted_date_utc}-{uuid}.zip'.format(
-            formatted_date_utc=formatted_date_utc,
-            uuid=self.uuid,
-        )
+        return f'{formatted_date_utc}-{self.uuid}'
+
+    def aggregate_shards(self):
+        statuses = {shard.status for shard in self.shards}
+        if 'error' in statuses:
+            self.status = 'error'
+        elif statuses == {'finished'}:
+            self.status = 'finished'
+        elif statuses - {'pending'}:
+            self.status = 'processing'
+
+        started = [shard.started_at for shard in self.shards if shard.started_at]
+        self.started_at = min(started, default=None)
+        if self.status in ('finished', 'error'):
+            finished = [shard.finished_at for shard in self.shards if shard.finished_at]
+            self.finished_at = max(finished, default=None)
+        for name in ('media_size', 'size'):
+            sizes = [getattr(shard, name) for shard in self.shards]
+            sizes = [size for size in sizes if size is not None]
+            setattr(self, name, sum(sizes) if sizes else None)
+        if len(self.shards) == 1:
+            self.path = self.shards[0].path
 
     __table_args__ = (
         Index('call_logd_export__idx__user_uuid', 'user_uuid'),
+        Index(
+            'call_logd_export__idx__tenant_uuid_fingerprint',
+            'tenant_uuid',
+            'fingerprint',
+        ),
         CheckConstraint(
-            status.in_(['pending', 'processing', 'finished', 'deleted', 'error']),
+            status.in_(EXPORT_STATUSES),
             name='call_logd_export_status_check',
         ),
+        CheckConstraint(
+            delivery.in_(EXPORT_DELIVERIES),
+            name='call_logd_export_delivery_check',
+        ),
+        CheckConstraint(
+            type.in_(EXPORT_TYPES),
+            name='call_logd_export_type_check',
+        ),
+    )
+
+
+@generic_repr
+class ExportRecording(Base):
+    __tablename__ = 'call_logd_export_recording'
+
+    export_uuid = Column(
+        UUIDType,
+        ForeignKey(
+            'call_logd_export.uuid',
+            name='call_logd_export_recording_export_uuid_fkey',
+            ondelete='CASCADE',
+        ),
+        primary_key=True,
+    )
+    index = Column(Integer, primary_key=True)
+    recording_uuid = Column(UUIDType, nullable=False)
+    call_log_id = Column(Integer, nullable=False)
+    filename = Column(Text, nullable=False)
+    path = Column(Text, nullable=False)
+
+    @property
+    def archive_name(self):
+        return os.path.join(str(self.call_log_id), self.filename)
+
+
+@generic_repr
+class ExportShard(Base):
+    __tablename__ = 'call_logd_export_shard'
+
+    export_uuid = Column(
+        UUIDType,
+        ForeignKey(
+            'call_logd_export.uuid',
+            name='call_logd_export_shard_export_uuid_fkey',
+            ondelete='CASCADE',
+        ),
+        primary_key=True,
+    )
+    index = Column(Integer, primary_key=True)
+    status = Column(String(32), nullable=False)
+    recording_count = Column(Integer)
+    processed_count = Column(Integer, nullable=False, default=0, server_default='0')
+    path = Column(Text)
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+    media_size = Column(BigInteger)
+    size = Column(BigInteger)
+
+    __table_args__ = (
+        CheckConstraint(
+            status.in_(EXPORT_STATUSES),
+            name='call_logd_export_shard_status_check',
+        ),
     )
 
 
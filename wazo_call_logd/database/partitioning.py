@@ -0,0 +1,285 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Optional monthly range partitioning of the call log tables.
+
+Call logs are partitioned on their date and their participants, destinations
+and recordings on call_log_date, with the same bounds: a month of call logs
+and everything attached to them live in partitions with the same suffix and
+can be dropped together. `convert` turns the existing tables into partitioned
+tables, keeping their rows in a `_legacy` partition that holds everything
+up to the end of the conversion month. `create_partitions` then creates the monthly
+partitions ahead of time. Rows outside of all partitions land in a `_default`
+partition.
+
+The conversion cannot be reverted by a database downgrade.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+from datetime import datetime, timezone
+
+from sqlalchemy.engine import Connection
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MONTHS_AHEAD = 3
+
+CALL_LOG_TABLE = 'call_logd_call_log'
+# (table, partition key, primary key columns), call logs must come first
+PARTITIONED_TABLES = (
+    (CALL_LOG_TABLE, 'date', ('id',)),
+    ('call_logd_call_log_participant', 'call_log_date', ('uuid',)),
+    ('call_logd_call_log_destination', 'call_log_date', ('uuid',)),
+    ('call_logd_recording', 'call_log_date', ('uuid',)),
+)
+LEGACY_SUFFIX = '_legacy'
+DEFAULT_SUFFIX = '_default'
+
+_UPPER_BOUND_REGEX = re.compile(r"TO \('([^']+)'\)")
+_LEGACY_REFERENCE_REGEX = re.compile(rf'REFERENCES (\S+?){LEGACY_SUFFIX}\(')
+
+
+def month_start(date: datetime) -> datetime:
+    date = date.astimezone(timezone.utc)
+    return datetime(date.year, date.month, 1, tzinfo=timezone.utc)
+
+
+def add_months(date: datetime, months: int) -> datetime:
+    year, month = divmod(date.month - 1 + months, 12)
+    return date.replace(year=date.year + year, month=month + 1)
+
+
+def partition_name(table: str, month: datetime) -> str:
+    return f'{table}_p{month:%Y%m}'
+
+
+def parse_upper_bound(bound: str) -> datetime | None:
+    if not (match := _UPPER_BOUND_REGEX.search(bound)):
+        return None
+    return datetime.fromisoformat(match.group(1)).astimezone(timezone.utc)
+
+
+def is_partitioned(connection: Connection) -> bool:
+    query = '''
+        SELECT EXISTS (
+            SELECT 1 FROM pg_partitioned_table
+            WHERE partrelid = to_regclass(%(table)s)
+        )
+    '''
+    return connection.exec_driver_sql(query, {'table': CALL_LOG_TABLE}).scalar()
+
+
+def convert(
+    connection: Connection,
+    months_ahead: int = DEFAULT_MONTHS_AHEAD,
+    now: datetime | None = None,
+) -> None:
+    if is_partitioned(connection):
+        logger.info('%s is already partitioned', CALL_LOG_TABLE)
+        return
+
+    now = now or datetime.now(timezone.utc)
+    latest = connection.exec_driver_sql(f'SELECT max(date) FROM {CALL_LOG_TABLE}')
+    boundary = add_months(month_start(max(filter(None, (now, latest.scalar())))), 1)
+    for table, key, primary_key in PARTITIONED_TABLES:
+        logger.info('converting %s to a partitioned table', table)
+        legacy = f'{table}{LEGACY_SUFFIX}'
+        foreign_keys = _foreign_keys(connection, table)
+        for name, _ in foreign_keys:
+            connection.exec_driver_sql(f'ALTER TABLE {table} DROP CONSTRAINT {name}')
+        indexes = _indexes(connection, table)
+        for name, _, _ in indexes:
+            connection.exec_driver_sql(
+                f'ALTER INDEX {name} RENAME TO {_legacy_name(name)}'
+            )
+        connection.exec_driver_sql(f'ALTER TABLE {table} RENAME TO {legacy}')
+
+        connection.exec_driver_sql(
+            f'''
+            CREATE TABLE {table} (
+                LIKE {legacy}
+                INCLUDING DEFAULTS INCLUDING GENERATED INCLUDING CONSTRAINTS
+                INCLUDING STORAGE INCLUDING COMMENTS
+            ) PARTITION BY RANGE ({key})
+            '''
+        )
+        _move_sequences(connection, legacy, table)
+        columns = ', '.join(primary_key + (key,))
+        connection.exec_driver_sql(
+            f'ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY ({columns})'
+        )
+        # NOTE: definitions were read before renaming, they target the new table
+        for _, definition, unique in indexes:
+            if not unique:
+                connection.exec_driver_sql(definition)
+        for name, definition in foreign_keys:
+            definition = _LEGACY_REFERENCE_REGEX.sub(r'REFERENCES \1(', definition)
+            connection.exec_driver_sql(
+                f'ALTER TABLE {table} ADD CONSTRAINT {name} {definition}'
+            )
+
+        # NOTE: matching indexes of the legacy table are attached to the ones of
+        # the partitioned table instead of being rebuilt, the primary key needs a
+        # unique constraint including the partition key
+        if not _has_unique_constraint(connection, legacy, primary_key + (key,)):
+            connection.exec_driver_sql(
+                f'ALTER TABLE {legacy} ADD CONSTRAINT {legacy}_{key}_key '
+                f'UNIQUE ({columns})'
+            )
+        connection.exec_driver_sql(
+            f'''
+            ALTER TABLE {table} ATTACH PARTITION {legacy}
+            FOR VALUES FROM (MINVALUE) TO ('{boundary.isoformat()}')
+            '''
+        )
+        connection.exec_driver_sql(
+            f'CREATE TABLE {table}{DEFAULT_SUFFIX} PARTITION OF {table} DEFAULT'
+        )
+
+    create_partitions(connection, months_ahead, now)
+    for table, _, _ in PARTITIONED_TABLES:
+        connection.exec_driver_sql(f'ANALYZE {table}')
+
+
+def create_partitions(
+    connection: Connection,
+    months_ahead: int = DEFAULT_MONTHS_AHEAD,
+    now: datetime | None = None,
+) -> list[str]:
+    if not is_partitioned(connection):
+        logger.debug('%s is not partitioned', CALL_LOG_TABLE)
+        return []
+
+    # NOTE: partitions are contiguous, months before the last upper bound are
+    # already covered
+    bounds = [upper for _, upper in _partitions(connection, CALL_LOG_TABLE) if upper]
+    covered_until = max(bounds, default=None)
+
+    created = []
+    current_month = month_start(now or datetime.now(timezone.utc))
+    for month in (add_months(current_month, n) for n in range(months_ahead + 1)):
+        if covered_until and month < covered_until:
+            continue
+        for table, _, _ in PARTITIONED_TABLES:
+            name = partition_name(table, month)
+            connection.exec_driver_sql(
+                f'''
+                CREATE TABLE {name} PARTITION OF {table}
+                FOR VALUES FROM ('{month.isoformat()}')
+                TO ('{add_months(month, 1).isoformat()}')
+                '''
+            )
+            logger.info('created partition %s', name)
+            created.append(name)
+    return created
+
+
+def expired_upper_bound(connection: Connection, before: datetime) -> datetime | None:
+    bounds = [
+        upper
+        for _, upper in _partitions(connection, CALL_LOG_TABLE)
+        if upper and upper <= before
+    ]
+    return max(bounds, default=None)
+
+
+def drop_partitions_before(connection: Connection, before: datetime) -> list[str]:
+    if not is_partitioned(connection):
+        return []
+
+    dropped = []
+    for name, upper in _partitions(connection, CALL_LOG_TABLE):
+        if not upper or upper > before:
+            continue
+        suffix = name[len(CALL_LOG_TABLE) :]
+        # NOTE: children first, they reference the call log partition which
+        # cannot be dropped while attached
+        for table, _, _ in reversed(PARTITIONED_TABLES):
+            partition = f'{table}{suffix}'
+            if not _exists(connection, partition):
+                continue
+            connection.exec_driver_sql(
+                f'ALTER TABLE {table} DETACH PARTITION {partition}'
+            )
+            connection.exec_driver_sql(f'DROP TABLE {partition}')
+        logger.info('dropped partitions ending at %s', upper)
+        dropped.append(name)
+    return dropped
+
+
+def _legacy_name(name: str) -> str:
+    # NOTE: PostgreSQL truncates identifiers to 63 bytes
+    return f'{name[: 63 - len(LEGACY_SUFFIX)]}{LEGACY_SUFFIX}'
+
+
+def _exists(connection: Connection, name: str) -> bool:
+    query = 'SELECT to_regclass(%(name)s) IS NOT NULL'
+    return connection.exec_driver_sql(query, {'name': name}).scalar()
+
+
+def _partitions(connection: Connection, table: str) -> list[tuple[str, datetime]]:
+    query = '''
+        SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+        FROM pg_inherits
+        JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid
+        WHERE pg_inherits.inhparent = to_regclass(%(table)s)
+    '''
+    rows = connection.exec_driver_sql(query, {'table': table})
+    return [(name, parse_upper_bound(bound)) for name, bound in rows]
+
+
+def _indexes(connection: Connection, table: str) -> list[tuple[str, str, bool]]:
+    # NOTE: unique indexes are not recreated, they must include the partition
+    # key on a partitioned table and the primary key is rebuilt with it
+    query = '''
+        SELECT index.relname, pg_get_indexdef(pg_index.indexrelid), pg_index.indisunique
+        FROM pg_index
+        JOIN pg_class AS index ON index.oid = pg_index.indexrelid
+        WHERE pg_index.indrelid = to_regclass(%(table)s)
+    '''
+    return list(connection.exec_driver_sql(query, {'table': table}))
+
+
+def _has_unique_constraint(connection: Connection, table: str, columns: tuple) -> bool:
+    query = '''
+        SELECT EXISTS (
+            SELECT 1 FROM pg_constraint
+            WHERE conrelid = to_regclass(%(table)s) AND contype IN ('p', 'u')
+            AND ARRAY(
+                SELECT attname
+                FROM unnest(conkey) WITH ORDINALITY AS key(attnum, position)
+                JOIN pg_attribute
+                ON attrelid = conrelid AND pg_attribute.attnum = key.attnum
+                ORDER BY position
+            ) = %(columns)s::name[]
+        )
+    '''
+    params = {'table': table, 'columns': list(columns)}
+    return connection.exec_driver_sql(query, params).scalar()
+
+
+def _foreign_keys(connection: Connection, table: str) -> list[tuple[str, str]]:
+    query = '''
+        SELECT conname, pg_get_constraintdef(oid)
+        FROM pg_constraint
+        WHERE conrelid = to_regclass(%(table)s) AND contype = 'f'
+    '''
+    return list(connection.exec_driver_sql(query, {'table': table}))
+
+
+def _move_sequences(connection: Connection, legacy: str, table: str) -> None:
+    # NOTE: the sequences would be dropped with the legacy partition otherwise
+    query = '''
+        SELECT attname, pg_get_serial_sequence(%(legacy)s, attname)
+        FROM pg_attribute
+        WHERE attrelid = to_regclass(%(legacy)s) AND attnum > 0 AND NOT attisdropped
+    '''
+    for column, sequence in connection.exec_driver_sql(query, {'legacy': legacy}):
+        if sequence:
+            connection.exec_driver_sql(
+                f'ALTER SEQUENCE {sequence} OWNED BY {table}.{column}'
+            )
@@ -47,9 +47,9 @@ class DAO:
         'agent_stat': AgentStatDAO,
     }
 
-    def __init__(self, session, cel_db_session):
+    def __init__(self, session, cel_db_session, replica=None):
         for name, dao in self._dao.items():
-            setattr(self, name, dao(session))
+            setattr(self, name, dao(session, replica))
 
         for name, dao in self._cel_dao.items():
             setattr(self, name, dao(cel_db_session))
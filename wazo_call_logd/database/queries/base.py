@@ -1,7 +1,9 @@
-# Copyright 2020-2023 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2020-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
-from collections.abc import Iterator
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator
 from contextlib import contextmanager
 
 from sqlalchemy import exc
@@ -10,14 +12,53 @@ from sqlalchemy.orm import scoped_session
 
 from wazo_call_logd.exceptions import DatabaseServiceUnavailable
 
+from ..replica import ReadReplica
+
 
 class BaseDAO:
-    def __init__(self, Session: scoped_session):
+    def __init__(self, Session: scoped_session, replica: ReadReplica | None = None):
         self._Session = Session
+        self._replica = replica
 
     @contextmanager
     def new_session(self) -> Iterator[BaseSession]:
-        session = self._Session()
+        with self._new_session(self._Session) as session:
+            yield session
+
+    @contextmanager
+    def new_read_session(
+        self, call_log_ids: Iterable[int] = (), from_id: int | None = None
+    ) -> Iterator[BaseSession]:
+        Session = self._read_Session(call_log_ids, from_id)
+        with self._new_session(Session) as session:
+            yield session
+
+    @contextmanager
+    def new_streaming_read_session(
+        self, call_log_ids: Iterable[int] = (), from_id: int | None = None
+    ) -> Iterator[BaseSession]:
+        """
+        Read session of its own, not the thread's scoped session: other sessions
+        can be opened and closed while results are streamed from this one.
+        """
+        Session = self._read_Session(call_log_ids, from_id)
+        with self._new_session(scoped_session(Session.session_factory)) as session:
+            yield session
+
+    def _read_Session(
+        self, call_log_ids: Iterable[int], from_id: int | None
+    ) -> scoped_session:
+        if self._replica and self._replica.is_usable(call_log_ids, from_id):
+            return self._replica.Session
+        return self._Session
+
+    def _written(self, call_log_ids: Iterable[int]) -> None:
+        if self._replica:
+            self._replica.written(call_log_ids)
+
+    @contextmanager
+    def _new_session(self, Session: scoped_session) -> Iterator[BaseSession]:
+        session = Session()
         try:
             yield session
             session.commit()
@@ -28,4 +69,4 @@ class BaseDAO:
             session.rollback()
             raise
         finally:
-            self._Session.remove()
+            Session.remove()
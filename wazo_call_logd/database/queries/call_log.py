@@ -8,49 +8,126 @@ from typing import Any, TypedDict
 
 import sqlalchemy as sa
 from sqlalchemy import and_, case, distinct, func, sql
-from sqlalchemy.dialects.postgresql import ARRAY, UUID
-from sqlalchemy.orm import Query, joinedload, subqueryload
+from sqlalchemy.dialects.postgresql import ARRAY, UUID, insert
+from sqlalchemy.orm import Query, selectinload
+from sqlalchemy_utils import UUIDType
 
 from wazo_call_logd.datatypes import CallDirection, CallStatus, OrderDirection
 
-from ..models import CallLog, CallLogParticipant, Recording
+from ..models import CallLog, CallLogDaily, CallLogParticipant, LastCall
+from . import rollup
 from .base import BaseDAO
 
 DEFAULT_CALL_STATUS = '__default_call_status'
 
 
-# SQL mirror of the call_status computed by CDRSchema._compute_fields, so the
-# list filter and the order-by ranking below stay consistent with the value
-# actually serialized. Precedence there: blocked > voicemail > answered >
-# unknown.
-def _not_blocked():
-    return sql.or_(CallLog.blocked.is_(False), CallLog.blocked.is_(None))
+# NOTE: order of the call statuses when sorting by call_status
+CALL_STATUS_RANK = {
+    CallStatus.UNKNOWN.value: 1,
+    CallStatus.BLOCKED.value: 2,
+    CallStatus.VOICEMAIL.value: 3,
+    CallStatus.ANSWERED.value: 4,
+}
 
 
-def _status_blocked():
-    return CallLog.blocked.is_(True)
+def _in_tenants(tenant_uuids):
+    tenant_uuids = [str(uuid) for uuid in tenant_uuids]
+    # NOTE: an equality lets the planner walk the tenant indexes in order
+    # instead of sorting the rows of every tenant in the list
+    if len(tenant_uuids) == 1:
+        return CallLog.tenant_uuid == tenant_uuids[0]
+    return CallLog.tenant_uuid.in_(tenant_uuids)
 
 
-def _status_answered():
-    return and_(CallLog.date_answer.isnot(None), _not_blocked())
+def _uuid_array(uuids):
+    return sql.cast([str(uuid) for uuid in uuids], ARRAY(UUID))
 
 
-def _status_voicemail():
-    return and_(
-        CallLog.reached_voicemail.is_(True),
-        CallLog.date_answer.is_(None),
-        _not_blocked(),
+def _has_user_uuids(user_uuids):
+    return CallLog.user_uuids.contains(_uuid_array(user_uuids))
+
+
+def _has_any_user_uuid(user_uuids):
+    return CallLog.user_uuids.overlap(_uuid_array(user_uuids))
+
+
+def upsert_last_calls(call_logs):
+    last_calls = {}
+    for call_log in call_logs:
+        for last_call in call_log.last_calls():
+            key = (str(last_call.user_uuid), last_call.peer_exten)
+            if key not in last_calls or last_calls[key].call_log_id < call_log.id:
+                last_calls[key] = last_call
+    if not last_calls:
+        return None
+
+    # NOTE: a row cannot be updated twice by the same INSERT ... ON CONFLICT
+    statement = insert(LastCall).values(
+        [
+            {
+                'user_uuid': str(last_call.user_uuid),
+                'peer_exten': last_call.peer_exten,
+                'call_log_id': last_call.call_log_id,
+                'call_log_date': last_call.call_log_date,
+            }
+            for last_call in last_calls.values()
+        ]
+    )
+    return _on_conflict_keep_last(statement)
+
+
+def _on_conflict_keep_last(statement):
+    return statement.on_conflict_do_update(
+        index_elements=[LastCall.user_uuid, LastCall.peer_exten],
+        set_={
+            'call_log_id': statement.excluded.call_log_id,
+            'call_log_date': statement.excluded.call_log_date,
+        },
+        where=LastCall.call_log_id < statement.excluded.call_log_id,
     )
 
 
-def _status_unknown():
-    return and_(
-        CallLog.date_answer.is_(None),
-        sql.or_(
-            CallLog.reached_voicemail.is_(False),
-            CallLog.reached_voicemail.is_(None),
+def _rebuild_last_calls_query(user_uuids):
+    peer_exten = func.coalesce(
+        case(
+            (CallLogParticipant.role == 'source', CallLog.requested_exten),
+            else_=CallLog.source_exten,
+        ),
+        '',
+    )
+    last_calls = (
+        sql.select(CallLogParticipant.user_uuid, peer_exten, CallLog.id, CallLog.date)
+        .join(
+            CallLog,
+            and_(
+                CallLogParticipant.call_log_id == CallLog.id,
+                CallLogParticipant.call_log_date == CallLog.date,
+            ),
+        )
+        .where(CallLogParticipant.user_uuid.in_(user_uuids))
+        .distinct(CallLogParticipant.user_uuid, peer_exten)
+        .order_by(CallLogParticipant.user_uuid, peer_exten, CallLog.id.desc())
+    )
+    columns = ['user_uuid', 'peer_exten', 'call_log_id', 'call_log_date']
+    return _on_conflict_keep_last(insert(LastCall).from_select(columns, last_calls))
+
+
+def _cdr_loading_options():
+    # NOTE: each relationship is loaded by one extra `IN (...)` query per page of
+    # call logs instead of being joined: joins multiply every call log row by
+    # participants x recordings and force a subquery around LIMIT. The source
+    # and destination participants only expose their user_uuid and line_id.
+    # Recording.call_log is not loaded back, CDRs do not dump it.
+    return (
+        selectinload(CallLog.participants),
+        selectinload(CallLog.recordings),
+        selectinload(CallLog.destination_details),
+        selectinload(CallLog.source_participant).load_only(
+            CallLogParticipant.user_uuid, CallLogParticipant.line_id
+        ),
+        selectinload(CallLog.destination_participant).load_only(
+            CallLogParticipant.user_uuid, CallLogParticipant.line_id
         ),
-        _not_blocked(),
     )
 
 
@@ -78,6 +155,12 @@ class ListParams(TypedDict, total=False):
     requested_internal_extension: str
 
 
+class AggregateParams(ListParams, total=False):
+    group_by: list[str]
+    interval: str
+    timezone: str
+
+
 class CallLogDAO(BaseDAO):
     searched_columns = (
         CallLog.source_name,
@@ -87,13 +170,8 @@ class CallLogDAO(BaseDAO):
     )
 
     def get_by_id(self, cdr_id, tenant_uuids, user_uuids):
-        with self.new_session() as session:
-            query = session.query(CallLog).options(
-                joinedload(CallLog.participants),
-                joinedload(CallLog.recordings).selectinload(Recording.call_log),
-                subqueryload(CallLog.source_participant),
-                subqueryload(CallLog.destination_participant),
-            )
+        with self.new_read_session([cdr_id]) as session:
+            query = session.query(CallLog).options(*_cdr_loading_options())
             filters = {'tenant_uuids': tenant_uuids}
             if user_uuids:
                 filters |= {'user_uuids': user_uuids}
@@ -104,37 +182,15 @@ class CallLogDAO(BaseDAO):
                 session.expunge_all()
                 return cdr
 
-    def find_all_in_period(self, params: ListParams):
-        with self.new_session() as session:
-            query = self._list_query(session, params)
-            order_field = None
-            if params.get('order'):
-                if params['order'] == 'marshmallow_duration':
-                    order_field = CallLog.date_end - CallLog.date_answer
-                elif params['order'] == 'marshmallow_answered':
-                    order_field = CallLog.date_answer
-                elif params['order'] == 'marshmallow_call_status':
-                    order_field = case(
-                        (_status_blocked(), 2),
-                        (_status_voicemail(), 3),
-                        (_status_answered(), 4),
-                        else_=1,
-                    )
-                else:
-                    order_field = getattr(CallLog, params['order'])
-            if params.get('direction') == 'desc':
-                order_field = order_field.desc().nullslast()
-            if params.get('direction') == 'asc':
-                order_field = order_field.asc().nullsfirst()
-
-            if order_field is not None:
-                query = query.order_by(order_field)
-
-            if params.get('limit'):
-                query = query.limit(params['limit'])
-            if params.get('offset'):
-                query = query.offset(params['offset'])
+    def find_ids(self, call_log_ids, tenant_uuids) -> set[int]:
+        with self.new_read_session(call_log_ids) as session:
+            query = session.query(CallLog.id).filter(CallLog.id.in_(call_log_ids))
+            query = self._apply_filters(query, {'tenant_uuids': tenant_uuids})
+            return {call_log_id for (call_log_id,) in query}
 
+    def find_all_in_period(self, params: ListParams):
+        with self._new_list_session(params) as session:
+            query = self._find_all_query(session, params)
             call_log_rows = query.all()
 
             if not call_log_rows:
@@ -144,43 +200,75 @@ class CallLogDAO(BaseDAO):
 
             return call_log_rows
 
+    def iter_pages_in_period(self, params: ListParams, page_size: int):
+        # NOTE: read from a server-side cursor, relationships are loaded per page
+        with self._new_list_session(params, streaming=True) as session:
+            query = self._find_all_query(session, params).yield_per(page_size)
+            page = []
+            for call_log in query:
+                page.append(call_log)
+                if len(page) == page_size:
+                    yield page
+                    page = []
+            if page:
+                yield page
+
+    def _new_list_session(self, params, streaming=False):
+        call_log_ids = list(params.get('cdr_ids') or ())
+        if call_log_id := params.get('id'):
+            call_log_ids.append(call_log_id)
+        if streaming:
+            new_session = self.new_streaming_read_session
+        else:
+            new_session = self.new_read_session
+        return new_session(call_log_ids, from_id=params.get('start_id'))
+
+    def _find_all_query(self, session, params):
+        query = self._list_query(session, params)
+        order_field = None
+        if params.get('order'):
+            if params['order'] == 'marshmallow_duration':
+                order_field = CallLog.duration
+            elif params['order'] == 'marshmallow_answered':
+                order_field = CallLog.date_answer
+            elif params['order'] == 'marshmallow_call_status':
+                order_field = case(CALL_STATUS_RANK, value=CallLog.call_status)
+            else:
+                order_field = getattr(CallLog, params['order'])
+        if params.get('direction') == 'desc':
+            order_field = order_field.desc().nullslast()
+        if params.get('direction') == 'asc':
+            order_field = order_field.asc().nullsfirst()
+
+        if order_field is not None:
+            query = query.order_by(order_field)
+
+        if params.get('limit'):
+            query = query.limit(params['limit'])
+        if params.get('offset'):
+            query = query.offset(params['offset'])
+
+        return query
+
     def _list_query(self, session, params):
         distinct_ = params.get('distinct')
         if distinct_ == 'peer_exten':
             # TODO(pcm) use the most recent call log not the most recent id
-            sub_query = (
-                session.query(func.max(CallLogParticipant.call_log_id).label('max_id'))
-                .group_by(CallLogParticipant.user_uuid, CallLogParticipant.peer_exten)
-                .subquery()
-            )
-
-            query = session.query(CallLog).join(
-                sub_query, and_(CallLog.id == sub_query.c.max_id)
-            )
+            last_calls = session.query(LastCall.call_log_id)
+            if me_user_uuid := params.get('me_user_uuid'):
+                last_calls = last_calls.filter(LastCall.user_uuid == me_user_uuid)
+            query = session.query(CallLog).filter(CallLog.id.in_(last_calls))
         else:
             query = session.query(CallLog)
-        if requested_internal_exten := params.get('requested_internal_exten'):
-            query = query.filter(
-                CallLog.requested_internal_exten == requested_internal_exten
-            )
-        if requested_internal_context := params.get('requested_internal_context'):
-            query = query.filter(
-                CallLog.requested_internal_context == requested_internal_context
-            )
 
-        query = query.options(
-            joinedload(CallLog.participants),
-            joinedload(CallLog.recordings).selectinload(Recording.call_log),
-            subqueryload(CallLog.source_participant),
-            subqueryload(CallLog.destination_participant),
-        )
+        query = query.options(*_cdr_loading_options())
 
         query = self._apply_user_filter(query, params)
         query = self._apply_filters(query, params)
         return query
 
     def count_in_period(self, params):
-        with self.new_session() as session:
+        with self._new_list_session(params) as session:
             query = session.query(CallLog)
             query = self._apply_user_filter(query, params)
 
@@ -198,13 +286,59 @@ class CallLogDAO(BaseDAO):
 
         return {'total': total, 'filtered': filtered}
 
+    def aggregate(self, params: AggregateParams) -> list[dict[str, Any]]:
+        with self._new_list_session(params) as session:
+            if rollup.covers(params):
+                query = rollup.aggregate_query(session, params)
+            else:
+                query = self._aggregate_query(session, params)
+            return [dict(row._mapping) for row in query]
+
+    def _aggregate_query(self, session, params):
+        group_by = params.get('group_by') or []
+        columns = []
+        if interval := params.get('interval'):
+            timezone = params.get('timezone') or 'UTC'
+            period = func.date_trunc(interval, CallLog.date, timezone)
+            columns.append(period.label('from'))
+        if 'call_status' in group_by:
+            columns.append(CallLog.call_status.label('call_status'))
+        if 'call_direction' in group_by:
+            columns.append(CallLog.direction.label('call_direction'))
+        if 'user_uuid' in group_by:
+            users = (
+                func.unnest(CallLog.user_uuids)
+                .table_valued(sa.column('user_uuid', UUIDType()))
+                .render_derived()
+                .lateral()
+            )
+            columns.append(users.c.user_uuid.label('user_uuid'))
+
+        duration = rollup.duration_seconds()
+        query = session.query(
+            *columns,
+            func.count().label('count'),
+            sa.cast(func.coalesce(func.sum(duration), 0), sa.Integer).label('duration'),
+            sa.cast(func.max(duration), sa.Integer).label('duration_max'),
+        ).select_from(CallLog)
+        if 'user_uuid' in group_by:
+            # NOTE: one row per user of the call log, like the daily rollups
+            query = query.join(users, sa.true())
+            if user_uuids := params.get('terminal_user_uuids'):
+                user_uuids = [str(uuid) for uuid in user_uuids]
+                query = query.filter(users.c.user_uuid.in_(user_uuids))
+
+        query = self._apply_user_filter(query, params)
+        query = self._apply_filters(query, params)
+
+        # NOTE: grouped by position, the bound parameters of the period would
+        # differ between the SELECT and the GROUP BY otherwise
+        positions = [sa.literal_column(str(n)) for n in range(1, len(columns) + 1)]
+        return query.group_by(*positions).order_by(*positions)
+
     def _apply_user_filter(self, query: Query, params: dict[str, Any]) -> Query:
         if me_user_uuid := params.get('me_user_uuid'):
-            query = query.filter(
-                CallLog.participants.any(
-                    CallLogParticipant.user_uuid == str(me_user_uuid)
-                )
-            )
+            query = query.filter(_has_user_uuids([me_user_uuid]))
         return query
 
     def _apply_filters(self, query: Query, params: dict[str, Any]) -> Query:
@@ -223,10 +357,9 @@ class CallLogDAO(BaseDAO):
             query = query.filter(CallLog.id == call_log_id)
 
         if search := params.get('search'):
-            filters = (
-                sql.cast(column, sa.String).ilike(f'%{search}%')
-                for column in self.searched_columns
-            )
+            # NOTE: no cast, the trigram index of each column must match the
+            # ILIKE operand to be used
+            filters = (column.ilike(f'%{search}%') for column in self.searched_columns)
             query = query.filter(sql.or_(*filters))
 
         if number := params.get('number'):
@@ -239,72 +372,30 @@ class CallLogDAO(BaseDAO):
             )
             query = query.filter(sql.or_(*filters))
 
-        for tag in params.get('tags', []):
+        if tags := params.get('tags'):
             query = query.filter(
-                CallLog.participants.any(
-                    CallLogParticipant.tags.contains(sql.cast([tag], ARRAY(sa.String)))
-                )
+                CallLog.tags.contains(sql.cast(list(tags), ARRAY(sa.String)))
             )
 
         if tenant_uuids := params.get('tenant_uuids'):
-            query = query.filter(
-                CallLog.tenant_uuid.in_(str(uuid) for uuid in tenant_uuids)
-            )
+            query = query.filter(_in_tenants(tenant_uuids))
 
         if me_user_uuid := params.get('me_user_uuid'):
-            query = query.filter(
-                CallLog.participants.any(
-                    CallLogParticipant.user_uuid == str(me_user_uuid)
-                )
-            )
+            query = query.filter(_has_user_uuids([me_user_uuid]))
 
         if user_uuids := params.get('user_uuids'):
-            filters = (
-                CallLog.participants.any(CallLogParticipant.user_uuid == str(user_uuid))
-                for user_uuid in user_uuids
-            )
-            query = query.filter(sql.or_(*filters))
+            query = query.filter(_has_any_user_uuid(user_uuids))
 
         if terminal_user_uuids := params.get('terminal_user_uuids'):
-            # consider only source participant
-            # and destination participant(first 'destination' participant to have answered)
-            # NOTE(clanglois): if no participant has answered, destination participant is
-            # an arbitrary 'destination' participant based on uuid ordering
-            # NOTE(clanglois): destination participant definition must be reimplemented here
-            # in order to be used for filtering because of limitation of relationship
-            filters = sql.or_(
-                (
-                    CallLog.source_participant.has(
-                        CallLogParticipant.user_uuid.in_(
-                            str(terminal_user_uuid)
-                            for terminal_user_uuid in terminal_user_uuids
-                        )
-                    )
-                ),
-                (
-                    Query(CallLogParticipant.user_uuid)
-                    .filter(
-                        CallLogParticipant.role == 'destination',
-                        CallLogParticipant.call_log_id == CallLog.id,
-                    )
-                    .order_by(
-                        sql.desc(CallLogParticipant.answered),
-                        sql.desc(CallLogParticipant.user_uuid),
-                    )
-                    .limit(1)
-                    .scalar_subquery()
-                    == sql.any_(
-                        sql.cast(
-                            [
-                                str(terminal_user_uuid)
-                                for terminal_user_uuid in terminal_user_uuids
-                            ],
-                            ARRAY(UUID),
-                        )
-                    )
-                ),
+            # consider only source participant and destination participant, see
+            # CallLog.denormalize_participants
+            terminal_user_uuids = [str(uuid) for uuid in terminal_user_uuids]
+            query = query.filter(
+                sql.or_(
+                    CallLog.source_user_uuid.in_(terminal_user_uuids),
+                    CallLog.destination_user_uuid.in_(terminal_user_uuids),
+                )
             )
-            query = query.filter(filters)
 
         if start_id := params.get('start_id'):
             query = query.filter(CallLog.id >= start_id)
@@ -318,17 +409,23 @@ class CallLogDAO(BaseDAO):
         if conversation_id := params.get('conversation_id'):
             query = query.filter(CallLog.conversation_id == conversation_id)
 
+        if requested_internal_exten := params.get('requested_internal_exten'):
+            query = query.filter(
+                CallLog.requested_internal_exten == requested_internal_exten
+            )
+
+        if requested_internal_context := params.get('requested_internal_context'):
+            query = query.filter(
+                CallLog.requested_internal_context == requested_internal_context
+            )
+
         if call_status := params.get('call_status'):
-            if call_status == CallStatus.ANSWERED:
-                query = query.filter(_status_answered())
-            elif call_status == CallStatus.BLOCKED:
-                query = query.filter(_status_blocked())
-            elif call_status == CallStatus.VOICEMAIL:
-                query = query.filter(_status_voicemail())
-            elif call_status == CallStatus.UNKNOWN:
-                query = query.filter(_status_unknown())
-            elif call_status == DEFAULT_CALL_STATUS:
-                query = query.filter(_not_blocked())
+            if call_status == DEFAULT_CALL_STATUS:
+                query = query.filter(CallLog.call_status != CallStatus.BLOCKED.value)
+            else:
+                query = query.filter(
+                    CallLog.call_status == CallStatus(call_status).value
+                )
 
         return query
 
@@ -344,19 +441,61 @@ class CallLogDAO(BaseDAO):
                 call_log.recordings
                 call_log.source_participant
                 call_log.destination_participant
+            call_log_ids = [call_log.id for call_log in call_logs]
+            rollup.lock_rollups(session, {c.tenant_uuid for c in call_logs})
+            session.execute(rollup.increment_rollups_query(call_log_ids))
+            if (statement := upsert_last_calls(call_logs)) is not None:
+                session.execute(statement)
             session.expunge_all()
+        self._written(call_log_ids)
 
     def delete_from_list(self, call_log_ids):
         with self.new_session() as session:
+            user_uuids = self._delete_last_calls(
+                session, LastCall.call_log_id.in_(call_log_ids)
+            )
+            days = rollup.call_log_days(session, CallLog.id.in_(call_log_ids))
+
             query = session.query(CallLog)
             query = query.filter(CallLog.id.in_(call_log_ids))
             query.delete(synchronize_session=False)
 
+            self._rebuild_last_calls(session, user_uuids)
+            for tenant_uuid, day in sorted(days):
+                rollup.rebuild_rollups(
+                    session, [tenant_uuid], day, day + dt.timedelta(days=1)
+                )
+        self._written(call_log_ids)
+
     def delete(self, older=None) -> list[int]:
         with self.new_session() as session:
             query = session.query(CallLog)
             if older:
                 query = query.filter(CallLog.date >= older)
             matched_rows = query.with_entities(CallLog.id).all()
+
+            if older:
+                user_uuids = self._delete_last_calls(
+                    session, LastCall.call_log_date >= older
+                )
+            else:
+                session.query(LastCall).delete()
+                user_uuids = []
+
             query.delete()
+            self._rebuild_last_calls(session, user_uuids)
+            if older:
+                start = older.astimezone(dt.timezone.utc).date()
+                rollup.rebuild_rollups(session, start=start)
+            else:
+                session.query(CallLogDaily).delete()
             return [_id for (_id,) in matched_rows]
+
+    def _delete_last_calls(self, session, filter_):
+        statement = sql.delete(LastCall).where(filter_).returning(LastCall.user_uuid)
+        return [user_uuid for (user_uuid,) in session.execute(statement)]
+
+    def _rebuild_last_calls(self, session, user_uuids):
+        # NOTE: the previous call of each peer becomes its last call again
+        if user_uuids := {str(user_uuid) for user_uuid in user_uuids}:
+            session.execute(_rebuild_last_calls_query(user_uuids))
@@ -1,11 +1,20 @@
-# Copyright 2021-2023 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2021-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
+import logging
+from datetime import datetime, timezone
 
-from ...exceptions import ExportNotFoundException
-from ..models import Export
+from sqlalchemy import func, select
+
+from ...exceptions import ExportLimitReachedException, ExportNotFoundException
+from ..models import Export, ExportRecording, ExportShard
 from .base import BaseDAO
 
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('pending', 'processing')
+REUSABLE_STATUSES = ('pending', 'processing', 'finished')
+
 
 class _UselessQuery(Exception):
     pass
@@ -45,8 +54,159 @@ class ExportDAO(BaseDAO):
             session.expunge(export)
         return export
 
+    def create_limited(
+        self, export, max_queued=None, reuse_since=None, stale_since=None
+    ):
+        """
+        Returns the export and whether it was created: an export of the same
+        tenant and fingerprint requested since `reuse_since` is returned instead.
+        Raises ExportLimitReachedException when the tenant has `max_queued`
+        exports pending or processing. Shards processing since before
+        `stale_since` are set in error first.
+        """
+        with self.new_session() as session:
+            _lock_tenant(session, export.tenant_uuid)
+            if stale_since:
+                _expire_stale_shards(session, export.tenant_uuid, stale_since)
+            if reuse_since and export.fingerprint:
+                query = session.query(Export).filter(
+                    Export.tenant_uuid == export.tenant_uuid,
+                    Export.fingerprint == export.fingerprint,
+                    Export.requested_at >= reuse_since,
+                    Export.status.in_(REUSABLE_STATUSES),
+                )
+                if existing := query.order_by(Export.requested_at.desc()).first():
+                    session.expunge_all()
+                    return existing, False
+
+            if max_queued is not None:
+                query = session.query(func.count(Export.uuid)).filter(
+                    Export.tenant_uuid == export.tenant_uuid,
+                    Export.status.in_(ACTIVE_STATUSES),
+                )
+                if query.scalar() >= max_queued:
+                    raise ExportLimitReachedException(export.tenant_uuid, max_queued)
+
+            session.add(export)
+            session.flush()
+            session.expunge(export)
+        return export, True
+
     def update(self, export):
         with self.new_session() as session:
             session.add(export)
             session.flush()
             session.expunge(export)
+
+    def count_recordings(self, export_uuid):
+        with self.new_session() as session:
+            query = session.query(ExportRecording).filter(
+                ExportRecording.export_uuid == export_uuid
+            )
+            return query.count()
+
+    def iter_recording_pages(self, export_uuid, indexes, page_size):
+        # NOTE: one short session per page, the manifest may be large and the
+        # pages are archived slowly
+        start, stop = indexes.start, indexes.stop
+        while start < stop:
+            with self.new_session() as session:
+                query = session.query(ExportRecording).filter(
+                    ExportRecording.export_uuid == export_uuid,
+                    ExportRecording.index >= start,
+                    ExportRecording.index < stop,
+                )
+                page = query.order_by(ExportRecording.index).limit(page_size).all()
+                session.expunge_all()
+            if not page:
+                return
+            yield page
+            start = page[-1].index + 1
+
+    def start_shard(
+        self, export_uuid, index, started_at, max_processing=None, stale_since=None
+    ):
+        """
+        Returns None, leaving the shard pending, when the tenant of the export
+        already has `max_processing` shards processing. Shards processing since
+        before `stale_since` are set in error first.
+        """
+        with self.new_session() as session:
+            query = session.query(Export.tenant_uuid).filter(Export.uuid == export_uuid)
+            tenant_uuid = query.scalar()
+            if not tenant_uuid:
+                raise ExportNotFoundException(export_uuid)
+            _lock_tenant(session, tenant_uuid)
+            if stale_since:
+                _expire_stale_shards(session, tenant_uuid, stale_since)
+
+            if max_processing is not None:
+                query = (
+                    session.query(func.count())
+                    .select_from(ExportShard)
+                    .join(Export)
+                    .filter(
+                        Export.tenant_uuid == tenant_uuid,
+                        ExportShard.status == 'processing',
+                    )
+                )
+                if query.scalar() >= max_processing:
+                    return None
+
+            query = session.query(Export).filter(Export.uuid == export_uuid)
+            export = query.with_for_update().one()
+            export.shards[index].status = 'processing'
+            export.shards[index].started_at = started_at
+            export.aggregate_shards()
+            session.flush()
+            session.expunge_all()
+            return export
+
+    def update_shard(self, export_uuid, index, **values):
+        with self.new_session() as session:
+            query = session.query(Export).filter(Export.uuid == export_uuid)
+            # NOTE: shards are loaded once the export is locked, only the last
+            # shard to finish sees its export finished
+            export = query.with_for_update().one_or_none()
+            if not export:
+                raise ExportNotFoundException(export_uuid)
+            for name, value in values.items():
+                setattr(export.shards[index], name, value)
+            export.aggregate_shards()
+            session.flush()
+            session.expunge_all()
+            return export
+
+
+def _lock_tenant(session, tenant_uuid):
+    # NOTE: serializes the checks of the tenant limits until the commit
+    key = func.hashtext(f'call_logd_export:{tenant_uuid}')
+    session.execute(select(func.pg_advisory_xact_lock(key)))
+
+
+def _expire_stale_shards(session, tenant_uuid, stale_since):
+    # NOTE: the shard of a worker killed while archiving stays processing, it
+    # would count against the tenant limits forever
+    stale_shards = (
+        select(ExportShard.export_uuid)
+        .where(ExportShard.status == 'processing')
+        .where(ExportShard.started_at < stale_since)
+    )
+    query = session.query(Export).filter(
+        Export.tenant_uuid == tenant_uuid,
+        Export.uuid.in_(stale_shards),
+    )
+    finished_at = datetime.now(timezone.utc)
+    for export in query.with_for_update().all():
+        for shard in export.shards:
+            if shard.status == 'processing' and shard.started_at < stale_since:
+                logger.error(
+                    'Export %s shard %s: processing since %s, set in error',
+                    export.uuid,
+                    shard.index,
+                    shard.started_at,
+                )
+                shard.status = 'error'
+                shard.finished_at = finished_at
+        export.aggregate_shards()
+    session.flush()
@@ -1,7 +1,9 @@
-# Copyright 2021-2023 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2021-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
-from ..models import Recording
+import sqlalchemy as sa
+
+from ..models import CallLog, Recording
 from .base import BaseDAO
 
 
@@ -11,21 +13,34 @@ class _UselessQuery(Exception):
 
 class RecordingDAO(BaseDAO):
     def delete_media_by(self, **kwargs):
+        """Returns the call_log_id, uuid and former path of each recording"""
         with self.new_session() as session:
-            query = session.query(Recording)
+            query = session.query(Recording.uuid, Recording.path)
             try:
                 query = self._apply_filters(query, kwargs)
             except _UselessQuery:
-                return
+                return []
 
-            recordings = query.all()
-            for recording in recordings:
-                recording.path = None
-                session.flush()
-                session.expunge(recording)
+            # NOTE: the RETURNING clause of an UPDATE only sees the new path
+            previous = (
+                query.filter(Recording.path.isnot(None))
+                .with_for_update(of=Recording)
+                .subquery()
+            )
+            statement = (
+                sa.update(Recording)
+                .where(Recording.uuid == previous.c.uuid)
+                .values(path=None)
+                .returning(Recording.call_log_id, Recording.uuid, previous.c.path)
+                .execution_options(synchronize_session=False)
+            )
+            return session.execute(statement).all()
 
     def find_by(self, **kwargs):
-        with self.new_session() as session:
+        call_log_ids = kwargs.get('call_log_ids') or ()
+        if 'call_log_id' in kwargs:
+            call_log_ids = [kwargs['call_log_id'], *call_log_ids]
+        with self.new_read_session(call_log_ids) as session:
             query = session.query(Recording)
             try:
                 query = self._apply_filters(query, kwargs)
@@ -50,4 +65,9 @@ class RecordingDAO(BaseDAO):
         if 'uuid' in params:
             query = query.filter(Recording.uuid == params['uuid'])
 
+        if 'tenant_uuids' in params:
+            tenant_uuids = [str(uuid) for uuid in params['tenant_uuids']]
+            query = query.join(CallLog, CallLog.id == Recording.call_log_id)
+            query = query.filter(CallLog.tenant_uuid.in_(tenant_uuids))
+
         return query
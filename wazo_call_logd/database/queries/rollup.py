@@ -0,0 +1,256 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Daily rollups of the call logs, see models.CallLogDaily.
+
+Inserted call logs are added to the rollups of their day. Deleting call logs
+rebuilds the rollups of their days from the remaining call logs instead: the
+longest duration of a day cannot be decremented. Both take the rollups lock
+of their tenants until their commit, an increment committed between the DELETE
+and the INSERT of a rebuild would conflict with it.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+from typing import Any
+
+import sqlalchemy as sa
+from sqlalchemy import and_, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Query
+from sqlalchemy_utils import UUIDType
+
+from wazo_call_logd.datatypes import CallStatus
+
+from ..models import CallLog, CallLogDaily, Tenant
+
+ALL_USERS = CallLogDaily.ALL_USERS
+ROLLUP_INTERVALS = (None, 'day', 'month')
+# NOTE: aggregate parameters answered by the rollups, any other filter needs
+# the call logs
+ROLLUP_PARAMS = (
+    'tenant_uuids',
+    'call_direction',
+    'call_status',
+    'start',
+    'end',
+    'recurse',
+    'group_by',
+    'interval',
+    'timezone',
+)
+_COLUMNS = [
+    'tenant_uuid',
+    'day',
+    'user_uuid',
+    'direction',
+    'call_status',
+    'count',
+    'duration',
+    'duration_max',
+]
+_KEY = [
+    CallLogDaily.tenant_uuid,
+    CallLogDaily.day,
+    CallLogDaily.user_uuid,
+    CallLogDaily.direction,
+    CallLogDaily.call_status,
+]
+
+
+def duration_seconds():
+    # NOTE: floored like the CDR duration, negative durations count as 0
+    return func.greatest(func.floor(func.extract('epoch', CallLog.duration)), 0)
+
+
+def lock_rollups(session, tenant_uuids) -> None:
+    # NOTE: one lock per tenant, always taken in the same order so that two
+    # transactions cannot wait for each other
+    for tenant_uuid in sorted({str(uuid) for uuid in tenant_uuids}):
+        key = func.hashtext(f'call_logd_rollups:{tenant_uuid}')
+        session.execute(sa.select(func.pg_advisory_xact_lock(key)))
+
+
+def increment_rollups_query(call_log_ids):
+    statement = insert(CallLogDaily).from_select(
+        _COLUMNS, _rollup_select(CallLog.id.in_(call_log_ids))
+    )
+    return statement.on_conflict_do_update(
+        index_elements=_KEY,
+        set_={
+            'count': CallLogDaily.count + statement.excluded.count,
+            'duration': CallLogDaily.duration + statement.excluded.duration,
+            'duration_max': func.greatest(
+                CallLogDaily.duration_max, statement.excluded.duration_max
+            ),
+        },
+    )
+
+
+def rebuild_rollups(
+    session,
+    tenant_uuids: list[str] | None = None,
+    start: dt.date | None = None,
+    end: dt.date | None = None,
+) -> None:
+    if tenant_uuids is None:
+        # NOTE: tenants created meanwhile are not locked, they are left alone
+        tenant_uuids = [uuid for uuid, in session.query(Tenant.uuid)]
+    tenant_uuids = [str(uuid) for uuid in tenant_uuids]
+    rollup_filters = [CallLogDaily.tenant_uuid.in_(tenant_uuids)]
+    call_log_filters = [CallLog.tenant_uuid.in_(tenant_uuids)]
+    if start:
+        rollup_filters.append(CallLogDaily.day >= start)
+        call_log_filters.append(CallLog.date >= _day_start(start))
+    if end:
+        rollup_filters.append(CallLogDaily.day < end)
+        call_log_filters.append(CallLog.date < _day_start(end))
+
+    lock_rollups(session, tenant_uuids)
+    statement = (
+        sa.delete(CallLogDaily)
+        .where(and_(*rollup_filters))
+        .execution_options(synchronize_session=False)
+    )
+    session.execute(statement)
+    statement = insert(CallLogDaily).from_select(
+        _COLUMNS, _rollup_select(and_(*call_log_filters))
+    )
+    session.execute(statement)
+
+
+def call_log_days(session, call_log_filter) -> set[tuple[str, dt.date]]:
+    query = session.query(CallLog.tenant_uuid, _day(CallLog.date)).filter(
+        call_log_filter
+    )
+    return {(str(tenant_uuid), day) for tenant_uuid, day in query.distinct()}
+
+
+def covers(params: dict[str, Any]) -> bool:
+    if params.get('interval') not in ROLLUP_INTERVALS:
+        return False
+    if (params.get('timezone') or 'UTC') != 'UTC':
+        return False
+    for name in ('start', 'end'):
+        if (date := params.get(name)) and not _is_day_start(date):
+            return False
+    return not any(
+        _is_set(value) for name, value in params.items() if name not in ROLLUP_PARAMS
+    )
+
+
+def aggregate_query(session, params: dict[str, Any]) -> Query:
+    group_by = params.get('group_by') or []
+    columns = []
+    if interval := params.get('interval'):
+        period = sa.cast(CallLogDaily.day, sa.DateTime)
+        if interval == 'month':
+            period = func.date_trunc('month', period)
+        columns.append(func.timezone('UTC', period).label('from'))
+    if 'call_status' in group_by:
+        columns.append(CallLogDaily.call_status.label('call_status'))
+    if 'call_direction' in group_by:
+        columns.append(func.nullif(CallLogDaily.direction, '').label('call_direction'))
+    if 'user_uuid' in group_by:
+        columns.append(CallLogDaily.user_uuid.label('user_uuid'))
+
+    query = session.query(
+        *columns,
+        sa.cast(func.sum(CallLogDaily.count), sa.Integer).label('count'),
+        sa.cast(func.sum(CallLogDaily.duration), sa.Integer).label('duration'),
+        func.max(CallLogDaily.duration_max).label('duration_max'),
+    )
+    if 'user_uuid' in group_by:
+        query = query.filter(CallLogDaily.user_uuid != ALL_USERS)
+    else:
+        query = query.filter(CallLogDaily.user_uuid == ALL_USERS)
+
+    if tenant_uuids := params.get('tenant_uuids'):
+        tenant_uuids = [str(uuid) for uuid in tenant_uuids]
+        query = query.filter(CallLogDaily.tenant_uuid.in_(tenant_uuids))
+    if call_direction := params.get('call_direction'):
+        query = query.filter(CallLogDaily.direction == call_direction)
+    if call_status := params.get('call_status'):
+        query = query.filter(CallLogDaily.call_status == CallStatus(call_status).value)
+    if start := params.get('start'):
+        query = query.filter(CallLogDaily.day >= _utc_date(start))
+    if end := params.get('end'):
+        query = query.filter(CallLogDaily.day < _utc_date(end))
+
+    positions = _positions(*range(1, len(columns) + 1))
+    return query.group_by(*positions).order_by(*positions)
+
+
+def _rollup_select(call_log_filter):
+    day = _day(CallLog.date)
+    direction = func.coalesce(CallLog.direction, '')
+    duration = duration_seconds()
+    metrics = (
+        func.count(),
+        func.coalesce(func.sum(duration), 0),
+        func.max(duration),
+    )
+    all_users = (
+        sa.select(
+            CallLog.tenant_uuid,
+            day,
+            sa.literal_column(f"'{ALL_USERS}'::uuid"),
+            direction,
+            CallLog.call_status,
+            *metrics,
+        )
+        .where(call_log_filter)
+        .group_by(*_positions(1, 2, 4, 5))
+    )
+    users = (
+        func.unnest(CallLog.user_uuids)
+        .table_valued(sa.column('user_uuid', UUIDType()))
+        .render_derived()
+        .lateral()
+    )
+    per_user = (
+        sa.select(
+            CallLog.tenant_uuid,
+            day,
+            users.c.user_uuid,
+            direction,
+            CallLog.call_status,
+            *metrics,
+        )
+        .select_from(CallLog)
+        .join(users, sa.true())
+        .where(call_log_filter)
+        .group_by(*_positions(1, 2, 3, 4, 5))
+    )
+    return sa.union_all(all_users, per_user)
+
+
+def _positions(*positions):
+    # NOTE: the bound parameters of an expression would differ between the
+    # SELECT and the GROUP BY
+    return [sa.literal_column(str(position)) for position in positions]
+
+
+def _day(date):
+    return sa.cast(func.timezone('UTC', date), sa.Date)
+
+
+def _day_start(day: dt.date) -> dt.datetime:
+    return dt.datetime.combine(day, dt.time(), tzinfo=dt.timezone.utc)
+
+
+def _utc_date(date: dt.datetime) -> dt.date:
+    return date.astimezone(dt.timezone.utc).date()
+
+
+def _is_set(value: Any) -> bool:
+    # NOTE: False is a filter, e.g. recorded=false
+    return value is not None and value != [] and value != ''
+
+
+def _is_day_start(date: dt.datetime) -> bool:
+    if date.tzinfo is None:
+        return False
+    return date == _day_start(_utc_date(date))
@@ -0,0 +1,117 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections.abc import Iterable
+
+from sqlalchemy import exc, text
+from sqlalchemy.orm import scoped_session
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_LAG = 5
+
+# NOTE: a replica without pending WAL is up to date, however old its last
+# replayed transaction is, as long as its WAL receiver still hears from the
+# primary. The receiver status is only visible with pg_read_all_stats, without
+# it the lag is always measured from the last replayed transaction.
+REPLICA_LAG_QUERY = text(
+    '''
+    SELECT
+        pg_is_in_recovery() AS in_recovery,
+        pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() AS replayed,
+        EXISTS (
+            SELECT 1 FROM pg_stat_wal_receiver
+            WHERE status = 'streaming'
+            AND last_msg_receipt_time
+                > now() - current_setting('wal_receiver_timeout')::interval
+        ) AS streaming,
+        EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) AS replay_lag
+    '''
+)
+
+
+def _lag(in_recovery, replayed, streaming, replay_lag):
+    if not in_recovery:
+        return 0.0
+    if replayed and streaming:
+        return 0.0
+    return None if replay_lag is None else float(replay_lag)
+
+
+class ReadReplica:
+    """
+    Routes the read queries of the REST API to a replica of the database.
+
+    Reads fall back to the primary when the replica lags more than `max_lag`
+    seconds behind it, and when they target call logs written by this process
+    less than `max_lag` seconds ago, which the replica may not have yet.
+    """
+
+    def __init__(
+        self, Session: scoped_session, max_lag: float = DEFAULT_MAX_LAG, clock=None
+    ):
+        self.Session = Session
+        self._max_lag = max_lag
+        self._clock = clock or time.monotonic
+        self._lock = threading.Lock()
+        self._written = {}
+        self._lag = None
+        self._lag_checked_at = None
+
+    def written(self, call_log_ids: Iterable[int]) -> None:
+        now = self._clock()
+        with self._lock:
+            self._prune(now)
+            for call_log_id in call_log_ids:
+                self._written[call_log_id] = now
+
+    def is_usable(
+        self, call_log_ids: Iterable[int] = (), from_id: int | None = None
+    ) -> bool:
+        if self._is_recent(call_log_ids, from_id):
+            return False
+        lag = self._replica_lag()
+        if lag is None or lag > self._max_lag:
+            logger.debug('replica lag is %s seconds, using primary', lag)
+            return False
+        return True
+
+    def _is_recent(self, call_log_ids, from_id):
+        with self._lock:
+            self._prune(self._clock())
+            if not self._written:
+                return False
+            if from_id is not None and max(self._written) >= from_id:
+                return True
+            return any(call_log_id in self._written for call_log_id in call_log_ids)
+
+    def _prune(self, now):
+        expired = [
+            call_log_id
+            for call_log_id, written_at in self._written.items()
+            if now - written_at > self._max_lag
+        ]
+        for call_log_id in expired:
+            del self._written[call_log_id]
+
+    def _replica_lag(self):
+        # NOTE: checked at most once per second, the query goes to the replica
+        now = self._clock()
+        if self._lag_checked_at is not None and now - self._lag_checked_at < 1:
+            return self._lag
+
+        session = self.Session()
+        try:
+            self._lag = _lag(*session.execute(REPLICA_LAG_QUERY).one())
+        except exc.DBAPIError as e:
+            logger.warning('replica unavailable, using primary: %s', e)
+            self._lag = None
+        finally:
+            self.Session.remove()
+        self._lag_checked_at = now
+        return self._lag
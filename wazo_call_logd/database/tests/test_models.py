@@ -0,0 +1,134 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import uuid
+from datetime import datetime, timedelta, timezone
+from unittest import TestCase
+
+from hamcrest import (
+    assert_that,
+    close_to,
+    contains_inanyorder,
+    equal_to,
+    has_properties,
+)
+
+from ..models import CallLog, CallLogParticipant, Export, ExportShard
+
+DATE = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+class TestCallLogLastCalls(TestCase):
+    def test_peer_is_requested_for_source_and_source_for_destinations(self):
+        user_1, user_2 = uuid.uuid4(), uuid.uuid4()
+        call_log = CallLog(
+            id=42,
+            date=DATE,
+            source_exten='1001',
+            requested_exten='1002',
+            participants=[
+                CallLogParticipant(user_uuid=user_1, role='source'),
+                CallLogParticipant(user_uuid=user_2, role='destination'),
+            ],
+        )
+
+        result = call_log.last_calls()
+
+        assert_that(
+            result,
+            contains_inanyorder(
+                has_properties(
+                    user_uuid=user_1,
+                    peer_exten='1002',
+                    call_log_id=42,
+                    call_log_date=DATE,
+                ),
+                has_properties(user_uuid=user_2, peer_exten='1001'),
+            ),
+        )
+
+    def test_one_per_user_and_peer(self):
+        user_uuid = uuid.uuid4()
+        call_log = CallLog(
+            id=42,
+            date=DATE,
+            participants=[
+                CallLogParticipant(user_uuid=user_uuid, role='destination'),
+                CallLogParticipant(user_uuid=user_uuid, role='destination'),
+            ],
+        )
+
+        result = call_log.last_calls()
+
+        assert_that(
+            result,
+            contains_inanyorder(has_properties(user_uuid=user_uuid, peer_exten='')),
+        )
+
+
+class TestExportAggregateShards(TestCase):
+    def setUp(self):
+        self.export = Export(
+            status='pending',
+            shards=[
+                ExportShard(index=0, status='pending'),
+                ExportShard(index=1, status='pending'),
+            ],
+        )
+
+    def _update_shard(self, index, **values):
+        for name, value in values.items():
+            setattr(self.export.shards[index], name, value)
+        self.export.aggregate_shards()
+
+    def test_finished_once_every_shard_is_finished(self):
+        self._update_shard(0, status='processing', started_at=DATE)
+        assert_that(self.export, has_properties(status='processing', started_at=DATE))
+
+        end = DATE.replace(hour=1)
+        self._update_shard(0, status='finished', finished_at=DATE, size=2, path='0')
+        self._update_shard(1, status='finished', finished_at=end, size=3, path='1')
+
+        assert_that(
+            self.export,
+            has_properties(status='finished', finished_at=end, size=5, path=None),
+        )
+
+    def test_error_when_a_shard_fails(self):
+        self._update_shard(0, status='error', finished_at=DATE)
+        self._update_shard(1, status='finished', finished_at=DATE, size=3)
+
+        assert_that(self.export, has_properties(status='error', size=3))
+
+    def test_single_shard_path(self):
+        self.export.shards = [ExportShard(index=0, status='pending')]
+
+        self._update_shard(0, status='finished', path='/tmp/export.zip')
+
+        assert_that(self.export, has_properties(path='/tmp/export.zip'))
+
+    def test_progress_and_eta(self):
+        self.export.shards[0].recording_count = 3
+        self.export.shards[1].recording_count = 1
+        assert_that(self.export, has_properties(progress=0.0, eta=None))
+
+        started_at = datetime.now(timezone.utc) - timedelta(seconds=60)
+        self._update_shard(0, status='processing', started_at=started_at)
+        self._update_shard(0, processed_count=1)
+
+        assert_that(self.export, has_properties(processed_count=1, progress=25.0))
+        eta = self.export.eta - datetime.now(timezone.utc)
+        assert_that(eta.total_seconds(), close_to(180, 1))
+
+        self._update_shard(0, status='finished', processed_count=3)
+        self._update_shard(1, status='finished', processed_count=1)
+
+        assert_that(self.export, has_properties(progress=100.0, eta=None))
+        assert_that(self.export.recording_count, equal_to(4))
+
+    def test_shard_recordings(self):
+        self.export.shards[0].recording_count = 3
+        self.export.shards[1].recording_count = 2
+
+        assert_that(self.export.shard_recordings(0), equal_to(range(0, 3)))
+        assert_that(self.export.shard_recordings(1), equal_to(range(3, 5)))
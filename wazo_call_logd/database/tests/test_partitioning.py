@@ -0,0 +1,53 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from datetime import datetime, timedelta, timezone
+from unittest import TestCase
+
+from hamcrest import assert_that, equal_to, none
+
+from ..partitioning import add_months, month_start, parse_upper_bound, partition_name
+
+
+class TestMonths(TestCase):
+    def test_month_start_is_in_utc(self):
+        date = datetime(2026, 3, 1, 2, 0, tzinfo=timezone(timedelta(hours=5)))
+
+        result = month_start(date)
+
+        assert_that(result, equal_to(datetime(2026, 2, 1, tzinfo=timezone.utc)))
+
+    def test_add_months_wraps_years(self):
+        date = datetime(2026, 11, 1, tzinfo=timezone.utc)
+
+        assert_that(add_months(date, 1), equal_to(date.replace(month=12)))
+        assert_that(add_months(date, 2), equal_to(date.replace(year=2027, month=1)))
+        assert_that(add_months(date, 14), equal_to(date.replace(year=2028, month=1)))
+
+    def test_partition_name(self):
+        month = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+        result = partition_name('call_logd_call_log', month)
+
+        assert_that(result, equal_to('call_logd_call_log_p202601'))
+
+
+class TestParseUpperBound(TestCase):
+    def test_range(self):
+        bound = (
+            "FOR VALUES FROM ('2026-11-01 00:00:00+00') TO ('2026-12-01 00:00:00+00')"
+        )
+
+        result = parse_upper_bound(bound)
+
+        assert_that(result, equal_to(datetime(2026, 12, 1, tzinfo=timezone.utc)))
+
+    def test_from_minvalue(self):
+        bound = "FOR VALUES FROM (MINVALUE) TO ('2026-11-01 00:00:00-05')"
+
+        result = parse_upper_bound(bound)
+
+        assert_that(result, equal_to(datetime(2026, 11, 1, 5, tzinfo=timezone.utc)))
+
+    def test_default(self):
+        assert_that(parse_upper_bound('DEFAULT'), none())
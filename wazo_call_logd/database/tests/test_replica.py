@@ -0,0 +1,90 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from unittest import TestCase
+from unittest.mock import Mock
+
+from hamcrest import assert_that, equal_to
+from sqlalchemy import exc
+
+from ..replica import ReadReplica
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestReadReplica(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.Session = Mock()
+        self.set_lag(0)
+        self.replica = ReadReplica(self.Session, max_lag=5, clock=self.clock)
+
+    def set_lag(self, lag, replayed=False, streaming=True):
+        self.Session.return_value.execute.return_value.one.return_value = (
+            True,
+            replayed,
+            streaming,
+            lag,
+        )
+
+    def test_usable_when_up_to_date(self):
+        assert_that(self.replica.is_usable(), equal_to(True))
+
+    def test_usable_when_replayed_and_streaming(self):
+        self.set_lag(3600, replayed=True)
+
+        assert_that(self.replica.is_usable(), equal_to(True))
+
+    def test_not_usable_when_replayed_but_not_streaming(self):
+        self.set_lag(3600, replayed=True, streaming=False)
+
+        assert_that(self.replica.is_usable(), equal_to(False))
+
+    def test_not_usable_without_replayed_transaction(self):
+        self.set_lag(None, replayed=True, streaming=False)
+
+        assert_that(self.replica.is_usable(), equal_to(False))
+
+    def test_not_usable_when_lagging(self):
+        self.set_lag(5.5)
+
+        assert_that(self.replica.is_usable(), equal_to(False))
+
+    def test_not_usable_when_unavailable(self):
+        self.Session.return_value.execute.side_effect = exc.OperationalError(
+            'SELECT', {}, Exception()
+        )
+
+        assert_that(self.replica.is_usable(), equal_to(False))
+
+    def test_lag_is_checked_once_per_second(self):
+        self.replica.is_usable()
+        self.set_lag(10)
+
+        assert_that(self.replica.is_usable(), equal_to(True))
+
+        self.clock.now += 1
+        assert_that(self.replica.is_usable(), equal_to(False))
+        assert_that(self.Session.return_value.execute.call_count, equal_to(2))
+
+    def test_not_usable_for_recently_written_call_logs(self):
+        self.replica.written([42])
+
+        assert_that(self.replica.is_usable([42]), equal_to(False))
+        assert_that(self.replica.is_usable([41]), equal_to(True))
+        assert_that(self.replica.is_usable(from_id=42), equal_to(False))
+        assert_that(self.replica.is_usable(from_id=43), equal_to(True))
+
+    def test_usable_for_call_logs_written_before_max_lag(self):
+        self.replica.written([42])
+
+        self.clock.now += 6
+
+        assert_that(self.replica.is_usable([42]), equal_to(True))
+        assert_that(self.replica.is_usable(from_id=1), equal_to(True))
@@ -0,0 +1,35 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from datetime import datetime, timedelta, timezone
+from unittest import TestCase
+
+from hamcrest import assert_that, equal_to
+
+from ..queries.rollup import covers
+
+MIDNIGHT = datetime(2026, 3, 1, tzinfo=timezone.utc)
+
+
+class TestCovers(TestCase):
+    def test_daily_and_monthly_utc_periods(self):
+        for params in (
+            {'group_by': ['call_status']},
+            {'interval': 'day', 'timezone': 'UTC', 'start': MIDNIGHT},
+            {'interval': 'month', 'end': MIDNIGHT, 'tenant_uuids': ['tenant']},
+            {'call_direction': 'inbound', 'terminal_user_uuids': [], 'search': None},
+        ):
+            assert_that(covers(params), equal_to(True), params)
+
+    def test_finer_periods_or_other_filters(self):
+        for params in (
+            {'interval': 'hour'},
+            {'interval': 'day', 'timezone': 'America/Montreal'},
+            {'start': MIDNIGHT + timedelta(hours=1)},
+            {'end': MIDNIGHT.replace(tzinfo=None)},
+            {'terminal_user_uuids': ['user']},
+            {'me_user_uuid': 'user'},
+            {'search': 'alice'},
+            {'interval': 'day', 'recorded': False},
+        ):
+            assert_that(covers(params), equal_to(False), params)
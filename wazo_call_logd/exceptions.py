@@ -1,4 +1,4 @@
-# Copyright 2013-2021 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2013-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from xivo.rest_api_helpers import APIException
@@ -32,6 +32,16 @@ class ExportNotFoundException(APIException):
         )
 
 
+class ExportLimitReachedException(APIException):
+    def __init__(self, tenant_uuid, limit):
+        super().__init__(
+            status_code=429,
+            message='Too many exports queued for this tenant',
+            error_id='export-limit-reached',
+            details={'tenant_uuid': str(tenant_uuid), 'limit': limit},
+        )
+
+
 class CELInterpretationError(Exception):
     def __init__(self, event_name: str, raw_data=None):
         super().__init__(
@@ -1,10 +1,12 @@
-# Copyright 2017-2024 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2017-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from flask_restful import Resource
 from xivo import mallow_helpers, rest_api_helpers
 from xivo.flask.auth_verifier import AuthVerifierFlask
 
+from wazo_call_logd.profiling import timed
+
 auth_verifier = AuthVerifierFlask()
 
 
@@ -17,6 +19,8 @@ class ErrorCatchingResource(Resource):
 
 class AuthResource(ErrorCatchingResource):
     method_decorators = [
+        timed('app'),
         auth_verifier.verify_tenant,
         auth_verifier.verify_token,
+        timed('auth'),
     ] + ErrorCatchingResource.method_decorators
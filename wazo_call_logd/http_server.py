@@ -13,6 +13,8 @@ from werkzeug.middleware.proxy_fix import ProxyFix
 from xivo import http_helpers, wsgi
 from xivo.http_helpers import ReverseProxied
 
+from wazo_call_logd import profiling
+
 VERSION = 1.0
 
 logger = logging.getLogger(__name__)
@@ -29,7 +31,9 @@ class HTTPServer:
         app.secret_key = os.urandom(24)
         app.permanent_session_lifetime = timedelta(minutes=5)
         app.config['auth'] = global_config['auth']
+        app.config['download_offload'] = self.config.get('download_offload', {})
         self._load_cors()
+        self._load_profiling()
         self.server = None
         self._stopped = threading.Event()
 
@@ -39,6 +43,11 @@ class HTTPServer:
         if enabled:
             CORS(app, **cors_config)
 
+    def _load_profiling(self):
+        profiling_config = self.config.get('profiling', {})
+        if profiling_config.get('enabled', False):
+            profiling.install(app, api, log=profiling_config.get('log', False))
+
     def run(self):
         bind_addr = (self.config['listen'], self.config['port'])
 
@@ -1,4 +1,4 @@
-# Copyright 2012-2024 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2012-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 import argparse
@@ -29,6 +29,15 @@ from wazo_call_logd.writer import CallLogsWriter
 
 DEFAULT_CEL_COUNT = 20000
 PIDFILENAME = '/run/wazo-call-logs.pid'
+_FILE_CONFIG_KEYS = (
+    'confd',
+    'bus',
+    'auth',
+    'db_uri',
+    'cel_db_uri',
+    'db_pool',
+    'cel_db_pool',
+)
 
 logger = logging.getLogger(__name__)
 
@@ -55,7 +64,7 @@ def _generate_call_logs(cli_options: argparse.Namespace):
     file_config = {
         key: value
         for key, value in read_config_file_hierarchy(DEFAULT_CONFIG).items()
-        if key in ('confd', 'bus', 'auth', 'db_uri', 'cel_db_uri')
+        if key in _FILE_CONFIG_KEYS
     }
 
     key_config = {}
@@ -71,8 +80,8 @@ def _generate_call_logs(cli_options: argparse.Namespace):
     logger.debug('CEL database is %s', config['cel_db_uri'])
     init_db_from_config({'db_uri': config['cel_db_uri']})
     logger.debug('call-logd database is %s', config['db_uri'])
-    DBSession = new_db_session(config['db_uri'])
-    CELDBSession = new_db_session(config['cel_db_uri'])
+    DBSession = new_db_session(config['db_uri'], config['db_pool'])
+    CELDBSession = new_db_session(config['cel_db_uri'], config['cel_db_pool'])
     dao = DAO(DBSession, CELDBSession)
 
     auth_client = AuthClient(**config['auth'])
@@ -0,0 +1,75 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import argparse
+import logging
+
+from sqlalchemy import create_engine
+from xivo import xivo_logging
+from xivo.chain_map import ChainMap
+from xivo.config_helper import read_config_file_hierarchy
+
+from wazo_call_logd.config import DEFAULT_CONFIG
+from wazo_call_logd.database import partitioning
+
+logger = logging.getLogger('wazo-call-logd-partition-db')
+
+
+def parse_cli_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        'action',
+        choices=['convert', 'create'],
+        help=(
+            'convert: partition the call log tables by month (cannot be undone), '
+            'create: create the upcoming monthly partitions'
+        ),
+    )
+    parser.add_argument(
+        '--months-ahead',
+        type=int,
+        default=partitioning.DEFAULT_MONTHS_AHEAD,
+        help='Number of monthly partitions to create after the current month',
+    )
+    parser.add_argument(
+        '-d',
+        '--debug',
+        action='store_true',
+        help="Log debug messages",
+    )
+    parser.add_argument(
+        '-q',
+        '--quiet',
+        action='store_true',
+        help='Only print warnings and errors',
+    )
+    parsed_args = parser.parse_args()
+    result = {
+        'action': parsed_args.action,
+        'months_ahead': parsed_args.months_ahead,
+        'log_level': logging.INFO,
+    }
+    if parsed_args.quiet:
+        result['log_level'] = logging.WARNING
+    elif parsed_args.debug:
+        result['log_level'] = logging.DEBUG
+    return result
+
+
+def main():
+    cli_args = parse_cli_args()
+    config = read_config_file_hierarchy(ChainMap(DEFAULT_CONFIG))
+    config = ChainMap(config, DEFAULT_CONFIG)
+
+    xivo_logging.setup_logging('/dev/null', log_level=cli_args['log_level'])
+
+    engine = create_engine(config['db_uri'])
+    with engine.begin() as connection:
+        if cli_args['action'] == 'convert':
+            partitioning.convert(connection, cli_args['months_ahead'])
+        else:
+            partitioning.create_partitions(connection, cli_args['months_ahead'])
+
+
+if __name__ == '__main__':
+    main()
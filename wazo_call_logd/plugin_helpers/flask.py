@@ -1,8 +1,16 @@
-# Copyright 2020-2021 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2020-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
+import logging
+import os
 from urllib import parse
 
+from flask import current_app, make_response, send_file
+
+from wazo_call_logd.utils import check_readable
+
+logger = logging.getLogger(__name__)
+
 
 def extract_connection_params(headers):
     result = {}
@@ -18,3 +26,45 @@ def extract_connection_params(headers):
         result['prefix'] = prefix
 
     return result
+
+
+def send_download(path, mimetype, download_name, as_attachment=True):
+    offload = current_app.config.get('download_offload') or {}
+    if offload.get('enabled'):
+        location = offload_location(path, offload.get('locations') or {})
+        if location:
+            # NOTE: the fronting web server reads the file and handles ranges.
+            # A missing or unreadable file is raised here, like send_file, the
+            # web server would answer its own 404
+            check_readable(path)
+            response = make_response('')
+            response.headers[offload.get('header') or 'X-Accel-Redirect'] = location
+            response.headers['Content-Type'] = mimetype
+            disposition = 'attachment' if as_attachment else 'inline'
+            response.headers.set(
+                'Content-Disposition', disposition, filename=download_name
+            )
+            return response
+        logger.debug('No download offload location for "%s"', path)
+
+    return send_file(
+        path,
+        mimetype=mimetype,
+        as_attachment=as_attachment,
+        download_name=download_name,
+    )
+
+
+def offload_location(path, locations):
+    # NOTE: without locations, the file path is sent as is, like X-Sendfile
+    if not locations:
+        return path
+
+    path = os.path.normpath(path)
+    locations = {os.path.normpath(d): uri for d, uri in locations.items()}
+    for directory in sorted(locations, key=len, reverse=True):
+        if os.path.commonpath([directory, path]) != directory:
+            continue
+        relative = parse.quote(os.path.relpath(path, directory))
+        return f'{locations[directory].rstrip("/")}/{relative}'
+    return None
@@ -1,9 +1,18 @@
-# Copyright 2020-2021 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2020-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
+import os
+import tempfile
 from unittest import TestCase
 
-from ..flask import extract_connection_params
+from flask import Flask
+
+from ..flask import extract_connection_params, offload_location, send_download
+
+LOCATIONS = {
+    '/var/lib/wazo/sounds/tenants/': '/internal/recordings',
+    '/var/lib/wazo/sounds/tenants/special': '/internal/special/',
+}
 
 
 class TestExtractConnectionParams(TestCase):
@@ -63,3 +72,65 @@ class TestExtractConnectionParams(TestCase):
         assert result['hostname'] == '::1'
         assert result['port'] == 443
         assert result['prefix'] == '/api/auth'
+
+
+class TestOffloadLocation(TestCase):
+    def test_without_locations(self):
+        result = offload_location('/var/lib/wazo/sounds/tenants/a.wav', {})
+
+        assert result == '/var/lib/wazo/sounds/tenants/a.wav'
+
+    def test_longest_directory(self):
+        path = '/var/lib/wazo/sounds/tenants/special/a b.wav'
+
+        result = offload_location(path, LOCATIONS)
+
+        assert result == '/internal/special/a%20b.wav'
+
+    def test_outside_of_locations(self):
+        for path in ('/etc/passwd', '/var/lib/wazo/sounds/tenants/../../a.wav'):
+            assert offload_location(path, LOCATIONS) is None
+
+
+class TestSendDownload(TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        fd, self.path = tempfile.mkstemp()
+        os.write(fd, b'0123456789')
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_offloaded(self):
+        directory = os.path.dirname(self.path)
+        self.app.config['download_offload'] = {
+            'enabled': True,
+            'header': 'X-Accel-Redirect',
+            'locations': {directory: '/internal'},
+        }
+
+        with self.app.test_request_context():
+            response = send_download(self.path, 'audio/wav', 'a.wav')
+
+        location = f'/internal/{os.path.basename(self.path)}'
+        assert response.headers['X-Accel-Redirect'] == location
+        assert response.headers['Content-Disposition'] == 'attachment; filename=a.wav'
+        assert response.get_data() == b''
+
+    def test_offloaded_missing_file(self):
+        self.app.config['download_offload'] = {'enabled': True}
+        path = f'{self.path}.missing'
+
+        with self.app.test_request_context():
+            with self.assertRaises(FileNotFoundError):
+                send_download(path, 'audio/wav', 'a.wav')
+
+    def test_range(self):
+        with self.app.test_request_context(headers={'Range': 'bytes=2-4'}):
+            response = send_download(self.path, 'audio/wav', 'a.wav')
+            response.direct_passthrough = False
+
+            assert response.status_code == 206
+            assert response.get_data() == b'234'
+            response.close()
@@ -0,0 +1,196 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Archives of the recording exports. Recordings are stored as is, deflated, or
+transcoded to a compressed codec by a pool of ffmpeg processes. PCM recordings
+barely deflate, storing them is bound by the disk only.
+
+Archives are either written to a file or streamed as they are built.
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterable, Iterator, NamedTuple
+from zipfile import ZIP64_LIMIT, ZIP_DEFLATED, ZIP_STORED, ZipFile
+
+STORE = 'store'
+DEFLATE = 'deflate'
+TRANSCODE = 'transcode'
+COMPRESSIONS = (STORE, DEFLATE, TRANSCODE)
+FFMPEG_COMMAND = ['ffmpeg', '-nostdin', '-loglevel', 'error', '-i', 'pipe:0']
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+
+class TranscodingError(Exception):
+    def __init__(self, path, message):
+        super().__init__(f'Cannot transcode "{path}": {message}')
+        self.path = path
+
+
+class CompressionPolicy(NamedTuple):
+    method: str
+    level: int | None = None
+
+    @classmethod
+    def from_config(
+        cls,
+        config: dict[str, Any],
+        method: str | None = None,
+        level: int | None = None,
+    ) -> CompressionPolicy:
+        method = method or config['method']
+        if method != DEFLATE:
+            return cls(method)
+        return cls(method, config['level'] if level is None else level)
+
+
+class ExportArchive:
+    def __init__(
+        self,
+        path: str,
+        policy: CompressionPolicy,
+        transcoding: dict[str, Any],
+    ) -> None:
+        self.path = path
+        self.policy = policy
+        self.media_size = 0
+        self._transcoding = transcoding
+        self._zip_file = None
+        self._executor = None
+        self._tmp_dir = None
+
+    def __enter__(self):
+        if self.policy.method == DEFLATE:
+            self._zip_file = ZipFile(
+                self.path,
+                mode='w',
+                compression=ZIP_DEFLATED,
+                compresslevel=self.policy.level,
+            )
+        else:
+            self._zip_file = ZipFile(self.path, mode='w', compression=ZIP_STORED)
+        if self.policy.method == TRANSCODE:
+            directory = os.path.dirname(self.path)
+            self._tmp_dir = tempfile.mkdtemp(dir=directory, prefix='.transcoding-')
+            self._executor = ThreadPoolExecutor(
+                max_workers=self._transcoding['workers']
+            )
+        return self
+
+    def __exit__(self, *args):
+        try:
+            if self._executor:
+                self._executor.shutdown(cancel_futures=True)
+            if self._tmp_dir:
+                shutil.rmtree(self._tmp_dir, ignore_errors=True)
+        finally:
+            self._zip_file.close()
+
+    @property
+    def size(self) -> int:
+        return os.path.getsize(self.path)
+
+    def write(self, members: Iterable[tuple[str, str]]) -> Iterator[str]:
+        """
+        Add the (path, archive name) members in order, yielding the archive
+        name of each member once written. An error reading or transcoding a
+        member is raised when it is its turn.
+        """
+        if self.policy.method != TRANSCODE:
+            for path, name in members:
+                self.media_size += os.path.getsize(path)
+                self._zip_file.write(path, arcname=name)
+                yield name
+            return
+
+        members = list(members)
+        transcoded = self._executor.map(self._transcode, (path for path, _ in members))
+        extension = self._transcoding['extension']
+        for (_, name), (media_size, output) in zip(members, transcoded):
+            name = f'{os.path.splitext(name)[0]}.{extension}'
+            self.media_size += media_size
+            self._zip_file.write(output, arcname=name)
+            os.remove(output)
+            yield name
+
+    def _transcode(self, path: str) -> tuple[int, str]:
+        command = [
+            *FFMPEG_COMMAND,
+            *self._transcoding['options'],
+            '-f',
+            self._transcoding['format'],
+            'pipe:1',
+        ]
+        fd, output = tempfile.mkstemp(dir=self._tmp_dir)
+        with open(path, 'rb') as source, os.fdopen(fd, 'wb') as target:
+            media_size = os.fstat(source.fileno()).st_size
+            try:
+                process = subprocess.run(
+                    command, stdin=source, stdout=target, stderr=subprocess.PIPE
+                )
+            except OSError as e:
+                raise TranscodingError(path, e)
+        if process.returncode:
+            message = process.stderr.decode(errors='replace').strip()
+            raise TranscodingError(path, message or f'exit {process.returncode}')
+        return media_size, output
+
+
+class _StreamBuffer(io.RawIOBase):
+    # NOTE: not seekable, the zip file writes data descriptors instead of
+    # seeking back to the headers
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def pop(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_archive(
+    members: Iterable[tuple[str, str]],
+    policy: CompressionPolicy,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+) -> Iterator[bytes]:
+    """
+    Yield a zip archive of the (path, archive name) members as it is built,
+    without storing it. Transcoding is not available.
+    """
+    if policy.method == TRANSCODE:
+        raise ValueError('recordings cannot be transcoded while streamed')
+
+    buffer = _StreamBuffer()
+    if policy.method == DEFLATE:
+        zip_file = ZipFile(
+            buffer, mode='w', compression=ZIP_DEFLATED, compresslevel=policy.level
+        )
+    else:
+        zip_file = ZipFile(buffer, mode='w', compression=ZIP_STORED)
+    with zip_file:
+        for path, name in members:
+            with open(path, 'rb') as source:
+                force_zip64 = os.fstat(source.fileno()).st_size > ZIP64_LIMIT
+                with zip_file.open(name, mode='w', force_zip64=force_zip64) as target:
+                    while chunk := source.read(chunk_size):
+                        target.write(chunk)
+                        if data := buffer.pop():
+                            yield data
+            if data := buffer.pop():
+                yield data
+    yield buffer.pop()
@@ -0,0 +1,136 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Writers of the CDR exports, fed with pages of dumped CDRs. Their output is
+the same as the CSV and JSON representations of /cdr.
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+import os
+import tempfile
+from datetime import datetime
+from typing import Any
+from uuid import UUID
+
+CDR_EXPORT_FORMATS = ('csv', 'ndjson')
+CDR_EXPORT_MIMETYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+CSV_HEADERS = [
+    'id',
+    'tenant_uuid',
+    'answered',
+    'start',
+    'answer',
+    'end',
+    'destination_extension',
+    'destination_name',
+    'destination_internal_extension',
+    'destination_internal_context',
+    'destination_user_uuid',
+    'destination_line_id',
+    'duration',
+    'call_direction',
+    'call_status',
+    'requested_name',
+    'requested_extension',
+    'requested_context',
+    'requested_internal_extension',
+    'requested_internal_context',
+    'requested_user_uuid',
+    'source_extension',
+    'source_name',
+    'source_internal_name',
+    'source_internal_extension',
+    'source_internal_context',
+    'source_user_uuid',
+    'source_line_id',
+    'tags',
+    # recording_{x}_{key},  # Added dynamically
+]
+DATETIME_PARAMETERS = ('start', 'end')
+
+
+def dump_parameters(params: dict[str, Any]) -> dict[str, Any]:
+    """Filters of the CDR list as stored with the export"""
+
+    def dump(value):
+        if isinstance(value, datetime):
+            return value.isoformat()
+        if isinstance(value, UUID):
+            return str(value)
+        if isinstance(value, (list, tuple)):
+            return [dump(item) for item in value]
+        return value
+
+    return {key: dump(value) for key, value in params.items() if value is not None}
+
+
+def load_parameters(parameters: dict[str, Any]) -> dict[str, Any]:
+    params = dict(parameters)
+    for key in DATETIME_PARAMETERS:
+        if params.get(key):
+            params[key] = datetime.fromisoformat(params[key])
+    return params
+
+
+def flatten_cdr(cdr: dict[str, Any], csv_headers: list[str]) -> dict[str, Any]:
+    if 'tags' in cdr:
+        cdr['tags'] = ';'.join(cdr['tags'])
+
+    for x, recording in enumerate(cdr.pop('recordings'), start=1):
+        for key in recording.keys():
+            csv_key = f'recording_{x}_{key}'
+            if csv_key not in csv_headers:
+                csv_headers.append(csv_key)
+            cdr[csv_key] = recording[key]
+    return cdr
+
+
+class CSVWriter:
+    # NOTE: the recording columns are only known once every CDR is written,
+    # rows are written to a temporary file and padded once the header is known
+
+    def __init__(self, path: str) -> None:
+        self._path = path
+        self._headers = CSV_HEADERS.copy()
+        self._body = tempfile.TemporaryFile('w+', newline='', dir=os.path.dirname(path))
+        self._writer = csv.writer(self._body)
+
+    def write(self, cdrs: list[dict[str, Any]]) -> None:
+        for cdr in cdrs:
+            flatten_cdr(cdr, self._headers)
+            self._writer.writerow([cdr.get(header) for header in self._headers])
+
+    def close(self) -> None:
+        with self._body, open(self._path, 'w', newline='') as output:
+            writer = csv.writer(output)
+            writer.writerow(self._headers)
+            self._body.seek(0)
+            width = len(self._headers)
+            for row in csv.reader(self._body):
+                writer.writerow(row + [''] * (width - len(row)))
+
+
+class NDJSONWriter:
+    def __init__(self, path: str) -> None:
+        self._output = open(path, 'w')
+
+    def write(self, cdrs: list[dict[str, Any]]) -> None:
+        for cdr in cdrs:
+            self._output.write(json.dumps(cdr, separators=(',', ':')))
+            self._output.write('\n')
+
+    def close(self) -> None:
+        self._output.close()
+
+
+CDR_WRITERS = {
+    'csv': CSVWriter,
+    'ndjson': NDJSONWriter,
+}
@@ -4,11 +4,13 @@
 import logging
 import os
 import smtplib
+import time
+import wave
 from collections import namedtuple
+from datetime import datetime, timedelta, timezone
 from email import policy
 from email import utils as email_utils
 from email.message import EmailMessage
-from zipfile import ZIP_DEFLATED, ZipFile
 
 from celery import Task
 from wazo_auth_client import Client as AuthClient
@@ -17,14 +19,21 @@ from wazo_call_logd.bus import BusPublisher
 from wazo_call_logd.email import TemplateFormatter
 from wazo_call_logd.plugins.export.notifier import ExportNotifier
 
+from . import peaks
+from .archive import CompressionPolicy, ExportArchive, TranscodingError
+from .cdr_export import CDR_WRITERS, load_parameters
 from .exceptions import (
     RecordingMediaFSNotFoundException,
     RecordingMediaFSPermissionException,
 )
+from .serializers import CDRSerializer
 
 logger = logging.getLogger(__name__)
 
 export_recording_task = None
+export_cdr_task = None
+recording_peaks_task = None
+cdr_serializer = CDRSerializer()
 
 EmailDestination = namedtuple('EmailDestination', ['name', 'address'])
 
@@ -40,85 +49,302 @@ class Plugin:
         def _export_recording_task(
             task,
             task_uuid,
-            recordings,
             output_dir,
             tenant_uuid,
             email,
             connection_info,
+            shard_index=0,
         ):
+            if isinstance(output_dir, list):
+                # NOTE: queued by a previous version with the recordings
+                # instead of the output directory, its export was set in error
+                # by the upgrade
+                logger.error('Export %s: queued by a previous version', task_uuid)
+                return
             task._run(
                 config,
                 dao,
                 task_uuid,
-                recordings,
                 output_dir,
                 tenant_uuid,
                 email,
                 connection_info,
+                shard_index,
             )
 
         export_recording_task = _export_recording_task
 
+        global export_cdr_task
 
-class RecordingExportTask(Task):
+        @app.task(base=CDRExportTask, bind=True)
+        def _export_cdr_task(task, export_uuid, output_dir):
+            task._run(config, dao, export_uuid, output_dir)
+
+        export_cdr_task = _export_cdr_task
+
+        global recording_peaks_task
+
+        @app.task(base=RecordingPeaksTask, bind=True)
+        def _recording_peaks_task(task, recording_path):
+            task._run(recording_path)
+
+        recording_peaks_task = _recording_peaks_task
+
+        if writer := dependencies.get('writer'):
+            writer.subscribe(compute_recordings_peaks)
+
+
+def compute_recordings_peaks(call_logs):
+    # NOTE: call logs are written once their recordings are finalized
+    paths = [
+        recording.path
+        for call_log in call_logs
+        for recording in call_log.recordings
+        if recording.path
+    ]
+    schedule_recordings_peaks(paths)
+
+
+def schedule_recordings_peaks(paths):
+    for path in paths:
+        try:
+            # NOTE: the peaks are computed once, whatever the requests meanwhile
+            if not peaks.mark_pending(path):
+                continue
+            recording_peaks_task.apply_async(args=(path,))
+        except Exception as e:
+            # NOTE: peaks are computed when requested again instead
+            logger.error('Cannot schedule the computation of recording peaks: %s', e)
+            peaks.unmark_pending(path)
+
+
+class RecordingPeaksTask(Task):
+    def _run(self, recording_path):
+        try:
+            recording_peaks = peaks.compute_peaks(recording_path)
+            peaks.write_peaks(recording_path, recording_peaks)
+        except (OSError, wave.Error, EOFError) as e:
+            # NOTE: left pending, computed again once pending for too long
+            logger.error('Cannot compute peaks of "%s": %s', recording_path, e)
+            return
+        peaks.unmark_pending(recording_path)
+
+
+class ExportTask(Task):
+    # NOTE: exports are long, they are consumed by their own workers, see
+    # celery.route_task
+    work_class = 'exports'
+    # NOTE: only retried while waiting for a slot of the tenant limits
+    max_retries = None
+
+    def _start_shard(self, config, dao, export_uuid, shard_index):
+        limits = config['exports']['tenant_limits']
+        now = datetime.now(timezone.utc)
+        stale_since = None
+        if stale_after := limits['stale_after']:
+            stale_since = now - timedelta(seconds=stale_after)
+        export = dao.export.start_shard(
+            export_uuid, shard_index, now, limits['max_processing'], stale_since
+        )
+        if not export:
+            # NOTE: the worker is released until the tenant has a slot. Waiting
+            # is not a failure, a slot is freed when a shard finishes or when
+            # it is processing for longer than stale_after
+            logger.debug(
+                'Export %s shard %s: tenant limit reached, retrying in %ss',
+                export_uuid,
+                shard_index,
+                limits['retry_delay'],
+            )
+            raise self.retry(countdown=limits['retry_delay'])
+        return export
+
+    def _set_error(self, dao, notifier, export_uuid, shard_index=0):
+        export = dao.export.update_shard(
+            export_uuid,
+            shard_index,
+            status='error',
+            finished_at=datetime.now(timezone.utc),
+        )
+        notifier.updated(export)
+
+
+class CDRExportTask(ExportTask):
+    def _run(self, config, dao, export_uuid, output_dir):
+        bus_publisher = BusPublisher(service_uuid=config['uuid'], **config['bus'])
+        notifier = ExportNotifier(bus_publisher)
+        export = self._start_shard(config, dao, export_uuid, 0)
+        notifier.updated(export)
+
+        export_config = config['exports']
+        params = load_parameters(export.parameters)
+        fullpath = os.path.join(output_dir, f'{export_uuid}.{export.format}')
+        processed_count = 0
+        try:
+            # NOTE: the CDR count stands for the recording count of the progress
+            cdr_count = _cdr_count(dao, params)
+            export = dao.export.update_shard(export_uuid, 0, recording_count=cdr_count)
+            notifier.updated(export)
+
+            writer = CDR_WRITERS[export.format](fullpath)
+            pages = dao.call_log.iter_pages_in_period(
+                params, export_config['cdr_page_size']
+            )
+            reported_at = time.monotonic()
+            try:
+                for page in pages:
+                    writer.write(cdr_serializer.dump_many(page))
+                    processed_count += len(page)
+
+                    now = time.monotonic()
+                    if now - reported_at < export_config['progress_interval']:
+                        continue
+                    reported_at = now
+                    export = dao.export.update_shard(
+                        export_uuid, 0, processed_count=processed_count
+                    )
+                    notifier.updated(export)
+            finally:
+                pages.close()
+                writer.close()
+        except Exception as e:
+            logger.error('Export %s: cannot export the CDRs: %s', export_uuid, e)
+            self._set_error(dao, notifier, export_uuid)
+            raise
+
+        size = os.path.getsize(fullpath)
+        export = dao.export.update_shard(
+            export_uuid,
+            0,
+            status='finished',
+            recording_count=processed_count,
+            processed_count=processed_count,
+            path=fullpath,
+            finished_at=datetime.now(timezone.utc),
+            size=size,
+        )
+        notifier.updated(export)
+        logger.info(
+            'Export %s: %s CDRs written in %s bytes', export_uuid, processed_count, size
+        )
+
+
+def _cdr_count(dao, params):
+    count = dao.call_log.count_in_period(params)['filtered']
+    if offset := params.get('offset'):
+        count = max(count - offset, 0)
+    if limit := params.get('limit'):
+        count = min(count, limit)
+    return count
+
+
+class RecordingExportTask(ExportTask):
     def _run(
         self,
         config,
         dao,
         task_uuid,
-        recordings,
         output_dir,
         tenant_uuid,
         email,
         connection_info,
+        shard_index=0,
     ):
         bus_publisher = BusPublisher(service_uuid=config['uuid'], **config['bus'])
-        export = dao.export.get(task_uuid, [tenant_uuid])
-        export.status = 'processing'
-        dao.export.update(export)
         notifier = ExportNotifier(bus_publisher)
+        export = self._start_shard(config, dao, task_uuid, shard_index)
         notifier.updated(export)
 
-        filename = f'{task_uuid}.zip'
+        export_config = config['exports']
+        compression_policy = CompressionPolicy.from_config(
+            export_config['compression'], export.compression, export.compression_level
+        )
+        if len(export.shards) == 1:
+            filename = f'{task_uuid}.zip'
+        else:
+            filename = f'{task_uuid}-{shard_index}.zip'
         fullpath = os.path.join(output_dir, filename)
-        with ZipFile(fullpath, mode='w', compression=ZIP_DEFLATED) as zip_file:
-            for recording in recordings:
-                try:
-                    archive_name = os.path.join(
-                        str(recording['call_log_id']), recording['filename']
-                    )
-                    zip_file.write(recording['path'], arcname=archive_name)
-                except PermissionError:
-                    logger.error('Permission denied: "%s"', recording['path'])
-                    export.status = 'error'
-                    dao.export.update(export)
-                    notifier.updated(export)
-                    raise RecordingMediaFSPermissionException(
-                        recording['uuid'],
-                        recording['path'],
+        # NOTE: the manifest is read from the database, one page at a time
+        pages = dao.export.iter_recording_pages(
+            task_uuid,
+            export.shard_recordings(shard_index),
+            export_config['manifest_page_size'],
+        )
+        archive = ExportArchive(
+            fullpath, compression_policy, export_config['transcoding']
+        )
+        processed_count = 0
+        with archive:
+            reported_at = time.monotonic()
+            for page in pages:
+                members = (
+                    (recording.path, recording.archive_name) for recording in page
+                )
+                written = archive.write(members)
+                # NOTE: each member is written, and its errors raised, by its next()
+                for recording in page:
+                    try:
+                        next(written)
+                    except PermissionError:
+                        logger.error('Permission denied: "%s"', recording.path)
+                        self._set_error(dao, notifier, task_uuid, shard_index)
+                        raise RecordingMediaFSPermissionException(
+                            recording.recording_uuid,
+                            recording.path,
+                        )
+                    except FileNotFoundError:
+                        logger.error('Recording file not found: "%s"', recording.path)
+                        self._set_error(dao, notifier, task_uuid, shard_index)
+                        raise RecordingMediaFSNotFoundException(
+                            recording.recording_uuid,
+                            recording.path,
+                        )
+                    except TranscodingError as e:
+                        logger.error('%s', e)
+                        self._set_error(dao, notifier, task_uuid, shard_index)
+                        raise
+                    processed_count += 1
+
+                    now = time.monotonic()
+                    if now - reported_at < export_config['progress_interval']:
+                        continue
+                    reported_at = now
+                    export = dao.export.update_shard(
+                        task_uuid,
+                        shard_index,
+                        processed_count=processed_count,
+                        media_size=archive.media_size,
                     )
-                except FileNotFoundError:
-                    logger.error('Recording file not found: "%s"', recording['path'])
-                    export.status = 'error'
-                    dao.export.update(export)
                     notifier.updated(export)
-                    raise RecordingMediaFSNotFoundException(
-                        recording['uuid'],
-                        recording['path'],
-                    )
 
-        export.path = fullpath
-        export.status = 'finished'
-        dao.export.update(export)
+        export = dao.export.update_shard(
+            task_uuid,
+            shard_index,
+            status='finished',
+            processed_count=processed_count,
+            path=fullpath,
+            finished_at=datetime.now(timezone.utc),
+            media_size=archive.media_size,
+            size=archive.size,
+        )
         notifier.updated(export)
-        if email:
+        logger.info(
+            'Export %s shard %s: %s recordings, %s bytes archived in %s bytes',
+            task_uuid,
+            shard_index,
+            processed_count,
+            archive.media_size,
+            archive.size,
+        )
+        # NOTE: only the last shard to finish sees its export finished
+        if email and export.status == 'finished':
             self._send_email(
-                task_uuid, tenant_uuid, 'Wazo user', email, config, connection_info
+                export, tenant_uuid, 'Wazo user', email, config, connection_info
             )
 
     def _send_email(
         self,
-        task_uuid,
+        export,
         tenant_uuid,
         destination_name,
         destination_address,
@@ -157,8 +383,10 @@ class RecordingExportTask(Task):
 
         template_formatter = TemplateFormatter(config)
         context = {
-            'export_uuid': task_uuid,
+            'export_uuid': export.uuid,
             'tenant_uuid': tenant_uuid,
+            # NOTE: each shard is downloaded with its own link
+            'shard_count': len(export.shards),
             'token': token_uuid,
             **connection_info,
         }
@@ -1,4 +1,4 @@
-# Copyright 2017-2021 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2017-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from xivo.rest_api_helpers import APIException
@@ -34,6 +34,16 @@ class RecordingMediaNotFoundException(APIException):
         )
 
 
+class RecordingPeaksNotDoneYetException(APIException):
+    def __init__(self, recording_uuid):
+        super().__init__(
+            status_code=202,
+            message='Recording peaks: not done yet',
+            error_id='recording-peaks-not-done-yet',
+            details={'recording_uuid': str(recording_uuid)},
+        )
+
+
 class RecordingMediaFSNotFoundException(APIException):
     def __init__(self, recording_uuid, recording_path):
         super().__init__(
@@ -69,15 +79,13 @@ class RecordingMediaFSPermissionException(APIException):
         )
 
 
-class CDRRecordingMediaFSPermissionException(APIException):
-    def __init__(self, cdr_id, recording_uuid, recording_path):
+class CDRRecordingsMediaFSException(APIException):
+    def __init__(self, failures):
+        # NOTE: the first failure is kept at the top of the details, like the
+        # permission error of a single recording
         super().__init__(
             status_code=500,
-            message='Recording media: permission denied',
+            message='Recording media: some files could not be deleted',
             error_id='recording-media-permission-denied',
-            details={
-                'cdr_id': cdr_id,
-                'recording_uuid': str(recording_uuid),
-                'recording_path': recording_path,
-            },
+            details={**failures[0], 'failures': failures},
         )
@@ -1,11 +1,11 @@
-# Copyright 2017-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2017-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 import csv
 import logging
 from io import StringIO
 
-from flask import g, jsonify, make_response, request, send_file, url_for
+from flask import g, jsonify, make_response, request, url_for
 from xivo import tenant_helpers
 from xivo.auth_verifier import required_acl
 from xivo.tenant_flask_helpers import Tenant, auth_client, token
@@ -15,60 +15,39 @@ from wazo_call_logd.auth import (
     get_token_pbx_user_uuid_from_request,
 )
 from wazo_call_logd.http import AuthResource
-from wazo_call_logd.plugin_helpers.flask import extract_connection_params
+from wazo_call_logd.plugin_helpers.flask import (
+    extract_connection_params,
+    send_download,
+)
+from wazo_call_logd.profiling import timed
 
+from .cdr_export import CSV_HEADERS, flatten_cdr
 from .exceptions import (
     CDRNotFoundException,
-    CDRRecordingMediaFSPermissionException,
+    CDRRecordingsMediaFSException,
     NoRecordingToExportException,
     RecordingMediaFSNotFoundException,
     RecordingMediaFSPermissionException,
     RecordingMediaNotFoundException,
     RecordingNotFoundException,
+    RecordingPeaksNotDoneYetException,
 )
 from .schemas import (
+    CDRAggregateListSchema,
+    CDRAggregateRequestSchema,
+    CDRExportRequestSchema,
+    CDRExportSchema,
     CDRListRequestSchema,
-    CDRSchema,
-    CDRSchemaList,
     RecordingMediaDeleteRequestSchema,
     RecordingMediaExportBodySchema,
     RecordingMediaExportRequestSchema,
     RecordingMediaExportSchema,
 )
+from .serializers import CDRSerializer
 
 logger = logging.getLogger(__name__)
-CSV_HEADERS = [
-    'id',
-    'tenant_uuid',
-    'answered',
-    'start',
-    'answer',
-    'end',
-    'destination_extension',
-    'destination_name',
-    'destination_internal_extension',
-    'destination_internal_context',
-    'destination_user_uuid',
-    'destination_line_id',
-    'duration',
-    'call_direction',
-    'call_status',
-    'requested_name',
-    'requested_extension',
-    'requested_context',
-    'requested_internal_extension',
-    'requested_internal_context',
-    'requested_user_uuid',
-    'source_extension',
-    'source_name',
-    'source_internal_name',
-    'source_internal_extension',
-    'source_internal_context',
-    'source_user_uuid',
-    'source_line_id',
-    'tags',
-    # recording_{x}_{key},  # Added dynamically
-]
+cdr_serializer = CDRSerializer()
+user_cdr_serializer = CDRSerializer(exclude=('tags',))
 
 
 def _is_error(data):
@@ -83,6 +62,7 @@ def _is_single_cdr(data):
     return 'id' in data and 'tags' in data
 
 
+@timed('csv')
 def _output_csv(data, code, http_headers=None):
     if _is_error(data):
         response = jsonify(data)
@@ -91,17 +71,7 @@ def _output_csv(data, code, http_headers=None):
         csv_body = []
         items = data['items'] if _is_cdr_list(data) else [data]
         for cdr in items:
-            if 'tags' in cdr:
-                cdr['tags'] = ';'.join(cdr['tags'])
-
-            for x, recording in enumerate(cdr.pop('recordings'), start=1):
-                for key in recording.keys():
-                    csv_key = f'recording_{x}_{key}'
-                    if csv_key not in csv_headers:
-                        csv_headers.append(csv_key)
-                    cdr[csv_key] = recording[key]
-
-            csv_body.append(cdr)
+            csv_body.append(flatten_cdr(cdr, csv_headers))
 
         csv_text = StringIO()
         writer = csv.DictWriter(csv_text, csv_headers, extrasaction='ignore')
@@ -152,6 +122,7 @@ class CDRAuthResource(AuthResource):
         g.token = tenant_helpers.Token(token_uuid, auth_client)
         auth_client.set_token(g.token.uuid)
 
+    @timed('auth')
     def query_or_header_visible_tenants(self, recurse=True):
         self._set_up_token_helper_to_verify_tenant()
         tenant_uuid = Tenant.autodetect(include_query=True).uuid
@@ -160,6 +131,7 @@ class CDRAuthResource(AuthResource):
         else:
             return [tenant_uuid]
 
+    @timed('auth')
     def visible_tenants(self, recurse=True):
         tenant_uuid = Tenant.autodetect().uuid
         if recurse:
@@ -176,7 +148,22 @@ class CDRResource(CDRAuthResource):
         args = CDRListRequestSchema().load(request.args)
         args['tenant_uuids'] = self.query_or_header_visible_tenants(args['recurse'])
         cdrs = self.cdr_service.list(args)
-        return format_cdr_result(CDRSchemaList().dump(cdrs))
+        with timed('serialize'):
+            result = cdr_serializer.dump_list(cdrs)
+        return format_cdr_result(result)
+
+
+class CDRAggregatesResource(CDRAuthResource):
+    @required_acl(
+        'call-logd.cdr.aggregates.read',
+        extract_token_id=extract_token_id_from_query_or_header,
+    )
+    def get(self):
+        args = CDRAggregateRequestSchema().load(request.args)
+        args['tenant_uuids'] = self.query_or_header_visible_tenants(args['recurse'])
+        aggregates = self.cdr_service.aggregate(args)
+        with timed('serialize'):
+            return CDRAggregateListSchema().dump(aggregates)
 
 
 class CDRIdResource(CDRAuthResource):
@@ -186,7 +173,9 @@ class CDRIdResource(CDRAuthResource):
         cdr = self.cdr_service.get(cdr_id, tenant_uuids)
         if not cdr:
             raise CDRNotFoundException(details={'cdr_id': cdr_id})
-        return format_cdr_result(CDRSchema().dump(cdr))
+        with timed('serialize'):
+            result = cdr_serializer.dump(cdr)
+        return format_cdr_result(result)
 
 
 class CDRUserResource(CDRAuthResource):
@@ -199,7 +188,9 @@ class CDRUserResource(CDRAuthResource):
         args['user_uuids'] = [user_uuid]
         args['tenant_uuids'] = self.query_or_header_visible_tenants(args['recurse'])
         cdrs = self.cdr_service.list(args)
-        return format_cdr_result(CDRSchemaList().dump(cdrs))
+        with timed('serialize'):
+            result = cdr_serializer.dump_list(cdrs)
+        return format_cdr_result(result)
 
 
 class CDRUserMeResource(CDRAuthResource):
@@ -217,7 +208,28 @@ class CDRUserMeResource(CDRAuthResource):
         args['me_user_uuid'] = user_uuid
         args['tenant_uuids'] = self.query_or_header_visible_tenants(recurse=False)
         cdrs = self.cdr_service.list(args)
-        return format_cdr_result(CDRSchemaList(exclude=['items.tags']).dump(cdrs))
+        with timed('serialize'):
+            result = user_cdr_serializer.dump_list(cdrs)
+        return format_cdr_result(result)
+
+
+class CDRExportResource(CDRAuthResource):
+    def __init__(self, cdr_export_service, cdr_service):
+        super().__init__(cdr_service)
+        self.cdr_export_service = cdr_export_service
+
+    @required_acl('call-logd.cdr.export.create')
+    def post(self):
+        args = CDRExportRequestSchema().load(request.args)
+        args['tenant_uuids'] = self.visible_tenants(args['recurse'])
+        export = self.cdr_export_service.start_cdr_export(
+            args, token.user_uuid, token.tenant_uuid
+        )
+        export_body = CDRExportSchema().dump(export)
+        location = url_for('export_resource', export_uuid=export['uuid'])
+        headers = {'Location': location}
+
+        return export_body, 202, headers
 
 
 class RecordingsMediaExportResource(CDRAuthResource):
@@ -251,6 +263,9 @@ class RecordingsMediaExportResource(CDRAuthResource):
             token.tenant_uuid,
             destination_email,
             connection_info,
+            args['compression'],
+            args['compression_level'],
+            args['delivery'],
         )
         export_body = RecordingMediaExportSchema().dump(export)
         location = url_for('export_resource', export_uuid=export['uuid'])
@@ -269,29 +284,13 @@ class RecordingsMediaResource(CDRAuthResource):
         args = RecordingMediaDeleteRequestSchema().load(request.get_json(force=True))
         tenant_uuids = self.visible_tenants(recurse=True)
         call_log_ids = args['cdr_ids']
-        recordings_to_delete = []
         # We do not want to delete any recording if one of the CDR has not been found
-        for cdr_id in call_log_ids:
-            cdr = self.cdr_service.get(cdr_id, tenant_uuids)
-            if not cdr:
-                raise CDRNotFoundException(details={'cdr_id': cdr_id})
-            recordings_to_delete.extend(cdr.recordings)
-
-        for recording in recordings_to_delete:
-            try:
-                self.recording_service.delete_media(
-                    recording.call_log_id, recording.uuid, recording.path
-                )
-            except PermissionError:
-                logger.error('Permission denied: "%s"', recording.path)
-                raise CDRRecordingMediaFSPermissionException(
-                    recording.call_log_id, recording.uuid, recording.path
-                )
-            except FileNotFoundError:
-                logger.info(
-                    'Recording file already deleted: "%s". Marking as such.',
-                    recording.path,
-                )
+        if missing := self.cdr_service.find_missing_ids(call_log_ids, tenant_uuids):
+            raise CDRNotFoundException(details={'cdr_id': missing[0]})
+
+        failures = self.recording_service.delete_cdrs_media(call_log_ids, tenant_uuids)
+        if failures:
+            raise CDRRecordingsMediaFSException(failures)
         return '', 204
 
 
@@ -321,11 +320,11 @@ class RecordingMediaItemResource(CDRAuthResource):
 
         as_attachment = 'range' not in request.headers
         try:
-            return send_file(
+            return send_download(
                 recording.path,
-                mimetype='audio/wav',
+                'audio/wav',
+                recording.filename,
                 as_attachment=as_attachment,
-                download_name=recording.filename,
             )
         except PermissionError:
             logger.error('Permission denied: "%s"', recording.path)
@@ -359,6 +358,43 @@ class RecordingMediaItemResource(CDRAuthResource):
         return '', 204
 
 
+class RecordingPeaksItemResource(CDRAuthResource):
+    def __init__(self, recording_service, cdr_service):
+        super().__init__(cdr_service)
+        self.recording_service = recording_service
+
+    @required_acl(
+        'call-logd.cdr.{cdr_id}.recordings.{recording_uuid}.peaks.read',
+        extract_token_id=extract_token_id_from_query_or_header,
+    )
+    def get(self, cdr_id, recording_uuid):
+        tenant_uuids = self.query_or_header_visible_tenants(recurse=True)
+        cdr = self.cdr_service.get(cdr_id, tenant_uuids)
+        if not cdr:
+            raise CDRNotFoundException(details={'cdr_id': cdr_id})
+
+        recording = self.recording_service.find_by(
+            uuid=recording_uuid, call_log_id=cdr_id
+        )
+        if not recording:
+            raise RecordingNotFoundException(recording_uuid)
+
+        if not recording.path:
+            raise RecordingMediaNotFoundException(recording_uuid)
+
+        try:
+            peaks = self.recording_service.get_peaks(recording)
+        except PermissionError:
+            logger.error('Permission denied: "%s"', recording.path)
+            raise RecordingMediaFSPermissionException(recording_uuid, recording.path)
+        except FileNotFoundError:
+            logger.error('Recording file not found: "%s"', recording.path)
+            raise RecordingMediaFSNotFoundException(recording_uuid, recording.path)
+        if peaks is None:
+            raise RecordingPeaksNotDoneYetException(recording_uuid)
+        return peaks
+
+
 class RecordingMediaItemUserMeResource(CDRAuthResource):
     def __init__(self, recording_service, cdr_service, auth_client):
         super().__init__(cdr_service)
@@ -386,11 +422,11 @@ class RecordingMediaItemUserMeResource(CDRAuthResource):
 
         as_attachment = 'range' not in request.headers
         try:
-            return send_file(
+            return send_download(
                 recording.path,
-                mimetype='audio/wav',
+                'audio/wav',
+                recording.filename,
                 as_attachment=as_attachment,
-                download_name=recording.filename,
             )
         except PermissionError:
             logger.error('Permission denied: "%s"', recording.path)
@@ -0,0 +1,119 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Waveform peaks of the recordings, in the JSON format of audiowaveform: the
+minimum and maximum 8 bits sample of each pixel, channels mixed together.
+"""
+
+import json
+import os
+import tempfile
+import time
+import wave
+
+import numpy as np
+
+PEAKS_SUFFIX = '.peaks.json'
+PENDING_SUFFIX = '.peaks.pending'
+# NOTE: peaks pending for longer are computed again, their worker was lost
+PENDING_TIMEOUT = 600
+PEAKS_LENGTH = 1000
+# NOTE: pixels read at once, the recording is never loaded in memory
+CHUNK_PIXELS = 256
+
+_DTYPES = {1: np.uint8, 2: np.dtype('<i2'), 4: np.dtype('<i4')}
+
+
+def peaks_path(recording_path):
+    return f'{os.path.splitext(recording_path)[0]}{PEAKS_SUFFIX}'
+
+
+def pending_path(recording_path):
+    return f'{os.path.splitext(recording_path)[0]}{PENDING_SUFFIX}'
+
+
+def mark_pending(recording_path, timeout=PENDING_TIMEOUT):
+    """Returns False when the peaks are already pending"""
+    path = pending_path(recording_path)
+    try:
+        os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644))
+        return True
+    except FileExistsError:
+        try:
+            if time.time() - os.path.getmtime(path) < timeout:
+                return False
+            os.utime(path)
+        except FileNotFoundError:
+            # NOTE: computed in the meantime, computing them again is harmless
+            pass
+        return True
+
+
+def unmark_pending(recording_path):
+    try:
+        os.remove(pending_path(recording_path))
+    except FileNotFoundError:
+        pass
+
+
+def compute_peaks(recording_path, length=PEAKS_LENGTH):
+    with wave.open(recording_path, 'rb') as recording:
+        channels = recording.getnchannels()
+        sample_width = recording.getsampwidth()
+        if sample_width not in _DTYPES:
+            raise wave.Error(f'unsupported sample width: {sample_width}')
+        frames = recording.getnframes()
+        samples_per_pixel = max(1, -(-frames // length))
+
+        data = []
+        while chunk := recording.readframes(samples_per_pixel * CHUNK_PIXELS):
+            samples = _to_8_bits(np.frombuffer(chunk, _DTYPES[sample_width]))
+            pixels = np.arange(0, len(samples), samples_per_pixel * channels)
+            minimums = np.minimum.reduceat(samples, pixels)
+            maximums = np.maximum.reduceat(samples, pixels)
+            data.extend(np.column_stack((minimums, maximums)).ravel().tolist())
+
+        return {
+            'version': 2,
+            'channels': 1,
+            'sample_rate': recording.getframerate(),
+            'samples_per_pixel': samples_per_pixel,
+            'bits': 8,
+            'length': len(data) // 2,
+            'data': data,
+        }
+
+
+def write_peaks(recording_path, peaks):
+    path = peaks_path(recording_path)
+    # NOTE: renamed once written, readers never see a partial file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=PEAKS_SUFFIX)
+    try:
+        with os.fdopen(fd, 'w') as tmp_file:
+            json.dump(peaks, tmp_file, separators=(',', ':'))
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return path
+
+
+def read_peaks(recording_path):
+    with open(peaks_path(recording_path)) as peaks_file:
+        return json.load(peaks_file)
+
+
+def remove_peaks(recording_path):
+    try:
+        os.remove(peaks_path(recording_path))
+    except FileNotFoundError:
+        pass
+    unmark_pending(recording_path)
+
+
+def _to_8_bits(samples):
+    if samples.dtype == np.uint8:
+        return samples.astype(np.int16) - 128
+    return samples >> (8 * samples.dtype.itemsize - 8)
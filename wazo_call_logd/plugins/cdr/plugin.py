@@ -1,4 +1,4 @@
-# Copyright 2017-2024 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2017-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from wazo_auth_client import Client as AuthClient
@@ -6,16 +6,19 @@ from wazo_auth_client import Client as AuthClient
 from wazo_call_logd.plugins.export.notifier import ExportNotifier
 
 from .http import (
+    CDRAggregatesResource,
+    CDRExportResource,
     CDRIdResource,
     CDRResource,
     CDRUserMeResource,
     CDRUserResource,
     RecordingMediaItemResource,
     RecordingMediaItemUserMeResource,
+    RecordingPeaksItemResource,
     RecordingsMediaExportResource,
     RecordingsMediaResource,
 )
-from .services import CDRService, RecordingService
+from .services import CDRExportService, CDRService, RecordingService
 
 
 class Plugin:
@@ -29,12 +32,23 @@ class Plugin:
         auth_client = AuthClient(**config['auth'])
         cdr_service = CDRService(dao)
         recording_service = RecordingService(dao, config, export_notifier)
+        cdr_export_service = CDRExportService(dao, config, export_notifier)
 
         api.add_resource(
             CDRResource,
             '/cdr',
             resource_class_args=[cdr_service],
         )
+        api.add_resource(
+            CDRAggregatesResource,
+            '/cdr/aggregates',
+            resource_class_args=[cdr_service],
+        )
+        api.add_resource(
+            CDRExportResource,
+            '/cdr/export',
+            resource_class_args=[cdr_export_service, cdr_service],
+        )
         api.add_resource(
             RecordingsMediaResource,
             '/cdr/recordings/media',
@@ -55,6 +69,11 @@ class Plugin:
             '/cdr/<int:cdr_id>/recordings/<uuid:recording_uuid>/media',
             resource_class_args=[recording_service, cdr_service],
         )
+        api.add_resource(
+            RecordingPeaksItemResource,
+            '/cdr/<int:cdr_id>/recordings/<uuid:recording_uuid>/peaks',
+            resource_class_args=[recording_service, cdr_service],
+        )
         api.add_resource(
             CDRUserResource,
             '/users/<uuid:user_uuid>/cdr',
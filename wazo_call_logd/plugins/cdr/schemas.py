@@ -6,10 +6,17 @@ from xivo.mallow import fields
 from xivo.mallow.validate import Length, OneOf, Range, Regexp
 from xivo.mallow_helpers import Schema
 
+from wazo_call_logd.database.models import EXPORT_DELIVERIES
 from wazo_call_logd.datatypes import CallStatus
+from wazo_call_logd.plugins.support_center.schemas import available_timezones
+
+from .archive import COMPRESSIONS
+from .cdr_export import CDR_EXPORT_FORMATS
 
 NUMBER_REGEX = r'^_?[0-9]+_?$'
 CONVERSATION_ID_REGEX = r'^[0-9]+\.[0-9]+$'
+AGGREGATE_GROUPS = ('call_status', 'call_direction', 'user_uuid')
+AGGREGATE_INTERVALS = ('hour', 'day', 'month')
 
 
 class RecordingSchema(Schema):
@@ -52,6 +59,9 @@ class CDRListingBase(Schema):
 
 class RecordingMediaExportRequestSchema(CDRListingBase):
     email = fields.Email(load_default=None)
+    compression = fields.String(validate=OneOf(COMPRESSIONS), load_default=None)
+    compression_level = fields.Integer(validate=Range(min=0, max=9), load_default=None)
+    delivery = fields.String(validate=OneOf(EXPORT_DELIVERIES), load_default=None)
 
 
 class RecordingMediaExportBodySchema(Schema):
@@ -170,9 +180,10 @@ class CDRSchema(Schema):
         if data.date_answer and data.date_end:
             data.marshmallow_duration = data.date_end - data.date_answer
 
-        # Canonical call_status definition. The SQL predicates in
-        # database/queries/call_log.py mirror this for filtering and ordering;
-        # keep them in sync. Precedence: blocked > voicemail > answered.
+        # Canonical call_status definition. The computed CallLog.call_status
+        # column mirrors this for filtering and ordering, and
+        # serializers.CDRSerializer for dumping; keep them in sync.
+        # Precedence: blocked > voicemail > answered.
         data.marshmallow_call_status = CallStatus.UNKNOWN.value
         if data.marshmallow_answered:
             data.marshmallow_call_status = CallStatus.ANSWERED.value
@@ -190,23 +201,13 @@ class CDRSchema(Schema):
 
     @pre_dump
     def _populate_tags_field(self, data, **kwargs):
-        data.marshmallow_tags = set()
-        for participant in data.participants:
-            data.marshmallow_tags.update(participant.tags)
+        # NOTE: union of the participants tags, see CallLog.denormalize_participants
+        data.marshmallow_tags = data.tags or []
         return data
 
 
-class CDRListRequestSchema(CDRListingBase):
-    direction = fields.String(validate=OneOf(['asc', 'desc']), load_default='desc')
-    order = fields.String(
-        validate=OneOf(set(CDRSchema().fields) - {'end', 'tags', 'recordings'}),
-        load_default='start',
-    )
-    limit = fields.Integer(validate=Range(min=0), load_default=1000)
-    offset = fields.Integer(validate=Range(min=0), load_default=None)
-    distinct = fields.String(validate=OneOf(['peer_exten']), load_default=None)
+class CDRFilterSchema(CDRListingBase):
     recorded = fields.Boolean(load_default=None)
-    format = fields.String(validate=OneOf(['csv', 'json']), load_default=None)
     call_status = fields.Enum(CallStatus, by_value=True)
     conversation_id = fields.String(
         validate=Regexp(
@@ -224,6 +225,18 @@ class CDRListRequestSchema(CDRListingBase):
         load_default=None,
     )
 
+
+class CDRListRequestSchema(CDRFilterSchema):
+    direction = fields.String(validate=OneOf(['asc', 'desc']), load_default='desc')
+    order = fields.String(
+        validate=OneOf(set(CDRSchema().fields) - {'end', 'tags', 'recordings'}),
+        load_default='start',
+    )
+    limit = fields.Integer(validate=Range(min=0), load_default=1000)
+    offset = fields.Integer(validate=Range(min=0), load_default=None)
+    distinct = fields.String(validate=OneOf(['peer_exten']), load_default=None)
+    format = fields.String(validate=OneOf(['csv', 'json']), load_default=None)
+
     @post_load
     def map_order_field(self, in_data, **kwargs):
         mapped_order = CDRSchema().fields[in_data['order']].attribute
@@ -232,6 +245,45 @@ class CDRListRequestSchema(CDRListingBase):
         return in_data
 
 
+class CDRExportRequestSchema(CDRListRequestSchema):
+    limit = fields.Integer(validate=Range(min=0), load_default=None)
+    format = fields.String(validate=OneOf(CDR_EXPORT_FORMATS), load_default='csv')
+
+
+class CDRExportSchema(Schema):
+    uuid = fields.UUID()
+
+
+class CDRAggregateRequestSchema(CDRFilterSchema):
+    group_by = fields.List(
+        fields.String(validate=OneOf(AGGREGATE_GROUPS)),
+        load_default=['call_status'],
+    )
+    interval = fields.String(validate=OneOf(AGGREGATE_INTERVALS), load_default=None)
+    timezone = fields.String(validate=OneOf(available_timezones()), load_default='UTC')
+
+    @pre_load
+    def convert_tags_and_user_uuid_to_list(self, data, **kwargs):
+        result = super().convert_tags_and_user_uuid_to_list(data, **kwargs)
+        if data.get('group_by'):
+            result['group_by'] = data['group_by'].split(',')
+        return result
+
+
+class CDRAggregateSchema(Schema):
+    from_ = fields.DateTime(data_key='from', attribute='from')
+    call_status = fields.String()
+    call_direction = fields.String()
+    user_uuid = fields.UUID()
+    count = fields.Integer()
+    duration = fields.Integer()
+    duration_max = fields.Integer()
+
+
+class CDRAggregateListSchema(Schema):
+    items = fields.Nested(CDRAggregateSchema, many=True)
+
+
 class CDRSchemaList(Schema):
     items = fields.Nested(CDRSchema, many=True)
     total = fields.Integer()
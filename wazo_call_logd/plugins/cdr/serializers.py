@@ -0,0 +1,193 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Precompiled dumpers producing the same output as CDRSchema and RecordingSchema.
+
+Marshmallow resolves every field, hook and nested schema for each dumped
+object, which dominates the time spent listing CDRs. These serializers build
+their field table once, at import time, and only run plain attribute accesses
+and conversions per row. CDRSchema stays the reference definition: any change
+to it must be mirrored here, test_serializers compares both outputs.
+"""
+
+from __future__ import annotations
+
+from operator import attrgetter
+
+from wazo_call_logd.datatypes import CallStatus
+
+
+def _string(value):
+    return None if value is None else str(value)
+
+
+def _integer(value):
+    return None if value is None else int(value)
+
+
+def _boolean(value):
+    return None if value is None else bool(value)
+
+
+def _datetime(value):
+    return None if value is None else value.isoformat()
+
+
+def _answered(call_log):
+    return True if call_log.date_answer else False
+
+
+def _duration(call_log):
+    if not (call_log.date_answer and call_log.date_end):
+        return None
+    duration = call_log.date_end - call_log.date_answer
+    # NOTE: same flooring as marshmallow's TimeDelta, then clamped like
+    # CDRSchema.fix_negative_duration
+    return max(duration.days * 86400 + duration.seconds, 0)
+
+
+def _call_status(call_log):
+    # Same precedence as CDRSchema._compute_fields
+    if call_log.blocked:
+        return CallStatus.BLOCKED.value
+    answered = True if call_log.date_answer else False
+    if call_log.reached_voicemail and not answered:
+        return CallStatus.VOICEMAIL.value
+    if answered:
+        return CallStatus.ANSWERED.value
+    return CallStatus.UNKNOWN.value
+
+
+def _tags(call_log):
+    return [_string(tag) for tag in call_log.tags or ()]
+
+
+_DESTINATION_DETAILS_FIELDS = {
+    'conference': (('conference_id', _integer),),
+    'meeting': (('meeting_uuid', _string), ('meeting_name', _string)),
+    'user': (('user_uuid', _string), ('user_name', _string)),
+    'unknown': (),
+    'group': (('group_label', _string), ('group_id', _integer)),
+    'voicemail': (('voicemail_id', _integer), ('voicemail_name', _string)),
+}
+
+
+def _destination_details(call_log):
+    details = call_log.destination_details_dict
+    type_ = _string(details['type']) if 'type' in details else 'unknown'
+    result = {'type': type_}
+    for key, convert in _DESTINATION_DETAILS_FIELDS[type_]:
+        if key in details:
+            result[key] = convert(details[key])
+    return result
+
+
+def _compile(fields, exclude):
+    return tuple(
+        (name, getter, convert)
+        for name, getter, convert in fields
+        if name not in exclude
+    )
+
+
+def _dump(compiled_fields, obj):
+    return {name: convert(getter(obj)) for name, getter, convert in compiled_fields}
+
+
+def _identity(value):
+    return value
+
+
+_RECORDING_FIELDS = (
+    ('uuid', attrgetter('uuid'), _string),
+    ('start_time', attrgetter('start_time'), _datetime),
+    ('end_time', attrgetter('end_time'), _datetime),
+    ('deleted', attrgetter('deleted'), _boolean),
+    ('filename', attrgetter('filename'), _string),
+    ('conversation_id', attrgetter('conversation_id'), _string),
+)
+
+
+class RecordingSerializer:
+    def __init__(self, exclude=()):
+        self._fields = _compile(_RECORDING_FIELDS, exclude)
+
+    def dump(self, recording):
+        return _dump(self._fields, recording)
+
+    def dump_many(self, recordings):
+        fields = self._fields
+        return [_dump(fields, recording) for recording in recordings]
+
+
+_cdr_recording_serializer = RecordingSerializer(exclude=('conversation_id',))
+
+
+def _recordings(call_log):
+    return _cdr_recording_serializer.dump_many(call_log.recordings)
+
+
+# NOTE: declared in the same order as CDRSchema fields
+_CDR_FIELDS = (
+    ('id', attrgetter('id'), _integer),
+    ('tenant_uuid', attrgetter('tenant_uuid'), _string),
+    ('start', attrgetter('date'), _datetime),
+    ('end', attrgetter('date_end'), _datetime),
+    ('answered', _answered, _identity),
+    ('answer', attrgetter('date_answer'), _datetime),
+    ('duration', _duration, _identity),
+    ('call_direction', attrgetter('direction'), _string),
+    ('call_status', _call_status, _identity),
+    ('conversation_id', attrgetter('conversation_id'), _string),
+    ('destination_details', _destination_details, _identity),
+    ('destination_extension', attrgetter('destination_exten'), _string),
+    (
+        'destination_internal_context',
+        attrgetter('destination_internal_context'),
+        _string,
+    ),
+    (
+        'destination_internal_extension',
+        attrgetter('destination_internal_exten'),
+        _string,
+    ),
+    ('destination_line_id', attrgetter('destination_line_id'), _integer),
+    ('destination_name', attrgetter('destination_name'), _string),
+    ('destination_user_uuid', attrgetter('destination_user_uuid'), _string),
+    ('requested_name', attrgetter('requested_name'), _string),
+    ('requested_context', attrgetter('requested_context'), _string),
+    ('requested_extension', attrgetter('requested_exten'), _string),
+    ('requested_internal_context', attrgetter('requested_internal_context'), _string),
+    ('requested_internal_extension', attrgetter('requested_internal_exten'), _string),
+    ('requested_user_uuid', attrgetter('requested_user_uuid'), _string),
+    ('source_extension', attrgetter('source_exten'), _string),
+    ('source_internal_context', attrgetter('source_internal_context'), _string),
+    ('source_internal_name', attrgetter('source_internal_name'), _string),
+    ('source_internal_extension', attrgetter('source_internal_exten'), _string),
+    ('source_line_id', attrgetter('source_line_id'), _integer),
+    ('source_name', attrgetter('source_name'), _string),
+    ('source_user_uuid', attrgetter('source_user_uuid'), _string),
+    ('tags', _tags, _identity),
+    ('recordings', _recordings, _identity),
+)
+
+
+class CDRSerializer:
+    def __init__(self, exclude=()):
+        self._fields = _compile(_CDR_FIELDS, exclude)
+
+    def dump(self, call_log):
+        return _dump(self._fields, call_log)
+
+    def dump_many(self, call_logs):
+        fields = self._fields
+        return [_dump(fields, call_log) for call_log in call_logs]
+
+    def dump_list(self, result):
+        # Equivalent of CDRSchemaList
+        return {
+            'items': self.dump_many(result['items']),
+            'total': _integer(result['total']),
+            'filtered': _integer(result['filtered']),
+        }
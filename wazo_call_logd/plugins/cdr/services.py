@@ -1,22 +1,40 @@
-# Copyright 2017-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2017-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from __future__ import annotations
 
+import hashlib
+import logging
 import os
 import re
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
 from typing import TypedDict, cast
 from uuid import UUID
+from zoneinfo import ZoneInfo
 
 import wazo_call_logd.database.queries.call_log as call_log_dao
-from wazo_call_logd.database.models import Export
+from wazo_call_logd.database.models import Export, ExportRecording, ExportShard
 from wazo_call_logd.database.queries import DAO
 from wazo_call_logd.datatypes import CallDirection, OrderDirection
+from wazo_call_logd.utils import check_readable
 
-from .celery_tasks import export_recording_task
+from . import peaks
+from .archive import TRANSCODE, CompressionPolicy
+from .cdr_export import dump_parameters
+from .celery_tasks import (
+    export_cdr_task,
+    export_recording_task,
+    schedule_recordings_peaks,
+)
+
+logger = logging.getLogger(__name__)
 
 RECORDING_FILENAME_RE = re.compile(r'^.+-(\d+)-([a-z0-9-]{36})(.*)?$')
+# NOTE: removing files is I/O bound, a few threads are enough to hide the
+# latency of network filesystems without flooding them
+MEDIA_DELETE_MAX_WORKERS = 8
 
 
 class SearchParams(TypedDict, total=False):
@@ -45,35 +63,40 @@ class CDRService:
         self._dao: DAO = dao
 
     def list(self, search_params: SearchParams):
-        searched = search_params.get('search')
-        rec_search_params = {}
-        dao_params = dict(search_params)
-        if searched:
-            matches = RECORDING_FILENAME_RE.search(searched)
-            if matches:
-                del dao_params['search']
-                dao_params['id'] = matches.group(1)
-                rec_search_params['uuid'] = matches.group(2)
-        if user_uuids := search_params.get('user_uuids'):
-            # api level 'user_uuids' is reinterpreted to avoid matching hidden participants
-            del dao_params['user_uuids']
-            dao_params['terminal_user_uuids'] = user_uuids
-
+        dao_params = _list_params(search_params)
         count = self._dao.call_log.count_in_period(dao_params)
 
         call_logs = self._dao.call_log.find_all_in_period(
             cast(call_log_dao.ListParams, dao_params)
         )
-        rec_search_params['call_log_ids'] = [call_log.id for call_log in call_logs]
         return {
             'items': call_logs,
             'filtered': count['filtered'],
             'total': count['total'],
         }
 
+    def aggregate(self, search_params: SearchParams):
+        dao_params = dict(search_params)
+        if user_uuids := dao_params.pop('user_uuids', None):
+            # same users as the CDR list, see list
+            dao_params['terminal_user_uuids'] = user_uuids
+
+        items = self._dao.call_log.aggregate(
+            cast(call_log_dao.AggregateParams, dao_params)
+        )
+        timezone = ZoneInfo(search_params.get('timezone') or 'UTC')
+        for item in items:
+            if item.get('from'):
+                item['from'] = item['from'].astimezone(timezone)
+        return {'items': items}
+
     def get(self, cdr_id, tenant_uuids, user_uuids=None):
         return self._dao.call_log.get_by_id(cdr_id, tenant_uuids, user_uuids)
 
+    def find_missing_ids(self, cdr_ids, tenant_uuids):
+        found = self._dao.call_log.find_ids(cdr_ids, tenant_uuids)
+        return [cdr_id for cdr_id in cdr_ids if cdr_id not in found]
+
 
 class RecordingService:
     def __init__(self, dao, config, notifier):
@@ -87,8 +110,45 @@ class RecordingService:
     def delete_media(self, cdr_id, recording_uuid, recording_path):
         self._dao.recording.delete_media_by(call_log_id=cdr_id, uuid=recording_uuid)
         if recording_path:
+            peaks.remove_peaks(recording_path)
             os.remove(recording_path)
 
+    def get_peaks(self, recording):
+        """Returns None and computes the peaks when they are not computed yet"""
+        # NOTE: the peaks of a missing recording would never be computed
+        check_readable(recording.path)
+        try:
+            return peaks.read_peaks(recording.path)
+        except FileNotFoundError:
+            # NOTE: recordings written before the peaks were computed, the
+            # clients poll until they are
+            schedule_recordings_peaks([recording.path])
+            return None
+
+    def delete_cdrs_media(self, cdr_ids, tenant_uuids):
+        """Returns the recordings whose file could not be removed"""
+        recordings = self._dao.recording.delete_media_by(
+            call_log_ids=cdr_ids, tenant_uuids=tenant_uuids
+        )
+        if not recordings:
+            return []
+
+        # NOTE: files are removed once the paths are committed, a file that
+        # cannot be removed is orphaned rather than referenced while missing
+        workers = min(MEDIA_DELETE_MAX_WORKERS, len(recordings))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            errors = executor.map(_remove_media, (path for _, _, path in recordings))
+            return [
+                {
+                    'cdr_id': cdr_id,
+                    'recording_uuid': str(recording_uuid),
+                    'recording_path': path,
+                    'message': error,
+                }
+                for (cdr_id, recording_uuid, path), error in zip(recordings, errors)
+                if error
+            ]
+
     def start_recording_export(
         self,
         recordings,
@@ -96,35 +156,164 @@ class RecordingService:
         tenant_uuid,
         destination_email,
         connection_info,
+        compression=None,
+        compression_level=None,
+        delivery=None,
     ):
-        recording_files = [
-            {
-                'uuid': recording.uuid,
-                'filename': recording.filename,
-                'path': recording.path,
-                'call_log_id': recording.call_log_id,
-            }
-            for recording in recordings
+        destination = self._config['exports']['directory']
+        compression_policy = CompressionPolicy.from_config(
+            self._config['exports']['compression'], compression, compression_level
+        )
+        delivery = delivery or self._config['exports']['delivery']
+        if destination_email or compression_policy.method == TRANSCODE:
+            # NOTE: e-mails are sent once archived, transcoding needs the workers
+            delivery = 'archive'
+        export_data = Export(
+            user_uuid=user_uuid,
+            tenant_uuid=tenant_uuid,
+            requested_at=datetime.now(),
+            status='pending',
+            compression=compression_policy.method,
+            compression_level=compression_policy.level,
+            delivery=delivery,
+            # NOTE: the manifest is stored with the export, the tasks only get
+            # the export UUID and read their recordings from the database
+            recordings=[
+                ExportRecording(
+                    index=index,
+                    recording_uuid=recording.uuid,
+                    call_log_id=recording.call_log_id,
+                    filename=recording.filename,
+                    path=recording.path,
+                )
+                for index, recording in enumerate(recordings)
+            ],
+        )
+        export_data.fingerprint = _fingerprint(
+            export_data.recordings, compression_policy, delivery
+        )
+        reuse_since = None
+        if reuse_window := self._config['exports']['reuse_window']:
+            # NOTE: the e-mail of a request is only sent by its own export
+            if not destination_email:
+                reuse_since = export_data.requested_at - timedelta(seconds=reuse_window)
+
+        if delivery == 'stream':
+            # NOTE: the archive is built when downloaded
+            export_data.status = 'finished'
+            export_data.shards = []
+            export, created = self._dao.export.create_limited(
+                export_data, reuse_since=reuse_since
+            )
+            if created:
+                self._notifier.created(export)
+            return {'uuid': export.uuid}
+
+        shards = _split(export_data.recordings, self._config['exports']['shard_size'])
+        export_data.shards = [
+            ExportShard(index=index, status='pending', recording_count=len(shard))
+            for index, shard in enumerate(shards)
         ]
+        export, created = self._dao.export.create_limited(
+            export_data,
+            max_queued=self._config['exports']['tenant_limits']['max_queued'],
+            reuse_since=reuse_since,
+            stale_since=_stale_since(self._config),
+        )
+        if not created:
+            logger.info('Export %s reused', export.uuid)
+            return {'uuid': export.uuid}
+        self._notifier.created(export)
+        for index in range(len(shards)):
+            export_recording_task.apply_async(
+                args=(
+                    export.uuid,
+                    destination,
+                    tenant_uuid,
+                    destination_email,
+                    connection_info,
+                    index,
+                ),
+                task_id=f'{export.uuid}-{index}',
+            )
+        return {'uuid': export.uuid}
 
-        destination = self._config['exports']['directory']
+
+class CDRExportService:
+    def __init__(self, dao, config, notifier):
+        self._dao: DAO = dao
+        self._config = config
+        self._notifier = notifier
+
+    def start_cdr_export(self, search_params: SearchParams, user_uuid, tenant_uuid):
+        dao_params = _list_params(search_params)
+        export_format = dao_params.pop('format')
+        dao_params.pop('recurse', None)
         export_data = Export(
             user_uuid=user_uuid,
             tenant_uuid=tenant_uuid,
             requested_at=datetime.now(),
             status='pending',
+            type='cdr',
+            format=export_format,
+            # NOTE: the filters are applied by the worker, when the export starts
+            parameters=dump_parameters(dao_params),
+            shards=[ExportShard(index=0, status='pending')],
+        )
+        export, _ = self._dao.export.create_limited(
+            export_data,
+            max_queued=self._config['exports']['tenant_limits']['max_queued'],
+            stale_since=_stale_since(self._config),
         )
-        export = self._dao.export.create(export_data)
         self._notifier.created(export)
-        export_recording_task.apply_async(
-            args=(
-                export.uuid,
-                recording_files,
-                destination,
-                tenant_uuid,
-                destination_email,
-                connection_info,
-            ),
+        export_cdr_task.apply_async(
+            args=(export.uuid, self._config['exports']['directory']),
             task_id=str(export.uuid),
         )
         return {'uuid': export.uuid}
+
+
+def _stale_since(config):
+    if stale_after := config['exports']['tenant_limits']['stale_after']:
+        return datetime.now(dt_timezone.utc) - timedelta(seconds=stale_after)
+    return None
+
+
+def _fingerprint(recordings, compression_policy, delivery):
+    # NOTE: identifies the content of the archive, whatever the order requested
+    method, level = compression_policy
+    content = hashlib.sha256(f'{method}:{level}:{delivery}'.encode())
+    for recording_uuid in sorted(str(r.recording_uuid) for r in recordings):
+        content.update(recording_uuid.encode())
+    return content.hexdigest()
+
+
+def _list_params(search_params: SearchParams) -> dict:
+    dao_params = dict(search_params)
+    if searched := search_params.get('search'):
+        if matches := RECORDING_FILENAME_RE.search(searched):
+            del dao_params['search']
+            dao_params['id'] = matches.group(1)
+    if user_uuids := search_params.get('user_uuids'):
+        # api level 'user_uuids' is reinterpreted to avoid matching hidden participants
+        del dao_params['user_uuids']
+        dao_params['terminal_user_uuids'] = user_uuids
+    return dao_params
+
+
+def _split(items, size):
+    # NOTE: shards of even sizes, none of them larger than size
+    count = -(-len(items) // size)
+    shard_size = -(-len(items) // count)
+    return [items[i : i + shard_size] for i in range(0, len(items), shard_size)]
+
+
+def _remove_media(path):
+    try:
+        peaks.remove_peaks(path)
+        os.remove(path)
+    except FileNotFoundError:
+        logger.info('Recording file already deleted: "%s"', path)
+    except OSError as e:
+        logger.error('Could not delete recording file "%s": %s', path, e)
+        return e.strerror or str(e)
@@ -0,0 +1,186 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+from zipfile import ZIP_DEFLATED, ZIP_STORED, ZipFile
+
+from hamcrest import assert_that, calling, contains_exactly, equal_to, raises
+
+from ..archive import (
+    CompressionPolicy,
+    ExportArchive,
+    TranscodingError,
+    stream_archive,
+)
+
+TRANSCODING = {
+    'format': 'opus',
+    'extension': 'opus',
+    'options': ['-c:a', 'libopus'],
+    'workers': 2,
+}
+
+
+class TestCompressionPolicy(TestCase):
+    def setUp(self):
+        self.config = {'method': 'store', 'level': 6}
+
+    def test_default(self):
+        result = CompressionPolicy.from_config(self.config)
+
+        assert_that(result, equal_to(('store', None)))
+
+    def test_deflate_level(self):
+        assert_that(
+            CompressionPolicy.from_config(self.config, 'deflate'),
+            equal_to(('deflate', 6)),
+        )
+        assert_that(
+            CompressionPolicy.from_config(self.config, 'deflate', 0),
+            equal_to(('deflate', 0)),
+        )
+        assert_that(
+            CompressionPolicy.from_config(self.config, 'transcode', 9),
+            equal_to(('transcode', None)),
+        )
+
+
+class TestExportArchive(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'export.zip')
+        self.members = []
+        for name in ('1.wav', '2.wav'):
+            path = os.path.join(self.directory, name)
+            with open(path, 'wb') as recording:
+                recording.write(b'\0' * 1000)
+            self.members.append((path, os.path.join('10', name)))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _infos(self):
+        with ZipFile(self.path) as zip_file:
+            return [(info.filename, info.compress_type) for info in zip_file.infolist()]
+
+    def test_store(self):
+        policy = CompressionPolicy('store')
+        with ExportArchive(self.path, policy, TRANSCODING) as archive:
+            list(archive.write(self.members))
+
+        assert_that(
+            self._infos(),
+            contains_exactly(('10/1.wav', ZIP_STORED), ('10/2.wav', ZIP_STORED)),
+        )
+        assert_that(archive.media_size, equal_to(2000))
+        assert_that(archive.size, equal_to(os.path.getsize(self.path)))
+
+    def test_deflate(self):
+        policy = CompressionPolicy('deflate', 1)
+        with ExportArchive(self.path, policy, TRANSCODING) as archive:
+            list(archive.write(self.members))
+
+        assert_that(
+            self._infos(),
+            contains_exactly(('10/1.wav', ZIP_DEFLATED), ('10/2.wav', ZIP_DEFLATED)),
+        )
+        assert_that(archive.size, equal_to(os.path.getsize(self.path)))
+
+    def test_transcode(self):
+        def ffmpeg(command, stdin, stdout, stderr):
+            stdout.write(b'opus' + stdin.read(3))
+            return subprocess.CompletedProcess(command, 0, stderr=b'')
+
+        policy = CompressionPolicy('transcode')
+        with patch.object(subprocess, 'run', side_effect=ffmpeg) as run:
+            with ExportArchive(self.path, policy, TRANSCODING) as archive:
+                list(archive.write(self.members))
+
+        assert_that(
+            self._infos(),
+            contains_exactly(('10/1.opus', ZIP_STORED), ('10/2.opus', ZIP_STORED)),
+        )
+        with ZipFile(self.path) as zip_file:
+            assert_that(zip_file.read('10/1.opus'), equal_to(b'opus\0\0\0'))
+        assert_that(
+            run.call_args.args[0],
+            equal_to(
+                [
+                    'ffmpeg',
+                    '-nostdin',
+                    '-loglevel',
+                    'error',
+                    '-i',
+                    'pipe:0',
+                    '-c:a',
+                    'libopus',
+                    '-f',
+                    'opus',
+                    'pipe:1',
+                ]
+            ),
+        )
+        assert_that(archive.media_size, equal_to(2000))
+        assert_that(
+            sorted(os.listdir(self.directory)),
+            equal_to(['1.wav', '2.wav', 'export.zip']),
+        )
+
+    def test_transcode_errors_are_raised_in_order(self):
+        def ffmpeg(command, stdin, stdout, stderr):
+            return subprocess.CompletedProcess(command, 1, stderr=b'invalid data')
+
+        os.remove(self.members[0][0])
+        policy = CompressionPolicy('transcode')
+        with patch.object(subprocess, 'run', side_effect=ffmpeg):
+            with ExportArchive(self.path, policy, TRANSCODING) as archive:
+                written = archive.write(self.members)
+
+                assert_that(calling(next).with_args(written), raises(FileNotFoundError))
+
+            with ExportArchive(self.path, policy, TRANSCODING) as archive:
+                assert_that(
+                    calling(next).with_args(archive.write(self.members[1:])),
+                    raises(TranscodingError, 'invalid data'),
+                )
+
+
+class TestStreamArchive(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.members = []
+        for name in ('1.wav', '2.wav'):
+            path = os.path.join(self.directory, name)
+            with open(path, 'wb') as recording:
+                recording.write(os.urandom(1000) + b'\0' * 1000)
+            self.members.append((path, os.path.join('10', name)))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_stream(self):
+        for policy, compress_type in (
+            (CompressionPolicy('store'), ZIP_STORED),
+            (CompressionPolicy('deflate', 6), ZIP_DEFLATED),
+        ):
+            chunks = list(stream_archive(self.members, policy, chunk_size=500))
+
+            with ZipFile(io.BytesIO(b''.join(chunks))) as zip_file:
+                assert_that(zip_file.testzip(), equal_to(None))
+                assert_that(
+                    [
+                        (info.filename, info.compress_type)
+                        for info in zip_file.infolist()
+                    ],
+                    contains_exactly(
+                        ('10/1.wav', compress_type), ('10/2.wav', compress_type)
+                    ),
+                )
+                with open(self.members[1][0], 'rb') as recording:
+                    assert_that(zip_file.read('10/2.wav'), equal_to(recording.read()))
@@ -0,0 +1,109 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import csv
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from unittest import TestCase
+from uuid import UUID
+
+from hamcrest import assert_that, contains_exactly, equal_to, has_entries
+
+from ..cdr_export import (
+    CSV_HEADERS,
+    CSVWriter,
+    NDJSONWriter,
+    dump_parameters,
+    load_parameters,
+)
+
+
+def _cdr(cdr_id, recordings=()):
+    return {
+        'id': cdr_id,
+        'tags': ['a', 'b'],
+        'recordings': [{'uuid': uuid} for uuid in recordings],
+    }
+
+
+class TestParameters(TestCase):
+    def test_round_trip(self):
+        params = {
+            'start': datetime(2026, 1, 1, tzinfo=timezone.utc),
+            'end': None,
+            'tenant_uuids': [UUID('00000000-0000-4000-8000-000000000001')],
+            'limit': 10,
+        }
+
+        parameters = dump_parameters(params)
+
+        assert_that(
+            json.loads(json.dumps(parameters)),
+            equal_to(
+                {
+                    'start': '2026-01-01T00:00:00+00:00',
+                    'tenant_uuids': ['00000000-0000-4000-8000-000000000001'],
+                    'limit': 10,
+                }
+            ),
+        )
+        assert_that(
+            load_parameters(parameters),
+            equal_to(
+                {
+                    'start': params['start'],
+                    'tenant_uuids': ['00000000-0000-4000-8000-000000000001'],
+                    'limit': 10,
+                }
+            ),
+        )
+
+
+class TestWriters(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_csv_recording_columns_are_padded(self):
+        path = os.path.join(self.directory, 'export.csv')
+        writer = CSVWriter(path)
+
+        writer.write([_cdr(1)])
+        writer.write([_cdr(2, ['r1', 'r2'])])
+        writer.close()
+
+        with open(path, newline='') as output:
+            reader = csv.DictReader(output)
+            rows = list(reader)
+        assert_that(
+            reader.fieldnames,
+            equal_to(CSV_HEADERS + ['recording_1_uuid', 'recording_2_uuid']),
+        )
+        assert_that(
+            rows,
+            contains_exactly(
+                has_entries(
+                    id='1', tags='a;b', recording_1_uuid='', recording_2_uuid=''
+                ),
+                has_entries(
+                    id='2', tags='a;b', recording_1_uuid='r1', recording_2_uuid='r2'
+                ),
+            ),
+        )
+        assert_that(os.listdir(self.directory), equal_to(['export.csv']))
+
+    def test_ndjson(self):
+        path = os.path.join(self.directory, 'export.ndjson')
+        writer = NDJSONWriter(path)
+
+        writer.write([_cdr(1), _cdr(2, ['r1'])])
+        writer.close()
+
+        with open(path) as output:
+            cdrs = [json.loads(line) for line in output]
+        assert_that(cdrs, contains_exactly(_cdr(1), _cdr(2, ['r1'])))
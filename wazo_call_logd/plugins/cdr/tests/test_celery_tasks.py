@@ -0,0 +1,143 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import os
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+from celery import Celery
+from hamcrest import assert_that, contains_exactly, equal_to
+
+from .. import celery_tasks
+from ..celery_tasks import Plugin, RecordingExportTask, schedule_recordings_peaks
+
+TEMPLATE = os.path.join(os.path.dirname(__file__), '..', '..', '..', '..', 'templates')
+CONFIG = {
+    'auth': {},
+    'smtp': {'host': 'smtp', 'port': 25, 'timeout': 1},
+    'exports': {'service_id': 'call-logd', 'service_key': 'secret'},
+    'email_export_subject': 'Export',
+    'email_export_from_name': 'Wazo',
+    'email_export_from_address': 'noreply@example.com',
+    'email_export_body_template': os.path.join(TEMPLATE, 'email_export_body.j2'),
+}
+CONNECTION_INFO = {'hostname': 'wazo.example.com', 'port': 443, 'prefix': None}
+URL = (
+    'https://wazo.example.com:443/1.0/exports/export-uuid/download'
+    '?tenant=tenant-uuid&token=token'
+)
+
+
+class TestPlugin(TestCase):
+    def test_recording_export_queued_by_a_previous_version(self):
+        dao = Mock()
+        Plugin().load({'app': Celery(), 'config': {}, 'dao': dao})
+        recordings = [{'uuid': 'recording-uuid', 'path': '/tmp/recording.wav'}]
+
+        celery_tasks.export_recording_task(
+            'export-uuid', recordings, '/tmp', 'tenant-uuid', None, {}
+        )
+
+        assert_that(dao.mock_calls, equal_to([]))
+
+
+@patch('wazo_call_logd.plugins.cdr.celery_tasks.recording_peaks_task')
+@patch('wazo_call_logd.plugins.cdr.celery_tasks.peaks')
+class TestScheduleRecordingsPeaks(TestCase):
+    def test_pending_peaks_are_not_scheduled_again(self, peaks, recording_peaks_task):
+        peaks.mark_pending.side_effect = [True, False]
+
+        schedule_recordings_peaks(['/tmp/1.wav', '/tmp/2.wav'])
+
+        recording_peaks_task.apply_async.assert_called_once_with(args=('/tmp/1.wav',))
+
+    def test_scheduling_errors_are_logged(self, peaks, recording_peaks_task):
+        peaks.mark_pending.return_value = True
+        recording_peaks_task.apply_async.side_effect = OSError('broker down')
+
+        schedule_recordings_peaks(['/tmp/1.wav'])
+
+        peaks.unmark_pending.assert_called_once_with('/tmp/1.wav')
+
+
+class TestStartShard(TestCase):
+    def setUp(self):
+        self.task = RecordingExportTask()
+        self.dao = Mock()
+        self.notifier = Mock()
+        self.config = {
+            'exports': {
+                'tenant_limits': {
+                    'max_processing': 2,
+                    'retry_delay': 10,
+                    'stale_after': 7200,
+                },
+            },
+        }
+
+    def test_started(self):
+        export = self.task._start_shard(self.config, self.dao, 'export-uuid', 1)
+
+        assert_that(export, equal_to(self.dao.export.start_shard.return_value))
+        (_, _, started_at, max_processing, stale_since), _ = (
+            self.dao.export.start_shard.call_args
+        )
+        assert_that(max_processing, equal_to(2))
+        assert_that(started_at - stale_since, equal_to(timedelta(seconds=7200)))
+
+    def test_more_shards_than_max_processing_wait_without_a_retry_cap(self):
+        # NOTE: the last of 5 shards waits for its 4 siblings, at most 2 at once
+        export = Mock()
+        self.dao.export.start_shard.side_effect = [None] * 4 + [export]
+        app = Celery(set_as_current=False)
+        app.conf.task_always_eager = True
+
+        @app.task(base=RecordingExportTask, bind=True)
+        def start_shard(task):
+            return task._start_shard(self.config, self.dao, 'export-uuid', 4)
+
+        result = start_shard.apply()
+
+        assert_that(result.get(), equal_to(export))
+        assert_that(self.dao.export.start_shard.call_count, equal_to(5))
+        self.dao.export.update_shard.assert_not_called()
+
+
+@patch('wazo_call_logd.plugins.cdr.celery_tasks.smtplib')
+@patch('wazo_call_logd.plugins.cdr.celery_tasks.AuthClient')
+class TestSendEmail(TestCase):
+    def setUp(self):
+        self.task = RecordingExportTask()
+
+    def _send(self, AuthClient, smtplib, shard_count):
+        AuthClient.return_value.token.new.return_value = {'token': 'token'}
+        export = SimpleNamespace(uuid='export-uuid', shards=[None] * shard_count)
+
+        self.task._send_email(
+            export,
+            'tenant-uuid',
+            'Wazo user',
+            'user@example.com',
+            CONFIG,
+            CONNECTION_INFO,
+        )
+
+        smtp_server = smtplib.SMTP.return_value.__enter__.return_value
+        (message,), _ = smtp_server.send_message.call_args
+        body = message.get_content()
+        return [line for line in body.split('\n') if line.startswith('https://')]
+
+    def test_one_shard(self, AuthClient, smtplib):
+        urls = self._send(AuthClient, smtplib, 1)
+
+        assert_that(urls, contains_exactly(URL))
+
+    def test_one_link_per_shard(self, AuthClient, smtplib):
+        urls = self._send(AuthClient, smtplib, 3)
+
+        assert_that(
+            urls,
+            contains_exactly(f'{URL}&shard=0', f'{URL}&shard=1', f'{URL}&shard=2'),
+        )
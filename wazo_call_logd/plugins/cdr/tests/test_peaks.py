@@ -0,0 +1,98 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import os
+import shutil
+import struct
+import tempfile
+import wave
+from unittest import TestCase
+
+from hamcrest import assert_that, equal_to, has_entries
+
+from ..peaks import (
+    compute_peaks,
+    mark_pending,
+    peaks_path,
+    pending_path,
+    read_peaks,
+    remove_peaks,
+    unmark_pending,
+    write_peaks,
+)
+
+
+class TestPeaks(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'recording.wav')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _write_wav(self, samples, channels=1, sample_width=2):
+        fmt = {1: 'B', 2: 'h'}[sample_width]
+        with wave.open(self.path, 'wb') as recording:
+            recording.setnchannels(channels)
+            recording.setsampwidth(sample_width)
+            recording.setframerate(8000)
+            recording.writeframes(struct.pack(f'<{len(samples)}{fmt}', *samples))
+
+    def test_compute_peaks(self):
+        self._write_wav([0, 256, -512, 1024, 32767, -32768, 0])
+
+        result = compute_peaks(self.path, length=3)
+
+        assert_that(
+            result,
+            has_entries(
+                channels=1,
+                sample_rate=8000,
+                samples_per_pixel=3,
+                bits=8,
+                length=3,
+                data=[-2, 1, -128, 127, 0, 0],
+            ),
+        )
+
+    def test_compute_peaks_mixes_channels_of_8_bits_samples(self):
+        self._write_wav([128, 0, 255, 130], channels=2, sample_width=1)
+
+        result = compute_peaks(self.path, length=2)
+
+        assert_that(result, has_entries(length=2, data=[-128, 0, 2, 127]))
+
+    def test_write_read_and_remove(self):
+        self._write_wav([0, 1000])
+        peaks = compute_peaks(self.path)
+
+        path = write_peaks(self.path, peaks)
+
+        assert_that(
+            path, equal_to(os.path.join(self.directory, 'recording.peaks.json'))
+        )
+        assert_that(read_peaks(self.path), equal_to(peaks))
+        assert_that(
+            sorted(os.listdir(self.directory)),
+            equal_to(['recording.peaks.json', 'recording.wav']),
+        )
+
+        remove_peaks(self.path)
+        remove_peaks(self.path)
+        assert not os.path.exists(peaks_path(self.path))
+
+    def test_mark_pending(self):
+        assert_that(mark_pending(self.path), equal_to(True))
+        assert_that(mark_pending(self.path), equal_to(False))
+        assert_that(os.listdir(self.directory), equal_to(['recording.peaks.pending']))
+
+        # NOTE: lost computations are scheduled again after the timeout
+        os.utime(pending_path(self.path), (0, 0))
+        assert_that(mark_pending(self.path), equal_to(True))
+        assert_that(mark_pending(self.path), equal_to(False))
+
+        unmark_pending(self.path)
+        unmark_pending(self.path)
+        assert_that(mark_pending(self.path), equal_to(True))
+        remove_peaks(self.path)
+        assert_that(os.listdir(self.directory), equal_to([]))
@@ -0,0 +1,44 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+from flask import Flask
+from flask_restful import Api
+from hamcrest import assert_that, contains_inanyorder
+
+from ..plugin import Plugin
+
+
+class TestPlugin(TestCase):
+    @patch('wazo_call_logd.plugins.cdr.plugin.AuthClient', Mock())
+    def test_load_registers_every_route(self):
+        app = Flask(__name__)
+        api = Api(app)
+        dependencies = {
+            'api': api,
+            'config': {'auth': {}},
+            'dao': Mock(),
+            'bus_publisher': Mock(),
+        }
+
+        Plugin().load(dependencies)
+
+        assert_that(
+            [rule.rule for rule in app.url_map.iter_rules()],
+            contains_inanyorder(
+                '/static/<path:filename>',
+                '/cdr',
+                '/cdr/aggregates',
+                '/cdr/export',
+                '/cdr/recordings/media',
+                '/cdr/recordings/media/export',
+                '/cdr/<int:cdr_id>',
+                '/cdr/<int:cdr_id>/recordings/<uuid:recording_uuid>/media',
+                '/cdr/<int:cdr_id>/recordings/<uuid:recording_uuid>/peaks',
+                '/users/<uuid:user_uuid>/cdr',
+                '/users/me/cdr',
+                '/users/me/cdr/<int:cdr_id>/recordings/<uuid:recording_uuid>/media',
+            ),
+        )
@@ -4,11 +4,13 @@
 from datetime import datetime
 from unittest import TestCase
 
-from hamcrest import assert_that, has_entries
+from hamcrest import assert_that, calling, has_entries, raises
+from marshmallow import ValidationError
+from werkzeug.datastructures import MultiDict
 
 from wazo_call_logd.database.models import CallLog
 
-from ..schemas import CDRSchema
+from ..schemas import CDRAggregateRequestSchema, CDRSchema
 
 
 class TestCDRSchemaCallStatus(TestCase):
@@ -35,3 +37,30 @@ class TestCDRSchemaCallStatus(TestCase):
     def test_blocked_supersedes_voicemail(self):
         result = self._dump(date_answer=None, reached_voicemail=True, blocked=True)
         assert_that(result, has_entries(call_status='blocked'))
+
+
+class TestCDRAggregateRequestSchema(TestCase):
+    def test_defaults(self):
+        result = CDRAggregateRequestSchema().load(MultiDict())
+        assert_that(
+            result,
+            has_entries(group_by=['call_status'], interval=None, timezone='UTC'),
+        )
+
+    def test_group_by_is_comma_separated(self):
+        args = MultiDict({'group_by': 'call_direction,user_uuid', 'user_uuid': 'a,b'})
+        result = CDRAggregateRequestSchema().load(args)
+        assert_that(
+            result,
+            has_entries(
+                group_by=['call_direction', 'user_uuid'], user_uuids=['a', 'b']
+            ),
+        )
+
+    def test_invalid_group_by_and_interval(self):
+        schema = CDRAggregateRequestSchema()
+        for args in ({'group_by': 'tags'}, {'interval': 'week'}):
+            assert_that(
+                calling(schema.load).with_args(MultiDict(args)),
+                raises(ValidationError),
+            )
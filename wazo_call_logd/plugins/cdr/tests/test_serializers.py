@@ -0,0 +1,155 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+from unittest import TestCase
+
+from hamcrest import assert_that, equal_to
+
+from wazo_call_logd.database.models import (
+    CallLog,
+    CallLogParticipant,
+    Destination,
+    Recording,
+)
+
+from ..schemas import CDRSchema, CDRSchemaList, RecordingSchema
+from ..serializers import CDRSerializer, RecordingSerializer
+
+START = datetime(2024, 1, 1, 10, 0, 0, 123, tzinfo=timezone(timedelta(hours=-5)))
+
+
+def _as_json(data):
+    return json.dumps(data, sort_keys=True)
+
+
+def _destination_details(**details):
+    return [
+        Destination(destination_details_key=key, destination_details_value=value)
+        for key, value in details.items()
+    ]
+
+
+def _recording(call_log_id, path='/tmp/foo.wav'):
+    return Recording(
+        uuid=uuid.uuid4(),
+        start_time=START,
+        end_time=START + timedelta(seconds=9),
+        path=path,
+        call_log_id=call_log_id,
+    )
+
+
+def _call_log(id_=1, participants=(), recordings=(), destination_details=(), **kwargs):
+    kwargs.setdefault('tenant_uuid', uuid.uuid4())
+    kwargs.setdefault('date', START)
+    call_log = CallLog(id=id_, **kwargs)
+    call_log.participants = list(participants)
+    call_log.recordings = list(recordings)
+    call_log.destination_details = list(destination_details)
+    call_log.denormalize_participants()
+    for participant in participants:
+        if participant.role == 'source':
+            call_log.source_participant = participant
+        else:
+            call_log.destination_participant = participant
+    return call_log
+
+
+class TestCDRSerializer(TestCase):
+    def setUp(self):
+        source = CallLogParticipant(
+            user_uuid=uuid.uuid4(), role='source', line_id=1, tags=['a', 'b']
+        )
+        destination = CallLogParticipant(
+            user_uuid=uuid.uuid4(),
+            role='destination',
+            line_id=2,
+            tags=['b', 'c'],
+            requested=True,
+        )
+        self.call_logs = [
+            _call_log(id_=1),
+            _call_log(
+                id_=2,
+                date_answer=START + timedelta(seconds=3),
+                date_end=START + timedelta(seconds=63, microseconds=500),
+                direction='internal',
+                source_name='Alice',
+                source_exten='1001',
+                requested_exten='1002',
+                destination_exten='1002',
+                conversation_id='1234.5',
+                participants=[source, destination],
+                recordings=[_recording(2), _recording(2, path=None)],
+                destination_details=_destination_details(
+                    type='user', user_uuid=str(uuid.uuid4()), user_name='Bob'
+                ),
+            ),
+            _call_log(
+                id_=3,
+                reached_voicemail=True,
+                date_end=START + timedelta(seconds=10),
+                destination_details=_destination_details(
+                    type='voicemail', voicemail_id='3', voicemail_name='Bob VM'
+                ),
+            ),
+            _call_log(
+                id_=4,
+                blocked=True,
+                date_answer=START + timedelta(seconds=5),
+                date_end=START,
+                destination_details=_destination_details(
+                    type='conference', conference_id='12'
+                ),
+            ),
+            _call_log(
+                id_=5,
+                destination_details=_destination_details(
+                    type='group', group_label='Sales', group_id='7'
+                ),
+            ),
+            _call_log(
+                id_=6,
+                destination_details=_destination_details(
+                    type='meeting', meeting_uuid=str(uuid.uuid4())
+                ),
+            ),
+        ]
+
+    def test_dump_is_identical_to_cdr_schema(self):
+        for call_log in self.call_logs:
+            expected = _as_json(CDRSchema().dump(call_log))
+
+            result = _as_json(CDRSerializer().dump(call_log))
+
+            assert_that(result, equal_to(expected))
+
+    def test_dump_with_exclude_is_identical_to_cdr_schema(self):
+        for call_log in self.call_logs:
+            expected = _as_json(CDRSchema(exclude=['tags']).dump(call_log))
+
+            result = _as_json(CDRSerializer(exclude=('tags',)).dump(call_log))
+
+            assert_that(result, equal_to(expected))
+
+    def test_dump_list_is_identical_to_cdr_schema_list(self):
+        cdrs = {'items': self.call_logs, 'total': 10, 'filtered': 6}
+        expected = _as_json(CDRSchemaList(exclude=['items.tags']).dump(cdrs))
+
+        result = _as_json(CDRSerializer(exclude=('tags',)).dump_list(cdrs))
+
+        assert_that(result, equal_to(expected))
+
+
+class TestRecordingSerializer(TestCase):
+    def test_dump_is_identical_to_recording_schema(self):
+        recording = _recording(42)
+        recording.call_log = CallLog(id=42, conversation_id='1234.5')
+        expected = _as_json(RecordingSchema().dump(recording))
+
+        result = _as_json(RecordingSerializer().dump(recording))
+
+        assert_that(result, equal_to(expected))
@@ -1,4 +1,4 @@
-# Copyright 2021 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2021-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from xivo.rest_api_helpers import APIException
@@ -52,3 +52,16 @@ class ExportErrorException(APIException):
                 'export_uuid': str(export_uuid),
             },
         )
+
+
+class ExportShardNotFoundException(APIException):
+    def __init__(self, export_uuid, shard_index):
+        super().__init__(
+            status_code=404,
+            message='No shard found matching this index',
+            error_id='export-shard-not-found',
+            details={
+                'export_uuid': str(export_uuid),
+                'shard': shard_index,
+            },
+        )
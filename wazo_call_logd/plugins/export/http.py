@@ -6,7 +6,7 @@ from __future__ import annotations
 import logging
 from typing import TYPE_CHECKING
 
-from flask import g, send_file
+from flask import Response, g, request
 from xivo import tenant_helpers
 from xivo.auth_verifier import required_acl
 from xivo.tenant_flask_helpers import Tenant, auth_client, token
@@ -14,14 +14,27 @@ from xivo.tenant_flask_helpers import Tenant, auth_client, token
 from wazo_call_logd.auth import extract_token_id_from_query_or_header
 from wazo_call_logd.exceptions import ExportNotFoundException
 from wazo_call_logd.http import AuthResource
+from wazo_call_logd.plugin_helpers.flask import send_download
+from wazo_call_logd.plugins.cdr.archive import (
+    STORE,
+    CompressionPolicy,
+    stream_archive,
+)
+from wazo_call_logd.plugins.cdr.cdr_export import CDR_EXPORT_MIMETYPES
+from wazo_call_logd.plugins.cdr.exceptions import (
+    RecordingMediaFSNotFoundException,
+    RecordingMediaFSPermissionException,
+)
+from wazo_call_logd.utils import check_readable
 
 from .exceptions import (
     ExportErrorException,
     ExportFSNotFoundException,
     ExportFSPermissionException,
     ExportNotDoneYetException,
+    ExportShardNotFoundException,
 )
-from .schemas import ExportSchema
+from .schemas import ExportDownloadRequestSchema, ExportSchema
 
 if TYPE_CHECKING:
     from .services import ExportService
@@ -72,31 +85,113 @@ class ExportDownloadResource(ExportAuthResource):
         extract_token_id=extract_token_id_from_query_or_header,
     )
     def get(self, export_uuid):
+        args = ExportDownloadRequestSchema().load(request.args)
         tenant_uuids = self.query_or_header_visible_tenants(recurse=False)
         export = self.service.get(export_uuid, tenant_uuids)
 
         if not export:
             raise ExportNotFoundException(export_uuid)
 
-        if export.status in ('pending', 'processing'):
+        if export.delivery == 'stream':
+            return self._stream(export)
+
+        shard_index = args['shard']
+        if shard_index is None and len(export.shards) > 1:
+            return self._stream_shards(export)
+        if shard_index is None:
+            status, path, filename = export.status, export.path, export.filename
+        else:
+            # NOTE: each shard can be downloaded as soon as it is finished
+            if shard_index >= len(export.shards):
+                raise ExportShardNotFoundException(export_uuid, shard_index)
+            shard = export.shards[shard_index]
+            status, path = shard.status, shard.path
+            filename = export.shard_filename(shard_index)
+
+        if status in ('pending', 'processing'):
             raise ExportNotDoneYetException(export_uuid)
 
-        if not export.path:
+        if not path:
             raise ExportNotFoundException(export_uuid)
 
-        if export.status == 'error':
+        if status == 'error':
             raise ExportErrorException(export_uuid)
 
+        mimetype = CDR_EXPORT_MIMETYPES.get(export.format, 'application/zip')
         try:
-            return send_file(
-                export.path,
-                mimetype='application/zip',
-                as_attachment=True,
-                download_name=export.filename,
-            )
+            return send_download(path, mimetype, filename)
+        except PermissionError:
+            logger.error('Permission denied: "%s"', path)
+            raise ExportFSPermissionException(export_uuid, path)
+        except FileNotFoundError:
+            logger.error('Export file not found: "%s"', path)
+            raise ExportFSNotFoundException(export_uuid, path)
+
+    def _stream(self, export):
+        # NOTE: once the response has started, a missing file can only
+        # interrupt the download
+        for recording in self.service.iter_recordings(export.uuid):
+            self._check_readable(recording)
+
+        members = (
+            (recording.path, recording.archive_name)
+            for recording in self.service.iter_recordings(export.uuid)
+        )
+        policy = CompressionPolicy(export.compression, export.compression_level)
+        return _archive_response(export, members, policy)
+
+    def _stream_shards(self, export):
+        # NOTE: the archives of the shards are stored in one archive, built
+        # while it is downloaded
+        if export.status in ('pending', 'processing'):
+            raise ExportNotDoneYetException(export.uuid)
+
+        if export.status == 'error':
+            raise ExportErrorException(export.uuid)
+
+        members = []
+        for index, shard in enumerate(export.shards):
+            if not shard.path:
+                raise ExportNotFoundException(export.uuid)
+            try:
+                check_readable(shard.path)
+            except PermissionError:
+                logger.error('Permission denied: "%s"', shard.path)
+                raise ExportFSPermissionException(export.uuid, shard.path)
+            except FileNotFoundError:
+                logger.error('Export file not found: "%s"', shard.path)
+                raise ExportFSNotFoundException(export.uuid, shard.path)
+            members.append((shard.path, export.shard_filename(index)))
+        return _archive_response(export, members, CompressionPolicy(STORE))
+
+    def _check_readable(self, recording):
+        try:
+            check_readable(recording.path)
         except PermissionError:
-            logger.error('Permission denied: "%s"', export.path)
-            raise ExportFSPermissionException(export_uuid, export.path)
+            logger.error('Permission denied: "%s"', recording.path)
+            raise RecordingMediaFSPermissionException(
+                recording.recording_uuid, recording.path
+            )
         except FileNotFoundError:
-            logger.error('Export file not found: "%s"', export.path)
-            raise ExportFSNotFoundException(export_uuid, export.path)
+            logger.error('Recording file not found: "%s"', recording.path)
+            raise RecordingMediaFSNotFoundException(
+                recording.recording_uuid, recording.path
+            )
+
+
+def _archive_response(export, members, policy):
+    return Response(
+        _logged_stream(export.uuid, stream_archive(members, policy)),
+        mimetype='application/zip',
+        headers={'Content-Disposition': f'attachment; filename={export.filename}'},
+        direct_passthrough=True,
+    )
+
+
+def _logged_stream(export_uuid, chunks):
+    # NOTE: the response has started, errors can only interrupt the download
+    try:
+        yield from chunks
+    except OSError as e:
+        logger.error('Export %s: cannot stream "%s": %s', export_uuid, e.filename, e)
+        raise
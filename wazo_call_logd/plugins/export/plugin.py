@@ -1,4 +1,4 @@
-# Copyright 2021-2023 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2021-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from .http import ExportDownloadResource, ExportResource
@@ -8,9 +8,10 @@ from .services import ExportService
 class Plugin:
     def load(self, dependencies):
         api = dependencies['api']
+        config = dependencies['config']
         dao = dependencies['dao']
 
-        export_service = ExportService(dao)
+        export_service = ExportService(dao, config)
 
         api.add_resource(
             ExportResource,
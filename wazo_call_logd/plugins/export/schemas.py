@@ -1,10 +1,22 @@
-# Copyright 2021 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2021-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from xivo.mallow import fields
+from xivo.mallow.validate import Range
 from xivo.mallow_helpers import Schema
 
 
+class ExportShardSchema(Schema):
+    index = fields.Integer()
+    status = fields.String()
+    recording_count = fields.Integer()
+    processed_count = fields.Integer()
+    started_at = fields.DateTime()
+    finished_at = fields.DateTime()
+    media_size = fields.Integer()
+    size = fields.Integer()
+
+
 class ExportSchema(Schema):
     uuid = fields.UUID()
     tenant_uuid = fields.UUID()
@@ -12,3 +24,22 @@ class ExportSchema(Schema):
     requested_at = fields.DateTime()
     filename = fields.String()
     status = fields.String()
+    type = fields.String()
+    format = fields.String()
+    delivery = fields.String()
+    compression = fields.String()
+    compression_level = fields.Integer()
+    started_at = fields.DateTime()
+    finished_at = fields.DateTime()
+    media_size = fields.Integer()
+    size = fields.Integer()
+    throughput = fields.Float()
+    recording_count = fields.Integer()
+    processed_count = fields.Integer()
+    progress = fields.Float()
+    eta = fields.DateTime()
+    shards = fields.Nested(ExportShardSchema, many=True)
+
+
+class ExportDownloadRequestSchema(Schema):
+    shard = fields.Integer(validate=Range(min=0), load_default=None)
@@ -1,22 +1,32 @@
-# Copyright 2021-2024 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2021-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from __future__ import annotations
 
+from collections.abc import Iterator
 from typing import TYPE_CHECKING, Any
 
 if TYPE_CHECKING:
-    from wazo_call_logd.database.models import Export
+    from wazo_call_logd.database.models import Export, ExportRecording
     from wazo_call_logd.database.queries import DAO
 
 
 class ExportService:
-    def __init__(self, dao: DAO) -> None:
+    def __init__(self, dao: DAO, config: dict[str, Any]) -> None:
         self._dao = dao
+        self._config = config
 
     def get(self, export_uuid: str, tenant_uuids: list[str]) -> Export:
         return self._dao.export.get(export_uuid, tenant_uuids)
 
+    def iter_recordings(self, export_uuid: str) -> Iterator[ExportRecording]:
+        # NOTE: the manifest is read one page at a time, it may be large
+        indexes = range(self._dao.export.count_recordings(export_uuid))
+        page_size = self._config['exports']['manifest_page_size']
+        pages = self._dao.export.iter_recording_pages(export_uuid, indexes, page_size)
+        for page in pages:
+            yield from page
+
     def create(self, *args: Any, **kwargs: Any) -> Export:
         return self._dao.export.create(*args, **kwargs)
 
@@ -1,4 +1,4 @@
-# Copyright 2020-2023 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2020-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from flask import request
@@ -6,6 +6,7 @@ from xivo.auth_verifier import required_acl
 from xivo.tenant_flask_helpers import Tenant, token
 
 from wazo_call_logd.http import AuthResource
+from wazo_call_logd.profiling import timed
 
 from .schemas import (
     AgentStatisticsListRequestSchema,
@@ -20,6 +21,7 @@ from .schemas import (
 
 
 class _MultiTenantAuthResource(AuthResource):
+    @timed('auth')
     def visible_tenants(self, recurse=True):
         tenant_uuid = Tenant.autodetect().uuid
         if recurse:
@@ -40,7 +42,8 @@ class AgentsStatisticsResource(AgentsStatisticsAuthResource):
         args = AgentStatisticsListRequestSchema().load(request.args)
         tenant_uuids = self.visible_tenants(recurse=True)
         queue_stats = self.agent_statistics_service.list(tenant_uuids, **args)
-        return AgentStatisticsSchemaList().dump(queue_stats)
+        with timed('serialize'):
+            return AgentStatisticsSchemaList().dump(queue_stats)
 
 
 class AgentStatisticsResource(AgentsStatisticsAuthResource):
@@ -49,7 +52,8 @@ class AgentStatisticsResource(AgentsStatisticsAuthResource):
         args = AgentStatisticsRequestSchema().load(request.args)
         tenant_uuids = self.visible_tenants(recurse=True)
         agent_stats = self.agent_statistics_service.get(tenant_uuids, agent_id, **args)
-        return AgentStatisticsSchemaList().dump(agent_stats)
+        with timed('serialize'):
+            return AgentStatisticsSchemaList().dump(agent_stats)
 
 
 class QueuesStatisticsAuthResource(_MultiTenantAuthResource):
@@ -64,7 +68,8 @@ class QueuesStatisticsResource(QueuesStatisticsAuthResource):
         args = QueueStatisticsListRequestSchema().load(request.args)
         tenant_uuids = self.visible_tenants(recurse=True)
         queue_stats = self.queue_statistics_service.list(tenant_uuids, **args)
-        return QueueStatisticsSchemaList().dump(queue_stats)
+        with timed('serialize'):
+            return QueueStatisticsSchemaList().dump(queue_stats)
 
 
 class QueueStatisticsResource(QueuesStatisticsAuthResource):
@@ -73,7 +78,8 @@ class QueueStatisticsResource(QueuesStatisticsAuthResource):
         args = QueueStatisticsRequestSchema().load(request.args)
         tenant_uuids = self.visible_tenants(recurse=True)
         queue_stats = self.queue_statistics_service.get(tenant_uuids, queue_id, **args)
-        return QueueStatisticsSchemaList().dump(queue_stats)
+        with timed('serialize'):
+            return QueueStatisticsSchemaList().dump(queue_stats)
 
 
 class QueueStatisticsQoSResource(QueuesStatisticsAuthResource):
@@ -84,4 +90,5 @@ class QueueStatisticsQoSResource(QueuesStatisticsAuthResource):
         queue_stats = self.queue_statistics_service.get_qos(
             tenant_uuids, queue_id, **args
         )
-        return QueueStatisticsQoSSchemaList().dump(queue_stats)
+        with timed('serialize'):
+            return QueueStatisticsQoSSchemaList().dump(queue_stats)
@@ -0,0 +1,134 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Opt-in profiling of the REST API requests.
+
+Each request gets a `RequestProfile` accumulating the time spent in named
+sections: `timed` sections wrapped around code and SQL statements, counted
+through the SQLAlchemy engine events. The time of a section excludes the
+sections nested in it, so the timings of a request add up to its total and
+`app` only keeps what is not accounted for elsewhere. The result is returned
+in a Server-Timing header.
+
+`timed` does nothing outside of a profiled request.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+SERVER_TIMING_HEADER = 'Server-Timing'
+
+
+class RequestProfile:
+    def __init__(self, clock=time.perf_counter):
+        self._clock = clock
+        self._started_at = clock()
+        self._stack = []
+        self.timings = {}
+
+    def start(self, name: str) -> None:
+        # NOTE: [name, start time, time spent in nested sections]
+        self._stack.append([name, self._clock(), 0.0])
+
+    def stop(self) -> None:
+        name, started_at, nested = self._stack.pop()
+        elapsed = self._clock() - started_at
+        self._add(name, elapsed - nested)
+        if self._stack:
+            self._stack[-1][2] += elapsed
+
+    def total(self) -> float:
+        return self._clock() - self._started_at
+
+    def server_timing(self) -> str:
+        metrics = []
+        for name, (count, seconds) in self.timings.items():
+            metric = f'{name};dur={seconds * 1000:.2f}'
+            if name == 'sql':
+                metric += f';desc="{count} queries"'
+            metrics.append(metric)
+        metrics.append(f'total;dur={self.total() * 1000:.2f}')
+        return ', '.join(metrics)
+
+    def _add(self, name, seconds):
+        count, total = self.timings.get(name, (0, 0.0))
+        self.timings[name] = (count + 1, total + seconds)
+
+
+def current_profile() -> RequestProfile | None:
+    if not has_request_context():
+        return None
+    return g.get('profile')
+
+
+@contextmanager
+def timed(name: str):
+    profile = current_profile()
+    if profile is None:
+        yield
+        return
+
+    profile.start(name)
+    try:
+        yield
+    finally:
+        profile.stop()
+
+
+def install(app, api, log=False):
+    @app.before_request
+    def start_profile():
+        g.profile = RequestProfile()
+
+    @app.after_request
+    def add_server_timing(response):
+        if (profile := current_profile()) is None:
+            return response
+        server_timing = profile.server_timing()
+        response.headers[SERVER_TIMING_HEADER] = server_timing
+        if log:
+            logger.debug(
+                'timing %s %s %s: %s',
+                request.method,
+                request.path,
+                response.status_code,
+                server_timing,
+            )
+        return response
+
+    # NOTE: flask-restful renders the JSON body after the resource returned
+    output_json = api.representations['application/json']
+    api.representations['application/json'] = timed('json')(output_json)
+
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, many):
+    if profile := current_profile():
+        profile.start('sql')
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, many):
+    if profile := current_profile():
+        profile.stop()
+
+
+def _handle_error(exception_context):
+    # NOTE: after_cursor_execute is not called for failed statements
+    if exception_context.cursor is None:
+        return
+    if profile := current_profile():
+        profile.stop()
@@ -1,13 +1,24 @@
-# Copyright 2021-2023 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2021-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 import datetime
 import logging
 import os
 
-from sqlalchemy import func
-
-from .database.models import CallLog, Config, Export, Recording, Retention, Tenant
+from sqlalchemy import Date, cast, func
+
+from .database import partitioning
+from .database.models import (
+    CallLog,
+    Config,
+    Export,
+    LastCall,
+    Recording,
+    Retention,
+    Tenant,
+)
+from .database.queries import rollup
+from .plugins.cdr.peaks import remove_peaks
 
 logger = logging.getLogger(__name__)
 
@@ -19,14 +30,17 @@ DEFAULT_CALL_LOGD_EXPORT_DAYS = 2
 
 def _remove_export_files(exports):
     for export in exports:
-        if not export.path:
+        paths = {export.path} | {shard.path for shard in export.shards}
+        paths.discard(None)
+        if not paths:
             logger.debug('Export file never created: "%s"', export.uuid)
             continue
 
-        try:
-            os.remove(export.path)
-        except FileNotFoundError:
-            logger.info('Export file already deleted: "%s"', export.path)
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                logger.info('Export file already deleted: "%s"', path)
 
 
 def _remove_recording_files(call_logs):
@@ -37,6 +51,7 @@ def _remove_recording_files(call_logs):
                 try:
                     # NOTE(fblackburn): wazo-purge-db must be executed
                     # on the same filesystem than wazo-call-logd
+                    remove_peaks(recording.path)
                     os.remove(recording.path)
                 except FileNotFoundError:
                     logger.info('Recording file already deleted: "%s"', recording.path)
@@ -69,16 +84,22 @@ class CallLogsPurger:
         default_days = config.retention_cdr_days
 
         retentions = {r.tenant_uuid: r for r in session.query(Retention).all()}
-        tenants_uuid = _get_tenants_uuids(session, tenant_uuid)
-        for tenant_uuid in tenants_uuid:
-            retention = retentions.get(tenant_uuid)
+        tenants_days = {}
+        for uuid in _get_tenants_uuids(session, tenant_uuid):
+            retention = retentions.get(uuid)
             tenant_days = retention.cdr_days if retention else None
-            days = _extract_days_to_keep(
+            tenants_days[uuid] = _extract_days_to_keep(
                 tenant_days,
                 default_days,
                 days_to_keep,
                 DEFAULT_CALL_LOGD_CDR_DAYS,
             )
+
+        if tenant_uuid is None and tenants_days:
+            self._drop_expired_partitions(session, max(tenants_days.values()))
+
+        # NOTE: in the order of the rollups locks, see rollup.lock_rollups
+        for tenant_uuid, days in sorted(tenants_days.items()):
             if days != days_to_keep:
                 logger.debug(
                     'Tenant %s: overriding call log retention to %s days',
@@ -101,8 +122,44 @@ class CallLogsPurger:
                 .filter(CallLog.date < max_date)
                 .filter(CallLog.tenant_uuid == tenant_uuid)
             )
+            session.query(LastCall).filter(
+                LastCall.call_log_id.in_(query.with_entities(CallLog.id))
+            ).delete(synchronize_session=False)
             query.delete(synchronize_session=False)
 
+            # NOTE: the day of max_date keeps its remaining call logs
+            max_day = session.query(cast(func.timezone('UTC', max_date), Date)).scalar()
+            rollup.rebuild_rollups(
+                session, [tenant_uuid], end=max_day + datetime.timedelta(days=1)
+            )
+
+    def _drop_expired_partitions(self, session, days):
+        # NOTE: a partition is only dropped when it has expired for every tenant,
+        # the remaining rows are deleted tenant by tenant
+        connection = session.connection()
+        if not partitioning.is_partitioned(connection):
+            return
+
+        cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(
+            days=days
+        )
+        upper_bound = partitioning.expired_upper_bound(connection, cutoff)
+        if not upper_bound:
+            return
+
+        query = (
+            session.query(CallLog)
+            .join(Recording, Recording.call_log_id == CallLog.id)
+            .filter(CallLog.date < upper_bound)
+        )
+        _remove_recording_files(query.all())
+        session.query(LastCall).filter(LastCall.call_log_date < upper_bound).delete(
+            synchronize_session=False
+        )
+        # NOTE: the dropped partitions are older than the retention of every
+        # tenant, their rollups are rebuilt tenant by tenant by purge
+        partitioning.drop_partitions_before(connection, upper_bound)
+
 
 class ExportsPurger:
     def purge(self, days_to_keep, session, tenant_uuid=None):
@@ -0,0 +1,85 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import argparse
+import datetime
+import logging
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from xivo import xivo_logging
+from xivo.chain_map import ChainMap
+from xivo.config_helper import read_config_file_hierarchy
+
+from wazo_call_logd.config import DEFAULT_CONFIG
+from wazo_call_logd.database.queries import rollup
+
+logger = logging.getLogger('wazo-call-logd-rollup-db')
+
+
+def parse_cli_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        'action',
+        choices=['rebuild'],
+        help='rebuild: recompute the daily call log rollups from the call logs',
+    )
+    parser.add_argument(
+        '--from',
+        dest='start',
+        type=datetime.date.fromisoformat,
+        help='First day (UTC, YYYY-MM-DD) to rebuild, defaults to the first call log',
+    )
+    parser.add_argument(
+        '--until',
+        dest='end',
+        type=datetime.date.fromisoformat,
+        help='Day (UTC, YYYY-MM-DD) after the last day to rebuild, defaults to the last call log',
+    )
+    parser.add_argument(
+        '-d',
+        '--debug',
+        action='store_true',
+        help="Log debug messages",
+    )
+    parser.add_argument(
+        '-q',
+        '--quiet',
+        action='store_true',
+        help='Only print warnings and errors',
+    )
+    parsed_args = parser.parse_args()
+    result = {
+        'action': parsed_args.action,
+        'start': parsed_args.start,
+        'end': parsed_args.end,
+        'log_level': logging.INFO,
+    }
+    if parsed_args.quiet:
+        result['log_level'] = logging.WARNING
+    elif parsed_args.debug:
+        result['log_level'] = logging.DEBUG
+    return result
+
+
+def main():
+    cli_args = parse_cli_args()
+    config = read_config_file_hierarchy(ChainMap(DEFAULT_CONFIG))
+    config = ChainMap(config, DEFAULT_CONFIG)
+
+    xivo_logging.setup_logging('/dev/null', log_level=cli_args['log_level'])
+
+    engine = create_engine(config['db_uri'])
+    with engine.begin() as connection:
+        session = Session(bind=connection)
+        logger.info(
+            'Rebuilding the daily call log rollups from %s until %s',
+            cli_args['start'] or 'the first call log',
+            cli_args['end'] or 'the last call log',
+        )
+        rollup.rebuild_rollups(session, start=cli_args['start'], end=cli_args['end'])
+        session.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from collections import defaultdict
+from types import SimpleNamespace
+from unittest import TestCase
+from unittest.mock import patch
+
+from hamcrest import assert_that, contains_exactly, equal_to, has_entries
+
+from .. import celery
+
+CONFIG = {
+    'log_level': 20,
+    'celery': {
+        'broker': 'amqp://localhost',
+        'exchange_name': 'celery-call-logd',
+        'queue_name': 'celery-call-logd',
+        'worker_pid_file': '/run/default.pid',
+        'worker_min': 3,
+        'worker_max': 5,
+        'prefetch_multiplier': 4,
+        'max_tasks_per_child': 1000,
+        'max_memory_per_child': 100000,
+        'queues': {
+            'exports': {
+                'queue_name': 'celery-call-logd-exports',
+                'worker_pid_file': '/run/exports.pid',
+                'worker_min': 1,
+                'worker_max': 2,
+                'prefetch_multiplier': 1,
+                'max_tasks_per_child': 100,
+                'max_memory_per_child': 300000,
+            },
+        },
+    },
+}
+
+
+class TestCelery(TestCase):
+    def setUp(self):
+        celery.configure(CONFIG)
+
+    def test_route_task(self):
+        export_task = SimpleNamespace(work_class='exports')
+        other_task = SimpleNamespace()
+
+        assert_that(
+            celery.route_task('export', (), {}, {}, task=export_task),
+            equal_to({'queue': 'celery-call-logd-exports'}),
+        )
+        assert_that(
+            celery.route_task('peaks', (), {}, {}, task=other_task),
+            equal_to(None),
+        )
+        assert_that(
+            [queue.name for queue in celery.app.conf.task_queues],
+            contains_exactly('celery-call-logd', 'celery-call-logd-exports'),
+        )
+
+    @patch('multiprocessing.Process')
+    def test_spawn_workers(self, Process):
+        processes = celery.spawn_workers(CONFIG)
+
+        assert_that(processes, equal_to([Process.return_value] * 2))
+        argvs = [call.kwargs['args'][0] for call in Process.call_args_list]
+        # NOTE: the worker command followed by (option, value) pairs
+        options = [dict(zip(argv[1::2], argv[2::2])) for argv in argvs]
+        assert_that(
+            options,
+            contains_exactly(
+                has_entries(
+                    {
+                        '--hostname': 'call-logd@%h',
+                        '--queues': 'celery-call-logd',
+                        '--autoscale': '5,3',
+                        '--prefetch-multiplier': '4',
+                    }
+                ),
+                has_entries(
+                    {
+                        '--hostname': 'call-logd-exports@%h',
+                        '--queues': 'celery-call-logd-exports',
+                        '--autoscale': '2,1',
+                        '--pidfile': '/run/exports.pid',
+                        '--prefetch-multiplier': '1',
+                        '--max-tasks-per-child': '100',
+                        '--max-memory-per-child': '300000',
+                    }
+                ),
+            ),
+        )
+
+    @patch.object(celery, '_queue_depth', return_value={'messages': 3})
+    @patch.object(celery, 'app')
+    def test_provide_status(self, app, _):
+        app.control.inspect.return_value.ping.return_value = {
+            'call-logd@host': {'ok': 'pong'},
+        }
+        status = defaultdict(dict)
+
+        celery.provide_status(status)
+
+        assert_that(
+            status['task_queue'],
+            has_entries(
+                status='fail',
+                queues=has_entries(
+                    default=has_entries(status='ok', messages=3),
+                    exports=has_entries(status='fail'),
+                ),
+            ),
+        )
+
+        app.control.inspect.return_value.ping.return_value = {
+            'call-logd@host': {'ok': 'pong'},
+            'call-logd-exports@host': {'ok': 'pong'},
+        }
+        celery.provide_status(status)
+
+        assert_that(status['task_queue'], has_entries(status='ok'))
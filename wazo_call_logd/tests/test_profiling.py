@@ -0,0 +1,78 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import unittest
+from itertools import count
+
+from flask import Flask
+from flask_restful import Api, Resource
+from hamcrest import assert_that, contains_string, equal_to, has_entries, is_not
+from sqlalchemy import create_engine, text
+
+from ..profiling import SERVER_TIMING_HEADER, RequestProfile, install, timed
+
+
+class TestRequestProfile(unittest.TestCase):
+    def setUp(self):
+        self.profile = RequestProfile(clock=count().__next__)
+
+    def test_nested_sections_are_excluded(self):
+        self.profile.start('app')  # 1
+        self.profile.start('sql')  # 2
+        self.profile.stop()  # 3
+        self.profile.start('sql')  # 4
+        self.profile.stop()  # 5
+        self.profile.stop()  # 6
+
+        assert_that(self.profile.timings, has_entries(app=(1, 3.0), sql=(2, 2.0)))
+
+    def test_server_timing(self):
+        self.profile.start('sql')  # 1
+        self.profile.stop()  # 2
+
+        assert_that(
+            self.profile.server_timing(),  # total: 3
+            equal_to('sql;dur=1000.00;desc="1 queries", total;dur=3000.00'),
+        )
+
+
+class TestInstall(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine('sqlite://')
+        engine = self.engine
+
+        class Query(Resource):
+            @timed('app')
+            def get(self):
+                with engine.connect() as connection:
+                    connection.execute(text('SELECT 1'))
+                    connection.execute(text('SELECT 2'))
+                with timed('serialize'):
+                    return {'result': 'ok'}
+
+        app = Flask(__name__)
+        api = Api(app)
+        api.add_resource(Query, '/query')
+        install(app, api)
+        self.client = app.test_client()
+
+    def test_server_timing_header(self):
+        response = self.client.get('/query')
+
+        server_timing = response.headers[SERVER_TIMING_HEADER]
+        assert_that(server_timing, contains_string('sql;dur='))
+        assert_that(server_timing, contains_string('desc="2 queries"'))
+        for name in ('app;dur=', 'serialize;dur=', 'json;dur=', 'total;dur='):
+            assert_that(server_timing, contains_string(name))
+
+    def test_queries_outside_of_requests_are_ignored(self):
+        with timed('app'):
+            with self.engine.connect() as connection:
+                connection.execute(text('SELECT 1'))
+
+        response = self.client.get('/query')
+
+        assert_that(
+            response.headers[SERVER_TIMING_HEADER],
+            is_not(contains_string('desc="3 queries"')),
+        )
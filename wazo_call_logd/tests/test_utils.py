@@ -1,6 +1,8 @@
+import os
+import tempfile
 from unittest import TestCase
 
-from wazo_call_logd.utils import find
+from wazo_call_logd.utils import check_readable, find
 
 
 class TestFind(TestCase):
@@ -23,3 +25,14 @@ class TestFind(TestCase):
         collection = range(10)
         pred = lambda x: x > 5  # noqa: E731
         self.assertEqual(find(collection, pred), 6)
+
+
+class TestCheckReadable(TestCase):
+    def test_readable(self):
+        with tempfile.NamedTemporaryFile() as f:
+            self.assertIsNone(check_readable(f.name))
+
+    def test_missing(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'missing.wav')
+            self.assertRaises(FileNotFoundError, check_readable, path)
@@ -1,9 +1,13 @@
-# Copyright 2013-2022 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2013-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
+import uuid
 from unittest import TestCase
 from unittest.mock import Mock
 
+from hamcrest import assert_that, equal_to
+
+from wazo_call_logd.database.models import CallLog, CallLogParticipant
 from wazo_call_logd.generator import CallLogsCreation
 from wazo_call_logd.writer import CallLogsWriter
 
@@ -24,9 +28,61 @@ class TestCallLogsWriter(TestCase):
 
         self.writer.write(call_logs_creation)
 
+        for call_log in call_logs_creation.new_call_logs:
+            call_log.denormalize_participants.assert_called_once_with()
+
         self.dao.call_log.create_from_list.assert_called_once_with(
             call_logs_creation.new_call_logs
         )
         self.dao.call_log.delete_from_list.assert_called_once_with(
             call_logs_creation.call_logs_to_delete
         )
+
+    def test_write_denormalizes_participants(self):
+        user_1, user_2 = str(uuid.uuid4()), str(uuid.uuid4())
+        call_log = CallLog(
+            participants=[
+                CallLogParticipant(user_uuid=user_1, role='source', tags=['b', 'a']),
+                CallLogParticipant(user_uuid=user_2, role='destination', tags=['c']),
+                CallLogParticipant(user_uuid=user_1, role='destination', answered=True),
+            ]
+        )
+        call_logs_creation = CallLogsCreation(
+            new_call_logs=[call_log], call_logs_to_delete=[]
+        )
+
+        self.writer.write(call_logs_creation)
+
+        assert_that(call_log.user_uuids, equal_to(sorted([user_1, user_2])))
+        assert_that(call_log.tags, equal_to(['a', 'b', 'c']))
+        assert_that(call_log.source_user_uuid, equal_to(user_1))
+        assert_that(call_log.destination_user_uuid, equal_to(user_1))
+
+    def test_write_destination_without_answer_is_highest_user_uuid(self):
+        user_uuids = sorted(str(uuid.uuid4()) for _ in range(3))
+        call_log = CallLog(
+            participants=[
+                CallLogParticipant(user_uuid=user_uuids[0], role='source'),
+                CallLogParticipant(user_uuid=user_uuids[2], role='destination'),
+                CallLogParticipant(user_uuid=user_uuids[1], role='destination'),
+            ]
+        )
+        call_logs_creation = CallLogsCreation(
+            new_call_logs=[call_log], call_logs_to_delete=[]
+        )
+
+        self.writer.write(call_logs_creation)
+
+        assert_that(call_log.source_user_uuid, equal_to(user_uuids[0]))
+        assert_that(call_log.destination_user_uuid, equal_to(user_uuids[2]))
+
+    def test_write_calls_subscribers_with_new_call_logs(self):
+        callback = Mock()
+        self.writer.subscribe(callback)
+        call_logs_creation = CallLogsCreation(
+            new_call_logs=[Mock(recordings=[])], call_logs_to_delete=[]
+        )
+
+        self.writer.write(call_logs_creation)
+
+        callback.assert_called_once_with(call_logs_creation.new_call_logs)
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import errno
+import os
 from collections.abc import Callable, Iterable
 from typing import TypeVar
 
@@ -13,3 +15,13 @@ def find(col: Iterable[T], pred: Callable[[T], bool]) -> T | None:
     for x in col:
         if pred(x):
             return x
+
+
+def check_readable(path: str) -> None:
+    """
+    raise FileNotFoundError or PermissionError when a file cannot be read, like
+    open without opening it
+    """
+    if not os.access(path, os.R_OK):
+        os.stat(path)
+        raise PermissionError(errno.EACCES, os.strerror(errno.EACCES), path)
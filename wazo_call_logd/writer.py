@@ -1,10 +1,14 @@
-# Copyright 2013-2023 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2013-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 
 class CallLogsWriter:
     def __init__(self, dao):
         self._dao = dao
+        self._callbacks = []
+
+    def subscribe(self, callback):
+        self._callbacks.append(callback)
 
     def write(self, call_logs):
         self._dao.call_log.delete_from_list(call_logs.call_logs_to_delete)
@@ -12,5 +16,9 @@ class CallLogsWriter:
 
         tenant_uuids = {cdr.tenant_uuid for cdr in call_logs.new_call_logs}
         self._dao.tenant.create_all_uuids_if_not_exist(tenant_uuids)
+        for call_log in call_logs.new_call_logs:
+            call_log.denormalize_participants()
         self._dao.call_log.create_from_list(call_logs.new_call_logs)
         self._dao.cel.associate_all_to_call_logs(call_logs.new_call_logs)
+        for callback in self._callbacks:
+            callback(call_logs.new_call_logs)